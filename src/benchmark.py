@@ -0,0 +1,256 @@
+# src/benchmark.py
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from topology_generator import TOPOLOGIES, generate_topology
+
+RESULT_VERSION = 1
+PHASE_KEYS = ('seconds', 'mean')  # 比较时使用的耗时字段：一次性阶段为 seconds，逐事件阶段为 mean
+# 基准中的后端：csr-alt 为 CSR 图 + ALT 地标索引（与 initial_path_calculation 相同的配置）
+BACKENDS = ('csr', 'csr-alt', 'networkx')
+
+
+def _peak_rss_mb():
+    """当前进程的峰值常驻内存（MB）；Linux 上 ru_maxrss 以 KB 为单位，macOS 上以字节为单位"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def _latency_summary(samples):
+    if not samples:
+        return {'count': 0}
+    values = np.asarray(samples)
+    return {'count': len(samples), 'total': float(values.sum()), 'mean': float(values.mean()),
+            'p50': float(np.percentile(values, 50)), 'p90': float(np.percentile(values, 90)),
+            'max': float(values.max())}
+
+
+def synthetic_dataset(directory, nodes, topology='mesh', seed=0):
+    """按规模、拓扑和种子生成（或复用已生成的）合成数据集，返回目录"""
+    directory = os.path.join(directory, f'{topology}_{nodes}_{seed}')
+    if not os.path.exists(os.path.join(directory, 'service.csv')):
+        generate_topology(directory, nodes, topology, seed=seed)
+    return directory
+
+
+def _sample_edges(path_calculator, count, seed):
+    """按 seed 抽取当前有业务经过的边（排序后抽样，结果可复现）"""
+    edges = sorted(edge for edge, services in path_calculator.edge_service_matrix.items() if services)
+    return random.Random(seed).sample(edges, min(count, len(edges)))
+
+
+def run_case(case):
+    """
+    在独立进程中运行一个基准用例：数据加载、建图、calculate_paths、recompute_backup_paths、
+    单边 / 批量故障处理（每次处理后恢复），CSR 后端另测快照保存 / 加载和单 OMS 生存性扫描，
+    返回各阶段耗时和峰值内存。workers 同时用于备用路径计算和生存性扫描。
+    """
+    from data_handler import load_node_table, load_oms_table, load_relay_table, load_service_table
+    from landmarks import LandmarkIndex
+    from path_calculator import PathCalculator
+
+    directory, backend, workers = case['directory'], case['backend'], case['workers']
+    phases = {}
+
+    def timed(name, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        phases[name] = {'seconds': time.perf_counter() - start, 'peak_rss_mb': _peak_rss_mb()}
+        return result
+
+    files = {name: os.path.join(directory, f'{name}.csv') for name in ('node', 'oms', 'relay', 'service')}
+
+    def load(use_cache):
+        return (load_node_table(files['node'], use_cache), load_oms_table(files['oms'], use_cache),
+                load_relay_table(files['relay'], use_cache), load_service_table(files['service'], use_cache))
+
+    phases['baseline'] = {'peak_rss_mb': _peak_rss_mb()}
+    timed('load', load, False)
+    load(True)  # 确保快照存在
+    nodes, oms_links, relays, services = timed('load_cached', load, True)
+
+    path_calculator = timed('build_graph', PathCalculator, oms_links, backend=backend.split('-')[0])
+    if backend == 'csr-alt':
+        path_calculator.use_landmarks(timed('build_landmarks', LandmarkIndex.build, path_calculator.G))
+    timed('calculate_paths', path_calculator.calculate_paths, services)
+    timed('recompute_backup_paths', path_calculator.recompute_backup_paths, workers=workers)
+
+    failure, recovery = [], []
+    for edge in _sample_edges(path_calculator, case['failures'], case['seed']):
+        start = time.perf_counter()
+        path_calculator.handle_failure(edge)
+        failure.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        path_calculator.handle_recovery(edge)
+        recovery.append(time.perf_counter() - start)
+    phases['handle_failure'] = dict(_latency_summary(failure), peak_rss_mb=_peak_rss_mb())
+    phases['handle_recovery'] = dict(_latency_summary(recovery), peak_rss_mb=_peak_rss_mb())
+
+    batch = []
+    size = case['batch_size']
+    edges = _sample_edges(path_calculator, size * case['batches'], case['seed'] + 1)
+    for i in range(0, len(edges) - size + 1, size):
+        group = edges[i:i + size]
+        start = time.perf_counter()
+        path_calculator.handle_failures(group)
+        batch.append(time.perf_counter() - start)
+        for edge in group:
+            path_calculator.handle_recovery(edge)
+    phases['handle_failures'] = dict(_latency_summary(batch), batch_size=size, peak_rss_mb=_peak_rss_mb())
+
+    if path_calculator.backend == 'csr':
+        from state_snapshot import load_state, save_state
+        from survivability import SurvivabilityAnalyzer
+        with tempfile.TemporaryDirectory() as tmp:
+            file_name = os.path.join(tmp, 'state.snap')
+            timed('snapshot_save', save_state, path_calculator, file_name)
+            phases['snapshot_save']['bytes'] = os.path.getsize(file_name)
+            timed('snapshot_load', load_state, file_name)
+        analyzer = SurvivabilityAnalyzer(path_calculator)
+        scenarios = analyzer.single_oms_scenarios()
+        timed('survivability_sweep', analyzer.sweep, scenarios, workers)
+        phases['survivability_sweep']['scenarios'] = len(scenarios)
+
+    return {
+        'dataset': case['dataset'],
+        'backend': backend,
+        'workers': workers,
+        'nodes': len(nodes),
+        'oms': len(oms_links),
+        'edges': path_calculator.G.number_of_edges(),
+        'services': len(services),
+        'routed': len(path_calculator.paths_in_use),
+        'backup_paths': len(path_calculator.backup_table.entries),
+        'phases': phases,
+        'counters': dict(sorted(path_calculator.metrics.counters.items())),
+    }
+
+
+def _case_process(case, queue):
+    try:
+        queue.put((True, run_case(case)))
+    except Exception as e:
+        queue.put((False, f'{type(e).__name__}: {e}'))
+
+
+def run_cases(cases):
+    """
+    每个用例在新的 spawn 进程中运行，峰值内存互不影响，也不继承前一个用例的缓存。
+    不使用进程池：池中的守护进程不能再创建 recompute_backup_paths 的工作进程。
+    """
+    ctx = mp.get_context('spawn')
+    results = []
+    for case in cases:
+        queue = ctx.Queue()
+        process = ctx.Process(target=_case_process, args=(case, queue))
+        process.start()
+        ok, result = queue.get()
+        process.join()
+        if not ok:
+            raise RuntimeError(f"Benchmark case {case['dataset']}/{case['backend']}/{case['workers']} failed: {result}")
+        results.append(result)
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {'version': RESULT_VERSION, 'time': time.time(), 'revision': _git_revision(),
+            'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def _case_key(result):
+    return (result['dataset'], result['backend'], result['workers'])
+
+
+def compare(baseline, current):
+    """按 (数据集, 后端, 进程数, 阶段) 对比两次结果的耗时，返回 [(用例, 阶段, 基线, 当前, 比值)]"""
+    baseline_results = {_case_key(r): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        old = baseline_results.get(_case_key(result))
+        if old is None:
+            continue
+        for phase, values in result['phases'].items():
+            old_values = old['phases'].get(phase, {})
+            for key in PHASE_KEYS:
+                if key in values and old_values.get(key):
+                    rows.append((_case_key(result), phase, old_values[key], values[key], values[key] / old_values[key]))
+                    break
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data loading, path computation, failure handling and "
+                                                 "state snapshots on data/ and synthetic topologies.")
+    parser.add_argument('--data', default='data', help="dataset directory ('' to skip)")
+    parser.add_argument('--synthetic', type=int, nargs='*', default=[2000, 8000],
+                        help="synthetic topology sizes (number of nodes)")
+    parser.add_argument('--synthetic-dir', default='results/benchmark_data')
+    parser.add_argument('--topologies', nargs='+', choices=TOPOLOGIES, default=['mesh'],
+                        help="synthetic topology types (see topology_generator.py)")
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count()],
+                        help="process counts for recompute_backup_paths and the survivability sweep")
+    parser.add_argument('--failures', type=int, default=100, help="single-edge failures per case")
+    parser.add_argument('--batches', type=int, default=20, help="multi-edge failure events per case")
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='results/benchmark.json')
+    parser.add_argument('--compare', default=None, help="earlier benchmark JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2, help="slowdown ratio reported as a regression")
+    parser.add_argument('--min-delta', type=float, default=1e-3,
+                        help="ignore slowdowns smaller than this many seconds (timer noise on short phases)")
+    args = parser.parse_args()
+
+    datasets = [('data', args.data)] if args.data else []
+    for topology in args.topologies:
+        for size in args.synthetic:
+            datasets.append((f'{topology}-{size}', synthetic_dataset(args.synthetic_dir, size, topology, args.seed)))
+    cases = [{'dataset': name, 'directory': directory, 'backend': backend, 'workers': workers,
+              'failures': args.failures, 'batches': args.batches, 'batch_size': args.batch_size, 'seed': args.seed}
+             for name, directory in datasets for backend in args.backends for workers in sorted(set(args.workers))]
+
+    start_time = time.time()
+    report = {'environment': environment(), 'results': run_cases(cases)}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for result in report['results']:
+        phases = result['phases']
+        print(f"{result['dataset']} [{result['backend']}, workers={result['workers']}] "
+              f"{result['nodes']} nodes, {result['edges']} edges, {result['services']} services: "
+              f"load {phases['load']['seconds']:.2f} s, paths {phases['calculate_paths']['seconds']:.2f} s, "
+              f"backups {phases['recompute_backup_paths']['seconds']:.2f} s, "
+              f"failure {phases['handle_failure'].get('mean', 0) * 1e3:.2f} ms, "
+              f"peak {max(p.get('peak_rss_mb', 0) for p in phases.values()):.0f} MB")
+    print(f"{len(cases)} cases in {time.time() - start_time:.1f} s, results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for key, phase, old, new, ratio in compare(baseline, report):
+            flag = '  REGRESSION' if ratio > args.threshold and new - old > args.min_delta else ''
+            print(f"  {'/'.join(map(str, key))} {phase}: {old:.4g} -> {new:.4g} ({ratio:.2f}x){flag}")
+
+
+if __name__ == "__main__":
+    main()
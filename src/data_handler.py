@@ -1,29 +1,154 @@
 # src/data_handler.py
 
+import hashlib
+import os
+
+import numpy as np
 import pandas as pd
-from models import Node, OmsLink, Relay, Service
+from metrics import get_logger
+from models import (ColorColumn, NodeTable, OmsTable, RelayTable, ServiceTable,
+                    parse_color_intervals)
 
-def load_nodes(file_path):
-    df = pd.read_csv(file_path)
-    nodes = [Node(row['nodeId']) for idx, row in df.iterrows()]
-    return nodes
+logger = get_logger('data_handler')
 
-def load_oms_links(file_path):
-    df = pd.read_csv(file_path)
-    oms_links = [OmsLink(row['omsId'], row['remoteOmsId'], row['src'], row['snk'], 
-                         row['cost'], row['distance'], row['ots'], row['osnr'], 
-                         row['slice'], row['colors']) for idx, row in df.iterrows()]
-    return oms_links
+# 快照格式版本，字段或编码方式变化时递增，旧快照会被自动重建
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIR = '.snapshot'
+
+NODE_COLUMNS = ['nodeId']
+OMS_COLUMNS = ['omsId', 'remoteOmsId', 'src', 'snk', 'cost', 'distance', 'ots', 'osnr', 'slice']
+RELAY_COLUMNS = ['relayId', 'relatedRelayId', 'nodeId', 'localId', 'relatedLocalId']
+SERVICE_COLUMNS = ['src', 'snk', 'sourceOtu', 'targetOtu', 'm_width', 'bandType']
+
+
+def _file_digest(file_path):
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _snapshot_path(file_path, cache_dir=None):
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(file_path)), SNAPSHOT_DIR)
+    return os.path.join(cache_dir, os.path.basename(file_path) + '.npz')
+
+
+def encode_colors(values):
+    """
+    批量解析一列颜色字符串。
+    同样的字符串只解析一次：返回 (codes, ptr, intervals)，
+    第 i 行的区间为 intervals[ptr[codes[i]]:ptr[codes[i] + 1]]。
+    """
+    values = pd.Series(values).fillna('').astype(str)
+    codes, uniques = pd.factorize(values, sort=False)
+    parsed = [parse_color_intervals(text) for text in uniques]
+    ptr = np.zeros(len(parsed) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(intervals) for intervals in parsed])
+    intervals = np.array([pair for intervals in parsed for pair in intervals], dtype=np.int32).reshape(-1, 2)
+    return codes.astype(np.int32), ptr, intervals
+
+
+def _parse_csv(file_path, columns, color_columns):
+    df = pd.read_csv(file_path, dtype={column: str for column in color_columns})
+    arrays = {column: df[column].to_numpy() for column in columns}
+    for column in color_columns:
+        codes, ptr, intervals = encode_colors(df[column])
+        arrays[column + '.codes'] = codes
+        arrays[column + '.ptr'] = ptr
+        arrays[column + '.intervals'] = intervals
+    return arrays
+
+
+def load_table(file_path, columns, color_columns=(), use_cache=True, cache_dir=None):
+    """
+    按列批量读取 CSV，返回 {列名: numpy 数组}，颜色列按 encode_colors 编码。
+    use_cache=True 时把结果写成带版本号的 npz 快照；
+    CSV 的 mtime 和大小未变则直接读快照，mtime 变了但内容哈希相同也复用快照。
+    """
+    columns, color_columns = list(columns), list(color_columns)
+    if not use_cache:
+        return _parse_csv(file_path, columns, color_columns)
+
+    stat = os.stat(file_path)
+    snapshot = _snapshot_path(file_path, cache_dir)
+    layout = ','.join(columns) + '|' + ','.join(color_columns)
+    digest = None
+    if os.path.exists(snapshot):
+        try:
+            with np.load(snapshot, allow_pickle=False) as data:
+                meta = data['__meta__']
+                if int(meta[0]) == SNAPSHOT_VERSION and str(data['__layout__']) == layout:
+                    fresh = int(meta[1]) == stat.st_mtime_ns and int(meta[2]) == stat.st_size
+                    if not fresh:
+                        digest = _file_digest(file_path)
+                        fresh = str(data['__digest__']) == digest
+                    if fresh:
+                        return {key: data[key] for key in data.files if not key.startswith('__')}
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("Ignoring unreadable snapshot %s: %s", snapshot, e)
+
+    arrays = _parse_csv(file_path, columns, color_columns)
+    if digest is None:
+        digest = _file_digest(file_path)
+    try:
+        os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+        tmp_path = snapshot + '.tmp.npz'
+        np.savez(tmp_path,
+                 __meta__=np.array([SNAPSHOT_VERSION, stat.st_mtime_ns, stat.st_size], dtype=np.int64),
+                 __layout__=np.array(layout), __digest__=np.array(digest), **arrays)
+        os.replace(tmp_path, snapshot)
+    except OSError as e:
+        logger.warning("Could not write snapshot %s: %s", snapshot, e)
+    return arrays
+
+
+def _build_table(table_cls, arrays, csv_columns, csv_color_columns):
+    columns = dict(zip(table_cls.columns, (arrays[column] for column in csv_columns)))
+    colors = {name: ColorColumn(arrays[column + '.codes'], arrays[column + '.ptr'], arrays[column + '.intervals'])
+              for name, column in zip(table_cls.color_columns, csv_color_columns)}
+    return table_cls(columns, colors)
+
+
+def load_node_table(file_path, use_cache=True):
+    arrays = load_table(file_path, NODE_COLUMNS, use_cache=use_cache)
+    return _build_table(NodeTable, arrays, NODE_COLUMNS, [])
+
+def load_oms_table(file_path, use_cache=True):
+    arrays = load_table(file_path, OMS_COLUMNS, ['colors'], use_cache=use_cache)
+    return _build_table(OmsTable, arrays, OMS_COLUMNS, ['colors'])
+
+def load_relay_table(file_path, use_cache=True):
+    arrays = load_table(file_path, RELAY_COLUMNS, ['dimColors'], use_cache=use_cache)
+    return _build_table(RelayTable, arrays, RELAY_COLUMNS, ['dimColors'])
+
+def load_service_table(file_path, use_cache=True):
+    color_columns = ['sourceDimColors', 'targetDimColors']
+    arrays = load_table(file_path, SERVICE_COLUMNS, color_columns, use_cache=use_cache)
+    return _build_table(ServiceTable, arrays, SERVICE_COLUMNS, color_columns)
+
+
+# 逐条记录的列表形式，保留给沿用旧接口的代码
+def load_nodes(file_path, use_cache=True):
+    return list(load_node_table(file_path, use_cache))
+
+def load_oms_links(file_path, use_cache=True):
+    return list(load_oms_table(file_path, use_cache))
+
+def load_relays(file_path, use_cache=True):
+    return list(load_relay_table(file_path, use_cache))
+
+def load_services(file_path, use_cache=True):
+    return list(load_service_table(file_path, use_cache))
 
-def load_relays(file_path):
-    df = pd.read_csv(file_path)
-    relays = [Relay(row['relayId'], row['relatedRelayId'], row['nodeId'], 
-                    row['localId'], row['relatedLocalId'], row['dimColors']) for idx, row in df.iterrows()]
-    return relays
 
-def load_services(file_path):
+def load_srlg_groups(file_path):
+    """
+    读取共享风险组（SRLG）文件，每行一个 (srlgId, omsId)，同一组的 OMS 会同时故障。
+    返回 {srlgId: [omsId, ...]}，组内顺序与文件一致。
+    """
     df = pd.read_csv(file_path)
-    services = [Service(row['src'], row['snk'], row['sourceOtu'], row['targetOtu'], 
-                        row['m_width'], row['bandType'], row['sourceDimColors'], 
-                        row['targetDimColors']) for idx, row in df.iterrows()]
-    return services
+    groups = {}
+    for group_id, oms_id in zip(df['srlgId'].tolist(), df['omsId'].tolist()):
+        groups.setdefault(group_id, []).append(oms_id)
+    return groups
@@ -1,8 +1,17 @@
 #src/failure_simulation.py
+import ast
 import json
 import csv
+import os
+from data_handler import load_oms_table, load_srlg_groups
+from graph_engine import CSRGraph
+from landmarks import LandmarkIndex, landmark_file
+from metrics import configure_logging
 from path_calculator import PathCalculator
+from path_pool import PathRecord
+from path_table import PathTable
 from simulator import NetworkSimulator
+from state_snapshot import load_state, save_state
 
 import pickle
 def tuple_to_string_key(data):
@@ -18,6 +27,10 @@ def tuple_to_string_key(data):
         return new_data
     elif isinstance(data, list):
         return [tuple_to_string_key(item) for item in data]
+    elif isinstance(data, set):
+        return sorted(data)  # edge_service_matrix 中的业务集合
+    elif isinstance(data, PathRecord):
+        return tuple_to_string_key(data.to_dict())  # 路径池中的路径按原来的字典格式保存
     else:
         return data
 
@@ -29,7 +42,7 @@ def string_key_to_tuple(data):
         new_data = {}
         for key, value in data.items():
             if isinstance(key, str) and key.startswith('(') and key.endswith(')'):
-                key = eval(key)  # Convert string back to tuple
+                key = ast.literal_eval(key)  # Convert string back to tuple
             new_data[key] = string_key_to_tuple(value)
         return new_data
     elif isinstance(data, list):
@@ -48,10 +61,11 @@ def load_initial_data(file_name):
     data['backup_paths'] = {int(k): v for k, v in data['backup_paths'].items()}  # 保持业务索引为 int
     
     data['edge_service_matrix'] = string_key_to_tuple(data['edge_service_matrix'])
+    data['backup_table'] = PathTable.from_dict(data.get('backup_table', {}))  # 共享备用路径表
     
     # 使用 get 方法，防止文件中没有 failed_edges 键时报错
-    data['failed_edges'] = [eval(edge) for edge in data.get('failed_edges', [])]  # 将字符串转换回元组
-    data['recovered_edges'] = [eval(edge) for edge in data.get('recovered_edges', [])]  # 同样转换
+    data['failed_edges'] = [ast.literal_eval(edge) for edge in data.get('failed_edges', [])]  # 将字符串转换回元组
+    data['recovered_edges'] = [ast.literal_eval(edge) for edge in data.get('recovered_edges', [])]  # 同样转换
 
     # 打开文件，以写入模式 ('w') 打开
     # with open('paths_in_use_output.txt', 'w') as file:
@@ -70,6 +84,7 @@ def save_simulation_data(path_calculator, failed_edges, recovered_edges, file_na
     data = {
         'paths_in_use': tuple_to_string_key(path_calculator.paths_in_use),
         'backup_paths': tuple_to_string_key(path_calculator.backup_paths),
+        'backup_table': path_calculator.backup_table.to_dict(),
         'edge_service_matrix': tuple_to_string_key(path_calculator.edge_service_matrix),
         'failed_edges': [str(edge) for edge in failed_edges],  # 将元组转换为字符串
         'recovered_edges': [str(edge) for edge in recovered_edges]  # 同样转换
@@ -77,6 +92,16 @@ def save_simulation_data(path_calculator, failed_edges, recovered_edges, file_na
     with open(file_name, 'w') as file:
         json.dump(data, file, indent=4)
 
+def save_simulation_state(path_calculator, failed_edges, recovered_edges, prefix='results/simulation'):
+    """保存模拟状态：CSR 后端写二进制快照 {prefix}_state.snap，其他后端写 JSON {prefix}_state.json，返回文件名"""
+    if path_calculator.backend == 'csr':
+        file_name = f'{prefix}_state.snap'
+        save_state(path_calculator, file_name, failed_edges, recovered_edges)
+    else:
+        file_name = f'{prefix}_state.json'
+        save_simulation_data(path_calculator, failed_edges, recovered_edges, file_name)
+    return file_name
+
 def save_simulation_to_csv(path_calculator, failed_edges, recovered_edges, paths_csv, backup_csv, failed_csv):
     """保存模拟状态到 CSV 文件"""
     # 保存 paths_in_use 到 CSV 文件
@@ -86,13 +111,14 @@ def save_simulation_to_csv(path_calculator, failed_edges, recovered_edges, paths
         for service_index, data in path_calculator.paths_in_use.items():
             writer.writerow([service_index, data['path'], data['edges']])
 
-    # 保存 backup_paths 到 CSV 文件
+    # 保存 backup_paths 到 CSV 文件（按句柄展开共享备用路径表）
     with open(backup_csv, 'w', newline='') as csv_file:
         writer = csv.writer(csv_file)
-        writer.writerow(['Service Index', 'Failed Edge', 'Backup Path', 'Backup Edges'])
-        for service_index, edge_paths in path_calculator.backup_paths.items():
-            for edge, path_info in edge_paths.items():
-                writer.writerow([service_index, edge, path_info['path'], path_info['edges']])
+        writer.writerow(['Service Index', 'Failed Edge', 'Handle', 'Backup Path', 'Backup Edges'])
+        for service_index, edge_handles in path_calculator.backup_paths.items():
+            for edge, handle in edge_handles.items():
+                path_info = path_calculator.backup_table.get(handle)
+                writer.writerow([service_index, edge, handle, path_info['path'], path_info['edges']])
 
     # 保存失败和恢复的边信息到 CSV 文件
     with open(failed_csv, 'w', newline='') as csv_file:
@@ -101,20 +127,53 @@ def save_simulation_to_csv(path_calculator, failed_edges, recovered_edges, paths
         writer.writerow([failed_edges, recovered_edges])
 
 
-def failure_simulation():
+def load_path_calculator(data_file='results/initial_state.snap', graph_file='results/graph_structure.pkl',
+                         oms_file='data/oms.csv'):
+    """
+    加载初始路径数据和图结构，返回 (path_calculator, data)。
+    data_file 为二进制快照时直接内存映射读取；为 .json 时按旧格式读取 JSON，图取自 graph_file 中的 pickle，
+    pickle 不存在时（initial_path_calculation 已不再写出）由 oms_file 重新构建 CSR 图。
+    """
+    if not data_file.endswith('.json'):
+        path_calculator, data = load_state(data_file)
+        # 与快照放在一起的 ALT 地标索引，cost 变化或文件缺失时重新构建
+        path_calculator.use_landmarks(LandmarkIndex.load_or_build(path_calculator.G, landmark_file(data_file)))
+        return path_calculator, data
+
     # 加载初始路径数据
-    data = load_initial_data('results/initial_paths_data.json')
-    
-    # 加载图的结构
-    with open('results/graph_structure.pkl', 'rb') as f:
-        G = pickle.load(f)
+    data = load_initial_data(data_file)
     
-    # 初始化 PathCalculator 并设置图
-    path_calculator = PathCalculator([])
-    path_calculator.G = G  # 使用已保存的图
+    if os.path.exists(graph_file):
+        # 加载图的结构
+        with open(graph_file, 'rb') as f:
+            G = pickle.load(f)
+
+        # 初始化 PathCalculator 并设置图
+        path_calculator = PathCalculator([])
+        path_calculator.attach_graph(G)  # 使用已保存的图（nx.Graph 或 CSRGraph）
+        index_file = landmark_file(graph_file)
+    else:
+        path_calculator = PathCalculator(load_oms_table(oms_file))
+        G = path_calculator.G
+        index_file = landmark_file(data_file)
+    if isinstance(G, CSRGraph):
+        # 与图一起保存的 ALT 地标索引，cost 变化或文件缺失时重新构建
+        path_calculator.use_landmarks(LandmarkIndex.load_or_build(G, index_file))
     path_calculator.paths_in_use = data['paths_in_use']
     path_calculator.backup_paths = data['backup_paths']
-    path_calculator.edge_service_matrix = data['edge_service_matrix']
+    path_calculator.backup_table = data['backup_table']
+    path_calculator.intern_paths()  # 路径放入路径池（CSR 后端）
+    path_calculator.build_edge_service_matrix()  # 根据加载的当前路径重建边 -> 业务索引
+    path_calculator.rebuild_backup_indexes()  # 根据加载的备用路径重建倒排索引
+    path_calculator.remember_original_paths()  # 加载的初始路径即业务的原始路径
+    path_calculator.failed_edges = list(data.get('failed_edges', []))
+    path_calculator.sync_edge_mask()  # 已保存的故障边在之后的搜索中不可用
+    return path_calculator, data
+
+
+def failure_simulation():
+    configure_logging('INFO', 'results/simulation_log.txt')
+    path_calculator, data = load_path_calculator()
     
     # with open('paths_in_use_output2222.txt', 'w') as file:
     # # 写入文件
@@ -125,10 +184,12 @@ def failure_simulation():
     simulator = NetworkSimulator(path_calculator)
 
     failed_edges = data.get('failed_edges', [])
+    # 可选的共享风险组文件：srlgId,omsId
+    srlg_groups = load_srlg_groups('data/srlg.csv') if os.path.exists('data/srlg.csv') else None
     
     # 用户输入模拟
     while True:
-        action = input("Enter 'f' to simulate failure, 'r' to recover a failed edge, or 'q' to quit: ").strip().lower()
+        action = input("Enter 'f' to simulate failure, 'm' to fail several edges at once, 's' to fail an SRLG, 'r' to recover a failed edge, 'o'/'u' to fail/recover a single OMS, or 'q' to quit: ").strip().lower()
         
         if action == 'f':
             edge = input("Enter the edge to fail (format: src,snk): ").strip()
@@ -145,6 +206,27 @@ def failure_simulation():
             else:
                 print(f"Edge {edge} does not exist or has already failed.")
         
+        elif action == 'm':
+            # 多条边同时故障，作为一个事件批量处理
+            text = input("Enter the edges to fail (format: src,snk;src,snk;...): ").strip()
+            edges = []
+            for item in text.split(';'):
+                if item.strip():
+                    src, snk = map(int, item.split(','))
+                    edges.append((min(src, snk), max(src, snk)))
+            for edge in simulator.simulate_failures([edge for edge in edges if edge not in failed_edges]):
+                failed_edges.append(edge)
+
+        elif action == 's':
+            # 共享风险组故障：组内所有 OMS 同时中断
+            if srlg_groups is None:
+                print("No SRLG file found at data/srlg.csv.")
+                continue
+            group_id = int(input("Enter the SRLG id to fail: ").strip())
+            for edge in simulator.simulate_srlg_failure(group_id, srlg_groups):
+                if edge not in failed_edges:
+                    failed_edges.append(edge)
+
         elif action == 'r':
             edge = input("Enter the edge to recover (format: src,snk): ").strip()
             src, snk = map(int, edge.split(','))
@@ -159,15 +241,29 @@ def failure_simulation():
             else:
                 print(f"Edge {edge} is not currently in the failed state.")
         
+        elif action == 'o':
+            # 单条 OMS 故障：只有所有并行 OMS 都故障时整条边才中断
+            oms_id = int(input("Enter the omsId to fail: ").strip())
+            edge = simulator.simulate_oms_failure(oms_id)
+            if edge is not None and edge not in failed_edges:
+                failed_edges.append(edge)
+
+        elif action == 'u':
+            oms_id = int(input("Enter the omsId to recover: ").strip())
+            edge = simulator.simulate_oms_recovery(oms_id)
+            if edge is not None and edge in failed_edges:
+                failed_edges.remove(edge)
+
         elif action == 'q':
             break
 
         # 保存模拟状态
-        save_simulation_data(path_calculator, failed_edges, [], 'results/simulation_state.json')
+        save_simulation_state(path_calculator, failed_edges, [])
         save_simulation_to_csv(path_calculator, failed_edges, [],
                                paths_csv='results/simulation_paths.csv',
                                backup_csv='results/simulation_backup_paths.csv',
                                failed_csv='results/simulation_failed_edges.csv')
+        path_calculator.metrics.export_csv('results/simulation_metrics.csv')
 
         print("Simulation state saved.")
 
@@ -0,0 +1,674 @@
+# src/graph_engine.py
+
+from heapq import heappush, heappop
+
+import networkx as nx
+import numpy as np
+
+
+class EdgeView:
+    """CSRGraph 的轻量边视图，兼容 `edge in G.edges` 的写法"""
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __contains__(self, edge):
+        try:
+            u, v = edge
+        except (TypeError, ValueError):
+            return False
+        return self._graph.has_edge(u, v)
+
+    def __iter__(self):
+        node_ids = self._graph.node_ids
+        for u, v in zip(self._graph.edge_src.tolist(), self._graph.edge_dst.tolist()):
+            yield (int(node_ids[u]), int(node_ids[v]))
+
+    def __len__(self):
+        return self._graph.number_of_edges()
+
+
+class CSRGraph:
+    """
+    基于 CSR 数组的紧凑无向图。
+    节点 ID 被重映射到 [0, n) 的稠密区间，邻接关系保存在 indptr/indices 数组中，
+    每个邻接槽位记录无向边编号 (edge id)，边的属性按边编号存放在一维数组里。
+    邻居顺序与 nx.Graph 的插入顺序一致，因此搜索结果（包括等价路径的选择）与 networkx 相同。
+
+    同一对节点之间的并行 OMS 链路聚合为一条无向边，权重取并行链路中的最小 cost；
+    每条 OMS 仍以 omsId 单独保存在按边分组的 oms_* 数组中（edge_oms_ptr 为分组下标），
+    故障可以精确到单条 OMS，而搜索热循环只看聚合后的边。
+    """
+    def __init__(self, oms_links=()):
+        index_of = {}
+        node_ids = []
+        adjacency = []  # 每个节点的 [(邻居, 边编号), ...]，按插入顺序
+        edge_lookup = {}
+        edge_src, edge_dst, edge_weight, edge_distance = [], [], [], []
+        edge_oms = []  # 每条边上的并行 OMS：[(omsId, remoteOmsId, cost, distance), ...]
+
+        def node_index(node):
+            idx = index_of.get(node)
+            if idx is None:
+                idx = len(node_ids)
+                index_of[node] = idx
+                node_ids.append(node)
+                adjacency.append([])
+            return idx
+
+        if hasattr(oms_links, 'column'):
+            # OmsTable：直接按列读取
+            rows = zip(*(oms_links.column(name).tolist()
+                         for name in ('src', 'snk', 'cost', 'distance', 'oms_id', 'remote_oms_id')))
+        else:
+            rows = ((link.src, link.snk, link.cost, link.distance,
+                     getattr(link, 'oms_id', -1), getattr(link, 'remote_oms_id', -1)) for link in oms_links)
+        for src, snk, cost, distance, oms_id, remote_oms_id in rows:
+            # 与 PathCalculator 一致，规范化边的顺序为 (min, max)
+            a, b = min(src, snk), max(src, snk)
+            u, v = node_index(a), node_index(b)
+            eid = edge_lookup.get((u, v))
+            if eid is None:
+                eid = len(edge_src)
+                edge_lookup[(u, v)] = eid
+                edge_src.append(u)
+                edge_dst.append(v)
+                edge_weight.append(cost)
+                edge_distance.append(distance)
+                edge_oms.append([])
+                adjacency[u].append((v, eid))
+                if u != v:
+                    adjacency[v].append((u, eid))
+            elif cost < edge_weight[eid]:
+                # 并行链路：聚合边使用最便宜的一条
+                edge_weight[eid] = cost
+                edge_distance[eid] = distance
+            edge_oms[eid].append((oms_id, remote_oms_id, cost, distance))
+
+        self.node_ids = np.asarray(node_ids, dtype=np.int64)
+        self.index_of = index_of
+        self.edge_src = np.asarray(edge_src, dtype=np.int32)
+        self.edge_dst = np.asarray(edge_dst, dtype=np.int32)
+        self.edge_weight = np.asarray(edge_weight, dtype=np.float64)
+        self.edge_distance = np.asarray(edge_distance, dtype=np.float64)
+        self.weight_version = 0  # 每次 set_edge_weight 递增
+
+        degrees = np.fromiter((len(nbrs) for nbrs in adjacency), dtype=np.int64, count=len(adjacency))
+        self.indptr = np.zeros(len(adjacency) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=self.indptr[1:])
+        self.indices = np.fromiter((w for nbrs in adjacency for w, _ in nbrs), dtype=np.int32,
+                                   count=int(self.indptr[-1]))
+        self.slot_edge = np.fromiter((e for nbrs in adjacency for _, e in nbrs), dtype=np.int32,
+                                     count=int(self.indptr[-1]))
+        # 按边分组的 OMS 数组，edge_oms_ptr[eid]:edge_oms_ptr[eid + 1] 为该边的并行 OMS
+        self.edge_oms_ptr = np.zeros(len(edge_oms) + 1, dtype=np.int64)
+        np.cumsum([len(group) for group in edge_oms], out=self.edge_oms_ptr[1:])
+        flat = [oms for group in edge_oms for oms in group]
+        self.oms_ids = np.asarray([oms[0] for oms in flat], dtype=np.int32)
+        self.oms_remote = np.asarray([oms[1] for oms in flat], dtype=np.int32)
+        self.oms_cost = np.asarray([oms[2] for oms in flat], dtype=np.float64)
+        self.oms_distance = np.asarray([oms[3] for oms in flat], dtype=np.float64)
+        self.oms_edge = np.repeat(np.arange(len(edge_oms), dtype=np.int32), np.diff(self.edge_oms_ptr))
+        self._oms_order = np.argsort(self.oms_ids, kind='stable')
+
+        self._adj = None
+        self._directed = None
+
+    # 描述整个图的 numpy 数组，二进制快照按这些字段逐个保存
+    ARRAY_FIELDS = ('node_ids', 'edge_src', 'edge_dst', 'edge_weight', 'edge_distance',
+                    'indptr', 'indices', 'slot_edge', 'edge_oms_ptr', 'oms_ids', 'oms_remote',
+                    'oms_cost', 'oms_distance', 'oms_edge', '_oms_order')
+
+    def to_arrays(self):
+        return {field: getattr(self, field) for field in self.ARRAY_FIELDS}
+
+    @classmethod
+    def from_arrays(cls, arrays, weight_version=0):
+        """由 to_arrays 的结果（可以是内存映射的数组）直接构造图，不重新解析 OMS 数据"""
+        graph = cls.__new__(cls)
+        for field in cls.ARRAY_FIELDS:
+            setattr(graph, field, arrays[field])
+        graph.index_of = {node: i for i, node in enumerate(graph.node_ids.tolist())}
+        graph.weight_version = weight_version
+        graph._adj = None
+        graph._directed = None
+        return graph
+
+    def __getstate__(self):
+        # 搜索用的 Python 列表缓存不参与序列化，加载后按需重建
+        state = self.__dict__.copy()
+        state['_adj'] = None
+        state['_directed'] = None
+        return state
+
+    def _adjacency(self):
+        """
+        搜索热循环使用的邻接表视图：adj[v] = [(邻居, 权重, 边编号), ...]。
+        由 CSR 数组按需生成，元组迭代比 numpy 标量下标访问快得多。
+        """
+        if self._adj is None:
+            indptr = self.indptr.tolist()
+            # 节点号、边号和权重复用同一批 Python 对象，缓存只额外占用元组本身
+            nodes = list(range(len(indptr) - 1))
+            eids = list(range(self.number_of_edges()))
+            weight_objs = {}
+            weights = [weight_objs.setdefault(w, w) for w in self.edge_weight.tolist()]
+            triples = [(nodes[w], weights[e], eids[e])
+                       for w, e in zip(self.indices.tolist(), self.slot_edge.tolist())]
+            self._adj = [triples[indptr[v]:indptr[v + 1]] for v in range(len(nodes))]
+        return self._adj
+
+    def __contains__(self, node):
+        return node in self.index_of
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        return len(self.edge_src)
+
+    @property
+    def edges(self):
+        return EdgeView(self)
+
+    def edge_id(self, u, v):
+        """返回节点 u、v 之间无向边的编号，不存在时返回 None"""
+        iu, iv = self.index_of.get(u), self.index_of.get(v)
+        if iu is None or iv is None:
+            return None
+        for w, _, eid in self._adjacency()[iu]:
+            if w == iv:
+                return eid
+        return None
+
+    def has_edge(self, u, v):
+        return self.edge_id(u, v) is not None
+
+    def edge_endpoints(self, eid):
+        """边编号对应的 (min, max) 原始节点对"""
+        u, v = int(self.node_ids[self.edge_src[eid]]), int(self.node_ids[self.edge_dst[eid]])
+        return (min(u, v), max(u, v))
+
+    def number_of_oms(self):
+        return len(self.oms_ids)
+
+    def oms_position(self, oms_id):
+        """omsId 在 oms_* 数组中的位置，不存在时返回 None"""
+        pos = int(np.searchsorted(self.oms_ids, oms_id, sorter=self._oms_order))
+        if pos < len(self.oms_ids) and self.oms_ids[self._oms_order[pos]] == oms_id:
+            return int(self._oms_order[pos])
+        return None
+
+    def oms_positions(self, oms_ids):
+        """oms_position 的向量化版本，不存在的 omsId 对应 -1"""
+        oms_ids = np.asarray(oms_ids, dtype=np.int64)
+        if len(self.oms_ids) == 0:
+            return np.full(len(oms_ids), -1, dtype=np.int64)
+        found = np.searchsorted(self.oms_ids, oms_ids, sorter=self._oms_order)
+        found = np.minimum(found, len(self.oms_ids) - 1)
+        positions = self._oms_order[found].astype(np.int64)
+        positions[self.oms_ids[positions] != oms_ids] = -1
+        return positions
+
+    def fiber_positions(self, oms_id):
+        """一对光纤（omsId 与其反向的 remoteOmsId）在 oms_* 数组中的位置"""
+        pos = self.oms_position(oms_id)
+        if pos is None:
+            return []
+        positions = [pos]
+        remote = self.oms_position(int(self.oms_remote[pos]))
+        if remote is not None and remote != pos and self.oms_edge[remote] == self.oms_edge[pos]:
+            positions.append(remote)
+        return positions
+
+    def parallel_oms(self, eid):
+        """边 eid 上所有并行 OMS 的 omsId"""
+        return self.oms_ids[self.edge_oms_ptr[eid]:self.edge_oms_ptr[eid + 1]]
+
+    def aggregate_weight(self, eid, oms_alive):
+        """按 oms_alive 掩码聚合边 eid 的权重（存活 OMS 的最小 cost），全部故障时返回 None"""
+        lo, hi = self.edge_oms_ptr[eid], self.edge_oms_ptr[eid + 1]
+        costs = self.oms_cost[lo:hi][oms_alive[lo:hi]]
+        if len(costs) == 0:
+            return None
+        return float(costs.min())
+
+    def set_edge_weight(self, eid, weight):
+        """修改聚合边的权重，同步更新搜索用的邻接表缓存"""
+        self.edge_weight[eid] = weight
+        self.weight_version = getattr(self, 'weight_version', 0) + 1  # 供依赖边代价的索引判断是否失效
+        self._directed = None
+        if self._adj is None:
+            return
+        for v in (int(self.edge_src[eid]), int(self.edge_dst[eid])):
+            nbrs = self._adj[v]
+            for i, (w, _, e) in enumerate(nbrs):
+                if e == eid:
+                    nbrs[i] = (w, weight, e)
+
+    def path_cost(self, path):
+        """路径上各边 weight 之和"""
+        return sum(float(self.edge_weight[self.edge_id(path[i], path[i + 1])]) for i in range(len(path) - 1))
+
+    def _endpoints(self, source, target):
+        if source not in self.index_of:
+            raise nx.NodeNotFound(f"Source {source} is not in G")
+        if target not in self.index_of:
+            raise nx.NodeNotFound(f"Target {target} is not in G")
+        return self.index_of[source], self.index_of[target]
+
+    def shortest_path(self, source, target, excluded_edge=None, edge_mask=None):
+        """
+        基于二叉堆的双向 Dijkstra，与 nx.shortest_path(weight='weight') 的行为一致。
+        excluded_edge 为需要跳过的边编号，用于在不修改图的情况下模拟单边故障；
+        edge_mask[eid] 为真的边（当前故障的边）同样被跳过，图本身始终不变。
+        """
+        s, t = self._endpoints(source, target)
+        if s == t:
+            return [source]
+        adj = self._adjacency()
+        n = len(adj)
+        inf = float('inf')
+        masked = edge_mask is not None
+        seen = ([inf] * n, [inf] * n)
+        done = (bytearray(n), bytearray(n))
+        preds = ([-1] * n, [-1] * n)
+        seen[0][s] = 0
+        seen[1][t] = 0
+        # 堆元素为 (距离, 序号, 节点)，序号的分配顺序与 networkx 相同，保证等价路径的选择一致
+        fringe = ([(0, 0, s)], [(0, 1, t)])
+        counter = 1
+        finaldist = inf
+        meetnode = -1
+        direction = 1
+        while fringe[0] and fringe[1]:
+            direction = 1 - direction
+            this_fringe = fringe[direction]
+            dist, _, v = heappop(this_fringe)
+            this_done = done[direction]
+            if this_done[v]:
+                continue
+            this_done[v] = 1
+            if done[1 - direction][v]:
+                return self._join_paths(preds, meetnode)
+            this_seen, other_seen, this_preds = seen[direction], seen[1 - direction], preds[direction]
+            for w, weight, eid in adj[v]:
+                if this_done[w] or eid == excluded_edge or (masked and edge_mask[eid]):
+                    continue
+                vw_length = dist + weight
+                if vw_length < this_seen[w]:
+                    this_seen[w] = vw_length
+                    counter += 1
+                    heappush(this_fringe, (vw_length, counter, w))
+                    this_preds[w] = v
+                    other = other_seen[w]
+                    if other < inf and vw_length + other < finaldist:
+                        finaldist, meetnode = vw_length + other, w
+        raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+
+    def shortest_path_tree(self, source_index, excluded_edge=None, edge_mask=None):
+        """
+        单源 Dijkstra（参数和返回值均为稠密编号），跳过 excluded_edge 和 edge_mask 中的边。
+        返回 (dist, pred, order)：距离列表、最短路径树的父节点列表、节点出堆顺序。
+        """
+        adj = self._adjacency()
+        masked = edge_mask is not None
+        n = len(adj)
+        inf = float('inf')
+        dist = [inf] * n
+        pred = [-1] * n
+        done = bytearray(n)
+        order = []
+        dist[source_index] = 0
+        heap = [(0, source_index)]
+        while heap:
+            d, v = heappop(heap)
+            if done[v]:
+                continue
+            done[v] = 1
+            order.append(v)
+            for w, weight, eid in adj[v]:
+                if done[w] or eid == excluded_edge or (masked and edge_mask[eid]):
+                    continue
+                nd = d + weight
+                if nd < dist[w]:
+                    dist[w] = nd
+                    pred[w] = v
+                    heappush(heap, (nd, w))
+        return dist, pred, order
+
+    def _directed_edge_arrays(self):
+        """每条无向边按两个方向展开的 (u, w, weight, eid) 数组，用于向量化扫描"""
+        if self._directed is None:
+            self._directed = (np.concatenate([self.edge_src, self.edge_dst]),
+                              np.concatenate([self.edge_dst, self.edge_src]),
+                              np.concatenate([self.edge_weight, self.edge_weight]),
+                              np.concatenate([np.arange(self.number_of_edges(), dtype=np.int32)] * 2))
+        return self._directed
+
+    def replacement_paths(self, source, target, path, edge_mask=None):
+        """
+        替换路径算法：给定 source 到 target 的一条最短路径 path，
+        一次性求出 path 上每条边分别故障时的最短替换路径。
+
+        只需从 source、target 各做一次完整 Dijkstra 得到正向/反向最短路径树。
+        对树中每个节点标记它挂在 path 上的哪个位置（label），边 e_i 故障后，
+        替换路径一定经过某条“跨越边” (u, w)：label_s(u) <= i < label_t(w)，
+        其长度为 d_s(u) + c(u, w) + d_t(w)，对所有跨越边做向量化扫描即可。
+
+        返回与 path 的边一一对应的列表，元素为节点路径或 None（该边故障时不连通）；
+        若 path 不是最短路径（例如业务已切换到绕行路径），返回 None，由调用方逐边计算。
+        edge_mask 中的边（当前故障的边）视为不存在。
+        """
+        s, t = self._endpoints(source, target)
+        P = [self.index_of[v] for v in path]
+        k = len(P) - 1
+        if k <= 0:
+            return []
+        path_eids = []
+        cost = 0
+        for i in range(k):
+            eid = self.edge_id(path[i], path[i + 1])
+            if eid is None or (edge_mask is not None and edge_mask[eid]):
+                return None
+            path_eids.append(eid)
+            cost += float(self.edge_weight[eid])
+
+        ds, ps, order_s = self.shortest_path_tree(s, edge_mask=edge_mask)
+        if abs(cost - ds[t]) > 1e-9 * max(1.0, abs(cost)):
+            return None
+        dt, pt, order_t = self.shortest_path_tree(t, edge_mask=edge_mask)
+
+        # 让两棵树在 path 上严格沿 path 走，并计算每个节点挂在 path 上的位置
+        n = len(ds)
+        label_s = [-1] * n
+        label_t = [-1] * n
+        for i, v in enumerate(P):
+            label_s[v] = i
+            label_t[v] = i
+            if i > 0:
+                ps[v] = P[i - 1]
+            if i < k:
+                pt[v] = P[i + 1]
+        for v in order_s:
+            if label_s[v] < 0:
+                label_s[v] = label_s[ps[v]]
+        for v in order_t:
+            if label_t[v] < 0:
+                label_t[v] = label_t[pt[v]]
+
+        u_arr, w_arr, c_arr, e_arr = self._directed_edge_arrays()
+        ls = np.asarray(label_s)[u_arr]
+        lt = np.asarray(label_t)[w_arr]
+        # 跨越边不能是 path 自身的边，也不能是当前故障的边
+        blocked = np.zeros(self.number_of_edges(), dtype=bool)
+        blocked[path_eids] = True
+        if edge_mask is not None:
+            blocked |= np.frombuffer(bytes(edge_mask), dtype=np.uint8).astype(bool)
+        candidates = np.nonzero((ls >= 0) & (lt > ls) & ~blocked[e_arr])[0]
+        ls, lt = ls[candidates], lt[candidates]
+        values = np.asarray(ds)[u_arr[candidates]] + c_arr[candidates] + np.asarray(dt)[w_arr[candidates]]
+
+        node_ids = self.node_ids
+        results = []
+        for i in range(k):
+            crossing = np.nonzero((ls <= i) & (lt > i))[0]
+            if len(crossing) == 0:
+                results.append(None)
+                continue
+            best = candidates[crossing[np.argmin(values[crossing])]]
+            u, w = int(u_arr[best]), int(w_arr[best])
+            head = []
+            while u >= 0:
+                head.append(u)
+                u = ps[u]
+            head.reverse()
+            while w >= 0:
+                head.append(w)
+                w = pt[w]
+            results.append([int(node_ids[v]) for v in head])
+        return results
+
+    def bidirectional_bfs(self, source, target, excluded_edge=None, edge_mask=None):
+        """双向 BFS（忽略权重），与 nx.bidirectional_shortest_path 的行为一致；跳过 edge_mask 中的边"""
+        s, t = self._endpoints(source, target)
+        if s == t:
+            return [source]
+        adj = self._adjacency()
+        masked = edge_mask is not None
+        n = len(adj)
+        pred = [-2] * n  # -2 表示未访问，-1 表示搜索起点
+        succ = [-2] * n
+        pred[s] = -1
+        succ[t] = -1
+        forward_fringe = [s]
+        reverse_fringe = [t]
+        meet = -1
+        while forward_fringe and reverse_fringe and meet < 0:
+            if len(forward_fringe) <= len(reverse_fringe):
+                this_level, forward_fringe = forward_fringe, []
+                for v in this_level:
+                    for w, _, eid in adj[v]:
+                        if eid == excluded_edge or (masked and edge_mask[eid]):
+                            continue
+                        if pred[w] == -2:
+                            forward_fringe.append(w)
+                            pred[w] = v
+                        if succ[w] != -2:
+                            meet = w
+                            break
+                    if meet >= 0:
+                        break
+            else:
+                this_level, reverse_fringe = reverse_fringe, []
+                for v in this_level:
+                    for w, _, eid in adj[v]:
+                        if eid == excluded_edge or (masked and edge_mask[eid]):
+                            continue
+                        if succ[w] == -2:
+                            succ[w] = v
+                            reverse_fringe.append(w)
+                        if pred[w] != -2:
+                            meet = w
+                            break
+                    if meet >= 0:
+                        break
+        if meet < 0:
+            raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+        return self._join_paths((pred, succ), meet)
+
+    def local_search(self, s, t, excluded_edge=None, edge_mask=None, blocked=(), max_cost=None):
+        """
+        局部的双向加权 Dijkstra（s、t 为稠密编号），用字典记录访问过的节点，开销只与搜索到的范围有关。
+        blocked 中的节点不能经过，单侧代价超过 max_cost 的扩展被剪掉。
+        返回 (cost, 稠密编号路径)，找不到时返回 None。
+        """
+        if s == t:
+            return 0, [s]
+        adj = self._adjacency()
+        inf = float('inf')
+        bound = inf if max_cost is None else max_cost
+        masked = edge_mask is not None
+        seen = ({s: 0}, {t: 0})
+        done = (set(), set())
+        preds = ({s: -1}, {t: -1})
+        fringe = ([(0, s)], [(0, t)])
+        finaldist = inf
+        meetnode = -1
+        direction = 1
+        while fringe[0] and fringe[1]:
+            direction = 1 - direction
+            this_fringe = fringe[direction]
+            dist, v = heappop(this_fringe)
+            this_done = done[direction]
+            if v in this_done:
+                continue
+            this_done.add(v)
+            if v in done[1 - direction]:
+                break
+            this_seen, other_seen, this_preds = seen[direction], seen[1 - direction], preds[direction]
+            for w, weight, eid in adj[v]:
+                if w in this_done or w in blocked or eid == excluded_edge or (masked and edge_mask[eid]):
+                    continue
+                vw_length = dist + weight
+                if vw_length > bound:
+                    continue
+                if vw_length < this_seen.get(w, inf):
+                    this_seen[w] = vw_length
+                    heappush(this_fringe, (vw_length, w))
+                    this_preds[w] = v
+                    other = other_seen.get(w, inf)
+                    if vw_length + other < finaldist:
+                        finaldist, meetnode = vw_length + other, w
+        if meetnode < 0 or finaldist > bound:
+            return None
+        forward, backward = preds
+        path = []
+        v = meetnode
+        while v >= 0:
+            path.append(v)
+            v = forward[v]
+        path.reverse()
+        v = backward[meetnode]
+        while v >= 0:
+            path.append(v)
+            v = backward[v]
+        return finaldist, path
+
+    def repair_path(self, path, excluded_edge=None, edge_mask=None, radius=1, max_stretch=3.0, eids=None):
+        """
+        局部修复：只替换 path（原始节点 ID）上不可用边附近的一段，其余部分保持不变。
+        不可用的边为 excluded_edge 以及 edge_mask 中的边；在最靠外的不可用边两侧各 radius 跳的路径节点之间
+        做局部搜索（不经过路径上其余节点，代价不超过原段代价的 max_stretch 倍），找不到时 radius 加倍，
+        直到覆盖整条路径。返回修复后的节点路径，路径上没有不可用边时原样返回，无法修复时返回 None。
+        已知路径的边编号时可通过 eids 传入。
+        """
+        if eids is None:
+            eids = self.path_edge_ids(path)
+        bad = [i for i, eid in enumerate(eids)
+               if eid == excluded_edge or (edge_mask is not None and edge_mask[eid])]
+        if not bad:
+            return list(path)
+        index_of, node_ids, weights = self.index_of, self.node_ids, self.edge_weight
+        dense = [index_of[v] for v in path]
+        last = len(dense) - 1
+        while True:
+            lo, hi = max(0, bad[0] - radius), min(last, bad[-1] + 1 + radius)
+            bound = None
+            if max_stretch is not None:
+                bound = max_stretch * float(weights[eids[lo:hi]].sum())
+            blocked = set(dense[:lo])
+            blocked.update(dense[hi + 1:])
+            found = self.local_search(dense[lo], dense[hi], excluded_edge, edge_mask, blocked, bound)
+            if found is not None:
+                detour = [int(node_ids[v]) for v in found[1]]
+                return list(path[:lo]) + detour + list(path[hi + 1:])
+            if lo == 0 and hi == last:
+                return None
+            radius *= 2
+
+    def constrained_shortest_path(self, s, t, edge_mask=None, node_mask=None):
+        """
+        带屏蔽的单向 Dijkstra（参数和返回的路径均为稠密编号），找到 t 即停止。
+        edge_mask[eid] / node_mask[v] 为真表示该边 / 节点不可用。返回 (距离, 路径)，无路径时返回 None。
+        """
+        adj = self._adjacency()
+        n = len(adj)
+        inf = float('inf')
+        dist = [inf] * n
+        pred = [-1] * n
+        done = bytearray(n)
+        dist[s] = 0
+        heap = [(0, s)]
+        while heap:
+            d, v = heappop(heap)
+            if done[v]:
+                continue
+            if v == t:
+                path = []
+                while v >= 0:
+                    path.append(v)
+                    v = pred[v]
+                path.reverse()
+                return d, path
+            done[v] = 1
+            for w, weight, eid in adj[v]:
+                if done[w] or (edge_mask is not None and edge_mask[eid]) or (node_mask is not None and node_mask[w]):
+                    continue
+                nd = d + weight
+                if nd < dist[w]:
+                    dist[w] = nd
+                    pred[w] = v
+                    heappush(heap, (nd, w))
+        return None
+
+    def k_shortest_paths(self, source, target, k, edge_mask=None):
+        """
+        Yen 算法求 source 到 target 的前 k 条无环最短路径（按 cost 升序）。
+        返回 [(cost, 路径), ...]，路径为原始节点 ID。edge_mask 为全局不可用的边。
+        """
+        s, t = self._endpoints(source, target)
+        m = self.number_of_edges()
+        base_mask = bytearray(m) if edge_mask is None else bytearray(edge_mask)
+        first = self.constrained_shortest_path(s, t, base_mask)
+        if first is None:
+            return []
+        adj = self._adjacency()
+
+        def edge_between(u, v):
+            for w, weight, eid in adj[u]:
+                if w == v:
+                    return eid, weight
+            return None, None
+
+        found = [first]
+        seen = {tuple(first[1])}
+        candidates = []
+        while len(found) < k:
+            _, prev = found[-1]
+            root_cost = 0
+            for j in range(len(prev) - 1):
+                spur = prev[j]
+                root = prev[:j + 1]
+                mask = bytearray(base_mask)
+                for _, p in found:
+                    if len(p) > j + 1 and p[:j + 1] == root:
+                        mask[edge_between(p[j], p[j + 1])[0]] = 1
+                node_mask = bytearray(len(adj))
+                for v in root[:-1]:
+                    node_mask[v] = 1
+                spur_result = self.constrained_shortest_path(spur, t, mask, node_mask)
+                if spur_result is not None:
+                    path = root[:-1] + spur_result[1]
+                    if tuple(path) not in seen:
+                        seen.add(tuple(path))
+                        heappush(candidates, (root_cost + spur_result[0], len(seen), path))
+                root_cost += edge_between(prev[j], prev[j + 1])[1]
+            if not candidates:
+                break
+            cost, _, path = heappop(candidates)
+            found.append((cost, path))
+        node_ids = self.node_ids
+        return [(cost, [int(node_ids[v]) for v in path]) for cost, path in found]
+
+    def path_edge_ids(self, path):
+        """原始节点路径对应的边编号列表"""
+        return [self.edge_id(path[i], path[i + 1]) for i in range(len(path) - 1)]
+
+    def _join_paths(self, preds, meetnode):
+        """根据前向/反向前驱数组拼接经过 meetnode 的完整路径（返回原始节点 ID）"""
+        forward, backward = preds
+        path = []
+        v = meetnode
+        while v >= 0:
+            path.append(v)
+            v = forward[v]
+        path.reverse()
+        v = backward[meetnode]
+        while v >= 0:
+            path.append(v)
+            v = backward[v]
+        node_ids = self.node_ids
+        return [int(node_ids[v]) for v in path]
@@ -1,36 +1,14 @@
 # src/initial_path_calculation.py
-import pickle
-import json
+import os
 import csv
-from data_handler import load_nodes, load_oms_links, load_relays, load_services
+from data_handler import load_node_table, load_oms_table, load_relay_table, load_service_table
+from landmarks import LandmarkIndex, landmark_file
+from metrics import configure_logging
 from path_calculator import PathCalculator
+from state_snapshot import save_state
 
-def tuple_to_string_key(data):
-    if isinstance(data, dict):
-        new_data = {}
-        for key, value in data.items():
-            if isinstance(key, tuple):
-                key = str(key)
-            new_data[key] = tuple_to_string_key(value)
-        return new_data
-    elif isinstance(data, list):
-        return [tuple_to_string_key(item) for item in data]
-    else:
-        return data
-
-def save_initial_data(path_calculator, file_name):
-    data = {
-        'paths_in_use': tuple_to_string_key(path_calculator.paths_in_use),
-        'backup_paths': tuple_to_string_key(path_calculator.backup_paths),
-        # 'paths_in_use': path_calculator.paths_in_use,  # 业务索引保持 int
-        # 'backup_paths': path_calculator.backup_paths,  # 业务索引保持 int
-        'edge_service_matrix': tuple_to_string_key(path_calculator.edge_service_matrix)
-    }
-    with open(file_name, 'w') as file:
-        json.dump(data, file, indent=4)
-
-def save_to_csv(path_calculator, paths_csv, backup_csv):
-    """保存 paths_in_use 和 backup_paths 到 CSV 文件"""
+def save_to_csv(path_calculator, paths_csv, backup_csv, backup_refs_csv):
+    """保存 paths_in_use、共享备用路径表和业务引用关系到 CSV 文件"""
     # 保存 paths_in_use 到 CSV 文件
     with open(paths_csv, 'w', newline='') as csv_file:
         writer = csv.writer(csv_file)
@@ -38,39 +16,44 @@ def save_to_csv(path_calculator, paths_csv, backup_csv):
         for service_index, data in path_calculator.paths_in_use.items():
             writer.writerow([service_index, data['path'], data['edges']])
 
-    # 保存 backup_paths 到 CSV 文件
+    # 保存共享备用路径表到 CSV 文件，每条路径只写一次
+    table = path_calculator.backup_table
     with open(backup_csv, 'w', newline='') as csv_file:
         writer = csv.writer(csv_file)
-        writer.writerow(['Service Index', 'Failed Edge', 'Backup Path', 'Backup Edges'])
-        for service_index, edge_paths in path_calculator.backup_paths.items():
-            for edge, path_info in edge_paths.items():
-                writer.writerow([service_index, edge, path_info['path'], path_info['edges']])
+        writer.writerow(['Handle', 'Src', 'Snk', 'Failed Edge', 'Backup Path', 'Backup Edges'])
+        for handle, ((src, snk, edge), path_info) in enumerate(zip(table.keys, table.entries)):
+            writer.writerow([handle, src, snk, edge, path_info['path'], path_info['edges']])
+
+    # 保存业务到备用路径句柄的引用关系
+    with open(backup_refs_csv, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['Service Index', 'Failed Edge', 'Handle'])
+        for service_index, edge_handles in path_calculator.backup_paths.items():
+            for edge, handle in edge_handles.items():
+                writer.writerow([service_index, edge, handle])
 
 def initial_path_calculation():
+    configure_logging('INFO')
     # 加载数据
-    nodes = load_nodes('data/node.csv')
-    oms_links = load_oms_links('data/oms.csv')
-    relays = load_relays('data/relay.csv')
-    services = load_services('data/service.csv')
+    nodes = load_node_table('data/node.csv')
+    oms_links = load_oms_table('data/oms.csv')
+    relays = load_relay_table('data/relay.csv')
+    services = load_service_table('data/service.csv')
 
-    # 初始化路径计算器并计算路径
+    # 初始化路径计算器，构建（或复用与 cost 一致的）ALT 地标索引后计算路径
     path_calculator = PathCalculator(oms_links)
+    path_calculator.use_landmarks(LandmarkIndex.load_or_build(path_calculator.G, landmark_file('results/initial_state.snap')))
     path_calculator.calculate_paths(services)
 
-    # 计算备用路径
-    path_calculator.recompute_backup_paths()
+    # 计算备用路径（按 CPU 核数并行）
+    path_calculator.recompute_backup_paths(workers=os.cpu_count())
 
-    # 保存初始路径计算结果到 JSON 文件
-    save_initial_data(path_calculator, 'results/initial_paths_data.json')
+    # 保存图、路径、备用路径表和故障状态到二进制快照
+    save_state(path_calculator, 'results/initial_state.snap')
 
     # 保存初始路径计算结果到 CSV 文件
-    save_to_csv(path_calculator, 'results/paths.csv', 'results/backup_paths.csv')
-    
-    # 保存图的结构到 pickle 文件
-    with open('results/graph_structure.pkl', 'wb') as f:
-        pickle.dump(path_calculator.G, f)
-        
-        
+    save_to_csv(path_calculator, 'results/paths.csv', 'results/backup_paths.csv', 'results/backup_refs.csv')
+
     print("Initial path calculation complete and data saved.")
 
 if __name__ == "__main__":
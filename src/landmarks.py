@@ -0,0 +1,172 @@
+# src/landmarks.py
+
+import hashlib
+import os
+from heapq import heappush, heappop
+
+import networkx as nx
+import numpy as np
+from metrics import get_logger
+
+logger = get_logger('landmarks')
+
+# 索引格式版本，字段变化时递增，旧文件会被自动重建
+LANDMARK_VERSION = 1
+
+
+def cost_digest(graph):
+    """图结构和边代价的哈希：节点编号、边端点或 cost 任一变化，持久化的索引即失效"""
+    sha1 = hashlib.sha1()
+    for array in (graph.node_ids, graph.edge_src, graph.edge_dst, graph.edge_weight):
+        sha1.update(np.ascontiguousarray(array).tobytes())
+    return sha1.hexdigest()
+
+
+def landmark_file(graph_file):
+    """与 graph_structure.pkl 放在一起的索引文件名"""
+    return os.path.splitext(graph_file)[0] + '.landmarks.npz'
+
+
+class LandmarkIndex:
+    """
+    ALT（A*, Landmarks, Triangle inequality）最短路径索引。
+    预先从 k 个地标节点各做一次 Dijkstra，查询时用三角不等式 |d(L, t) - d(L, v)| 作为 A* 的下界势函数，
+    搜索范围比 Dijkstra 小得多。故障位图只会删掉边、OMS 故障只会抬高聚合边的代价，下界依然成立，
+    所以带故障掩码的查询可以直接使用同一份索引；只有某条边的代价低于建索引时的代价才需要重建。
+    """
+    def __init__(self, graph, landmarks, dist, weights):
+        self.graph = graph
+        self.landmarks = np.asarray(landmarks, dtype=np.int64)  # 地标的稠密编号
+        self.dist = np.asarray(dist, dtype=np.float64)          # (k, n) 地标到各节点的距离
+        self.weights = np.asarray(weights, dtype=np.float64)    # 建索引时的边代价
+        self._rows = self.dist.T.tolist()  # 按节点取 k 个距离，A* 热循环中使用
+        self._checked_version = getattr(graph, 'weight_version', 0)
+        self.active = 4  # 每次查询使用的地标数
+
+    @classmethod
+    def build(cls, graph, k=16):
+        """
+        选取 k 个地标（farthest-point：每次取离已选地标最远的节点，尚未覆盖的连通分量优先）
+        并计算地标到全部节点的距离。
+        """
+        n = graph.number_of_nodes()
+        k = min(k, n)
+        inf = float('inf')
+        landmarks, rows = [], []
+        if k:
+            # 从离 0 号节点最远的节点开始
+            dist = np.asarray(graph.shortest_path_tree(0)[0], dtype=np.float64)
+            candidate = int(np.argmax(np.where(np.isfinite(dist), dist, -1)))
+            nearest = np.full(n, inf)
+            while True:
+                landmarks.append(candidate)
+                dist = np.asarray(graph.shortest_path_tree(candidate)[0], dtype=np.float64)
+                rows.append(dist)
+                if len(landmarks) == k:
+                    break
+                nearest = np.minimum(nearest, dist)  # 未覆盖的节点为 inf，优先被选中
+                nearest[landmarks] = -1
+                candidate = int(np.argmax(nearest))
+        dist = np.array(rows, dtype=np.float64).reshape(len(rows), n)
+        return cls(graph, landmarks, dist, graph.edge_weight.copy())
+
+    def save(self, file_path):
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        tmp_path = file_path + '.tmp.npz'
+        np.savez(tmp_path, __version__=np.array(LANDMARK_VERSION), __digest__=np.array(cost_digest(self.graph)),
+                 landmarks=self.landmarks, dist=self.dist, weights=self.weights)
+        os.replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path, graph):
+        """读取持久化的索引；文件不存在、版本不符或图的代价已变化时返回 None"""
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with np.load(file_path, allow_pickle=False) as data:
+                if int(data['__version__']) != LANDMARK_VERSION or str(data['__digest__']) != cost_digest(graph):
+                    return None
+                return cls(graph, data['landmarks'], data['dist'], data['weights'])
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("Ignoring unreadable landmark index %s: %s", file_path, e)
+            return None
+
+    @classmethod
+    def load_or_build(cls, graph, file_path, k=16):
+        """优先读取与图代价一致的索引，否则重新构建并写回 file_path"""
+        index = cls.load(file_path, graph)
+        if index is None:
+            index = cls.build(graph, k)
+            try:
+                index.save(file_path)
+            except OSError as e:
+                logger.warning("Could not write landmark index %s: %s", file_path, e)
+        return index
+
+    def refresh(self):
+        """
+        边代价变化后检查下界是否仍然成立：代价只升不降时保留索引，否则按当前代价重建。
+        返回是否重建。
+        """
+        version = getattr(self.graph, 'weight_version', 0)
+        if version == self._checked_version:
+            return False
+        self._checked_version = version
+        if np.all(self.graph.edge_weight >= self.weights):
+            return False
+        rebuilt = LandmarkIndex.build(self.graph, len(self.landmarks))
+        self.landmarks, self.dist, self.weights, self._rows = rebuilt.landmarks, rebuilt.dist, rebuilt.weights, rebuilt._rows
+        return True
+
+    def shortest_path(self, source, target, excluded_edge=None, edge_mask=None):
+        """
+        ALT 势函数引导的 A* 最短路径（参数为原始节点 ID），跳过 excluded_edge 和 edge_mask 中的边。
+        返回原始节点 ID 路径，无路径时抛出 nx.NetworkXNoPath。
+        """
+        self.refresh()
+        graph = self.graph
+        s, t = graph._endpoints(source, target)
+        if s == t:
+            return [source]
+        adj = graph._adjacency()
+        rows = self._rows
+        inf = float('inf')
+        masked = edge_mask is not None
+        # 只用对 (s, t) 下界最紧的 active 个地标（目标所在连通分量之外的地标不提供信息），
+        # 每次计算势函数的开销与 active 成正比而不是与 k 成正比
+        target_row, source_row = rows[t], rows[s]
+        live = sorted(((i, d) for i, d in enumerate(target_row) if d < inf),
+                      key=lambda item: -abs(item[1] - source_row[item[0]]))[:self.active]
+        potential = {t: 0.0}
+        g = {s: 0}
+        pred = {s: -1}
+        closed = set()
+        heap = [(0, 0, s)]
+        while heap:
+            _, d, v = heappop(heap)
+            if v in closed:
+                continue
+            if v == t:
+                path = []
+                while v >= 0:
+                    path.append(v)
+                    v = pred[v]
+                node_ids = graph.node_ids
+                return [int(node_ids[v]) for v in reversed(path)]
+            closed.add(v)
+            for w, weight, eid in adj[v]:
+                if w in closed or eid == excluded_edge or (masked and edge_mask[eid]):
+                    continue
+                nd = d + weight
+                if nd < g.get(w, inf):
+                    h = potential.get(w)
+                    if h is None:
+                        row = rows[w]
+                        h = max([abs(d_t - row[i]) for i, d_t in live], default=0.0)
+                        potential[w] = h
+                    if h == inf:
+                        continue  # w 与目标不连通
+                    g[w] = nd
+                    pred[w] = v
+                    heappush(heap, (nd + h, nd, w))
+        raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
@@ -1,62 +1,17 @@
 # src/main.py
 
-import json
-from data_handler import load_nodes, load_oms_links, load_relays, load_services
+from data_handler import load_node_table, load_oms_table, load_relay_table, load_service_table
+from failure_simulation import save_simulation_state
+from metrics import configure_logging
 from path_calculator import PathCalculator
 from simulator import NetworkSimulator
 
-def tuple_to_string_key(data):
-    if isinstance(data, dict):
-        new_data = {}
-        for key, value in data.items():
-            if isinstance(key, tuple):
-                key = str(key)
-            new_data[key] = tuple_to_string_key(value)
-        return new_data
-    elif isinstance(data, list):
-        return [tuple_to_string_key(item) for item in data]
-    else:
-        return data
-
-def string_key_to_tuple(data):
-    if isinstance(data, dict):
-        new_data = {}
-        for key, value in data.items():
-            if isinstance(key, str) and key.startswith('(') and key.endswith(')'):
-                key = eval(key)
-            new_data[key] = string_key_to_tuple(value)
-        return new_data
-    elif isinstance(data, list):
-        return [string_key_to_tuple(item) for item in data]
-    else:
-        return data
-
-def load_init_data(file_name):
-    with open(file_name, 'r') as file:
-        data = json.load(file)
-
-    data['paths_in_use'] = string_key_to_tuple(data['paths_in_use'])
-    data['backup_paths'] = string_key_to_tuple(data['backup_paths'])
-    data['edge_service_matrix'] = string_key_to_tuple(data['edge_service_matrix'])
-
-    return data
-
-def save_simulation_data(path_calculator, failed_edges, recovered_edges, file_name):
-    data = {
-        'paths_in_use': tuple_to_string_key(path_calculator.paths_in_use),
-        'backup_paths': tuple_to_string_key(path_calculator.backup_paths),
-        'edge_service_matrix': tuple_to_string_key(path_calculator.edge_service_matrix),
-        'failed_edges': failed_edges,
-        'recovered_edges': recovered_edges
-    }
-    with open(file_name, 'w') as file:
-        json.dump(data, file, indent=4)
-
 def main():
-    nodes = load_nodes('data/node.csv')
-    oms_links = load_oms_links('data/oms.csv')
-    relays = load_relays('data/relay.csv')
-    services = load_services('data/service.csv')
+    configure_logging('INFO', 'results/simulation_log.txt')
+    nodes = load_node_table('data/node.csv')
+    oms_links = load_oms_table('data/oms.csv')
+    relays = load_relay_table('data/relay.csv')
+    services = load_service_table('data/service.csv')
 
     path_calculator = PathCalculator(oms_links)
     path_calculator.calculate_paths(services)
@@ -94,8 +49,8 @@ def main():
         elif action == 'q':
             break
 
-        # 每次保存状态
-        save_simulation_data(path_calculator, failed_edges, recovered_edges, 'results/simulation_state.json')
+        # 每次保存状态（CSR 后端写二进制快照 results/simulation_state.snap）
+        save_simulation_state(path_calculator, failed_edges, recovered_edges)
         print("Simulation state saved.")
 
 if __name__ == "__main__":
@@ -0,0 +1,196 @@
+# src/metrics.py
+
+import csv
+import json
+import logging
+import math
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# 所有模块的日志记录器都挂在这个名字下，入口脚本通过 configure_logging 统一设置级别和输出
+LOGGER_NAME = 'network_simulation'
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+
+LATENCY_BASE = 1e-6  # 延迟直方图的最小桶（1 微秒）
+COUNT_BASE = 1       # 计数类直方图（如受影响业务数）的最小桶
+
+
+def get_logger(name):
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
+
+
+def configure_logging(level='INFO', log_file=None):
+    """
+    入口脚本调用：控制台输出 level 及以上的日志；给出 log_file 时另把 INFO 及以上的事件汇总追加到文件。
+    未配置时所有日志都被丢弃，debug / info 调用只做一次级别判断。
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        if not isinstance(handler, logging.NullHandler):
+            logger.removeHandler(handler)
+            handler.close()
+    level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(level)
+    console.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(console)
+    logger_level = level
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setLevel(logging.INFO)
+        file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        logger.addHandler(file_handler)
+        logger_level = min(level, logging.INFO)
+    logger.setLevel(logger_level)
+    logger.propagate = False
+
+
+@contextmanager
+def log_level(level):
+    """临时修改控制台输出的级别（如批量回放时屏蔽逐业务的日志），退出时恢复"""
+    logger = logging.getLogger(LOGGER_NAME)
+    consoles = [h for h in logger.handlers if type(h) is logging.StreamHandler]
+    saved = [h.level for h in consoles]
+    for handler in consoles:
+        handler.setLevel(level)
+    try:
+        yield
+    finally:
+        for handler, old in zip(consoles, saved):
+            handler.setLevel(old)
+
+
+class Histogram:
+    """
+    以 2 为底的对数分桶直方图：第 i 个桶的上界为 base * 2**i，常数内存、O(1) 记录。
+    分位数取所在桶的上界（不超过观测到的最大值），相对误差不超过 2 倍。
+    """
+    __slots__ = ('base', 'buckets', 'count', 'total', 'min', 'max')
+
+    def __init__(self, base=LATENCY_BASE):
+        self.base = base
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value):
+        bucket = 0 if value <= self.base else math.ceil(math.log2(value / self.base))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for bucket, n in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.base * 2 ** bucket, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        return {'count': self.count, 'sum': self.total, 'mean': self.total / self.count, 'min': self.min,
+                'p50': self.quantile(0.5), 'p90': self.quantile(0.9), 'p99': self.quantile(0.99), 'max': self.max}
+
+    def to_dict(self):
+        data = self.summary()
+        data['base'] = self.base
+        data['buckets'] = {str(bucket): n for bucket, n in sorted(self.buckets.items())}
+        return data
+
+
+class Metrics:
+    """
+    故障处理的计数器和直方图。
+    计数器按名称累加（如 switch.backup / switch.local / switch.cache / switch.dijkstra、search.dijkstra），
+    直方图记录各阶段耗时（秒）和受影响业务数等分布。enabled=False 时 count / observe 直接返回。
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.counters = {}
+        self.histograms = {}
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value, base=LATENCY_BASE):
+        if self.enabled:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(base)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name):
+        """记录 with 块的耗时到直方图 name（用于非热路径；热路径直接调用 observe）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
+
+    def merge(self, other):
+        """合并另一份 Metrics（如多个进程 / 多次复制的结果）"""
+        for name, n in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + n
+        for name, histogram in other.histograms.items():
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(histogram.base)
+            self.histograms[name].merge(histogram)
+
+    def to_dict(self):
+        return {'counters': dict(sorted(self.counters.items())),
+                'histograms': {name: h.to_dict() for name, h in sorted(self.histograms.items())}}
+
+    def export_jsonl(self, file_name, **labels):
+        """每次调用追加一行：时间戳、labels、全部计数器和直方图（含分桶）"""
+        os.makedirs(os.path.dirname(os.path.abspath(file_name)), exist_ok=True)
+        record = {'time': time.time(), **labels, **self.to_dict()}
+        with open(file_name, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def export_csv(self, file_name):
+        """覆盖写出当前的汇总：计数器一行一个，直方图给出 count / mean / 分位数"""
+        os.makedirs(os.path.dirname(os.path.abspath(file_name)), exist_ok=True)
+        columns = ['count', 'sum', 'mean', 'min', 'p50', 'p90', 'p99', 'max']
+        with open(file_name, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['Type', 'Name', 'Value'] + [c.capitalize() for c in columns])
+            for name, n in sorted(self.counters.items()):
+                writer.writerow(['counter', name, n] + [''] * len(columns))
+            for name, histogram in sorted(self.histograms.items()):
+                summary = histogram.summary()
+                writer.writerow(['histogram', name, ''] + [summary.get(c, '') for c in columns])
+
+    def export(self, file_name, **labels):
+        """按扩展名选择格式：.jsonl 追加一行，其他写 CSV"""
+        if file_name.endswith('.jsonl') or file_name.endswith('.json'):
+            self.export_jsonl(file_name, **labels)
+        else:
+            self.export_csv(file_name)
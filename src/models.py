@@ -1,10 +1,127 @@
 # src/models.py
 
-class Node:
+import numpy as np
+
+
+class ColorRanges:
+    """
+    颜色（频隙）集合，按闭区间 [start, end] 存储，形状为 (k, 2) 的 int32 数组。
+    像 ":0-960" 这样的字符串只保存一个区间，不再展开成上千个整数；
+    同时保留列表式的用法（len、迭代、in、真值判断）。
+    """
+    __slots__ = ('intervals',)
+
+    def __init__(self, intervals=None):
+        if intervals is None:
+            intervals = np.empty((0, 2), dtype=np.int32)
+        self.intervals = np.asarray(intervals, dtype=np.int32).reshape(-1, 2)
+
+    def __len__(self):
+        return int((self.intervals[:, 1] - self.intervals[:, 0] + 1).sum())
+
+    def __bool__(self):
+        return len(self.intervals) > 0
+
+    def __iter__(self):
+        for start, end in self.intervals.tolist():
+            yield from range(start, end + 1)
+
+    def __contains__(self, color):
+        return bool(np.any((self.intervals[:, 0] <= color) & (color <= self.intervals[:, 1])))
+
+    def __eq__(self, other):
+        if isinstance(other, ColorRanges):
+            return np.array_equal(self.intervals, other.intervals)
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"ColorRanges({self.to_string()!r})"
+
+    def max(self):
+        return int(self.intervals[:, 1].max()) if len(self.intervals) else None
+
+    def intersection(self, other):
+        """两个颜色集合的交集（按区间求交，不展开颜色）"""
+        a, b = sorted(self.intervals.tolist()), sorted(other.intervals.tolist())
+        i = j = 0
+        intervals = []
+        while i < len(a) and j < len(b):
+            start, end = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+            if start <= end:
+                intervals.append((start, end))
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return ColorRanges(intervals)
+
+    def longest_run(self):
+        """最长的连续颜色段包含的颜色数"""
+        if not len(self.intervals):
+            return 0
+        return int((self.intervals[:, 1] - self.intervals[:, 0] + 1).max())
+
+    def to_bits(self, n_bits):
+        """展开为长度 n_bits 的布尔数组（超出 n_bits 的颜色被截断）"""
+        bits = np.zeros(n_bits, dtype=bool)
+        for start, end in self.intervals.tolist():
+            bits[start:end + 1] = True
+        return bits
+
+    def to_string(self):
+        return ''.join(f":{start}-{end}" if start != end else f":{start}"
+                       for start, end in self.intervals.tolist())
+
+
+def parse_color_intervals(colors_str):
+    """把 ':0-96:864-960' 形式的字符串解析为闭区间列表"""
+    intervals = []
+    if isinstance(colors_str, str) and colors_str:
+        for color_range in colors_str.split(":"):
+            if color_range.strip() == '':
+                continue
+            if '-' in color_range:
+                start, end = map(int, color_range.split('-'))
+            else:
+                start = end = int(color_range)
+            intervals.append((start, end))
+    return intervals
+
+
+def parse_colors(colors):
+    """
+    解析颜色字符串；已经是 ColorRanges 时直接返回（批量加载时同样的字符串共用一个对象），
+    颜色编号列表会合并为连续区间。
+    """
+    if isinstance(colors, ColorRanges):
+        return colors
+    if isinstance(colors, (list, tuple, np.ndarray)):
+        colors = np.unique(np.asarray(colors, dtype=np.int64))
+        breaks = np.flatnonzero(np.diff(colors) != 1) + 1
+        starts = np.concatenate(([0], breaks)) if len(colors) else breaks
+        ends = np.concatenate((breaks - 1, [len(colors) - 1])) if len(colors) else breaks
+        return ColorRanges(np.stack([colors[starts], colors[ends]], axis=1))
+    return ColorRanges(parse_color_intervals(colors))
+
+class Record:
+    """__slots__ 记录类的基类：不带 __dict__，颜色解析共用 parse_colors"""
+    __slots__ = ()
+    parse_colors = staticmethod(parse_colors)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Node(Record):
+    __slots__ = ('node_id',)
+
     def __init__(self, node_id):
         self.node_id = node_id
 
-class OmsLink:
+class OmsLink(Record):
+    __slots__ = ('oms_id', 'remote_oms_id', 'src', 'snk', 'cost', 'distance', 'ots', 'osnr', 'slice', 'colors')
+
     def __init__(self, oms_id, remote_oms_id, src, snk, cost, distance, ots, osnr, slice, colors):
         self.oms_id = oms_id
         self.remote_oms_id = remote_oms_id
@@ -16,22 +133,10 @@ class OmsLink:
         self.osnr = osnr
         self.slice = slice
         self.colors = self.parse_colors(colors)
-    
-    def parse_colors(self, colors_str):
-        available_colors = []
-        if isinstance(colors_str, str) and colors_str:
-            ranges = colors_str.split(":")
-            for color_range in ranges:
-                if color_range.strip() == '':
-                    continue
-                if '-' in color_range:
-                    start, end = map(int, color_range.split('-'))
-                    available_colors.extend(range(start, end + 1))
-                else:
-                    available_colors.append(int(color_range))
-        return available_colors
-
-class Relay:
+
+class Relay(Record):
+    __slots__ = ('relay_id', 'related_relay_id', 'node_id', 'local_id', 'related_local_id', 'dim_colors')
+
     def __init__(self, relay_id, related_relay_id, node_id, local_id, related_local_id, dim_colors):
         self.relay_id = relay_id
         self.related_relay_id = related_relay_id
@@ -40,21 +145,10 @@ class Relay:
         self.related_local_id = related_local_id
         self.dim_colors = self.parse_colors(dim_colors)
 
-    def parse_colors(self, colors_str):
-        available_colors = []
-        if isinstance(colors_str, str) and colors_str:
-            ranges = colors_str.split(":")
-            for color_range in ranges:
-                if color_range.strip() == '':
-                    continue
-                if '-' in color_range:
-                    start, end = map(int, color_range.split('-'))
-                    available_colors.extend(range(start, end + 1))
-                else:
-                    available_colors.append(int(color_range))
-        return available_colors
-
-class Service:
+class Service(Record):
+    __slots__ = ('src', 'snk', 'source_otu', 'target_otu', 'm_width', 'band_type',
+                 'source_dim_colors', 'target_dim_colors')
+
     def __init__(self, src, snk, source_otu, target_otu, m_width, band_type, source_dim_colors, target_dim_colors):
         self.src = src
         self.snk = snk
@@ -64,17 +158,125 @@ class Service:
         self.band_type = band_type
         self.source_dim_colors = self.parse_colors(source_dim_colors)
         self.target_dim_colors = self.parse_colors(target_dim_colors)
-    
-    def parse_colors(self, colors_str):
-        available_colors = []
-        if isinstance(colors_str, str) and colors_str:
-            ranges = colors_str.split(":")
-            for color_range in ranges:
-                if color_range.strip() == '':
-                    continue
-                if '-' in color_range:
-                    start, end = map(int, color_range.split('-'))
-                    available_colors.extend(range(start, end + 1))
-                else:
-                    available_colors.append(int(color_range))
-        return available_colors
+
+
+class ColorColumn:
+    """
+    一列颜色集合的紧凑编码：相同的颜色字符串只存一份区间。
+    第 i 行的区间为 intervals[ptr[codes[i]]:ptr[codes[i] + 1]]。
+    """
+    __slots__ = ('codes', 'ptr', 'intervals', '_shared')
+
+    def __init__(self, codes, ptr, intervals):
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.ptr = np.asarray(ptr, dtype=np.int64)
+        self.intervals = np.asarray(intervals, dtype=np.int32).reshape(-1, 2)
+        self._shared = None
+
+    @classmethod
+    def from_values(cls, values):
+        """由 ColorRanges / 颜色字符串 / 颜色列表构造"""
+        codes, keys, parsed = [], {}, []
+        for value in values:
+            intervals = parse_colors(value).intervals
+            key = intervals.tobytes()
+            code = keys.get(key)
+            if code is None:
+                code = keys[key] = len(parsed)
+                parsed.append(intervals)
+            codes.append(code)
+        ptr = np.zeros(len(parsed) + 1, dtype=np.int64)
+        ptr[1:] = np.cumsum([len(intervals) for intervals in parsed])
+        intervals = np.concatenate(parsed) if parsed else np.empty((0, 2), dtype=np.int32)
+        return cls(codes, ptr, intervals)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def shared(self):
+        """每个不同编码对应的 ColorRanges，按需生成并在行之间共用"""
+        if self._shared is None:
+            self._shared = [ColorRanges(self.intervals[self.ptr[k]:self.ptr[k + 1]])
+                            for k in range(len(self.ptr) - 1)]
+        return self._shared
+
+    def __getitem__(self, i):
+        return self.shared()[self.codes[i]]
+
+    def nonempty(self):
+        """每一行是否配置了颜色"""
+        return np.diff(self.ptr)[self.codes] > 0
+
+    def max(self):
+        return int(self.intervals[:, 1].max()) if len(self.intervals) else None
+
+
+class Table:
+    """
+    按列存储的记录表（struct-of-arrays）。
+    数值列为 NumPy 数组，颜色列为 ColorColumn；
+    按下标访问或迭代时按需生成对应的记录对象（行视图），供沿用逐条记录写法的代码使用。
+    """
+    record = None
+    columns = ()
+    color_columns = ()
+
+    def __init__(self, columns, colors=None):
+        self._columns = {name: np.asarray(columns[name]) for name in self.columns}
+        self._colors = {name: colors[name] for name in self.color_columns} if self.color_columns else {}
+        lengths = {len(column) for column in list(self._columns.values()) + list(self._colors.values())}
+        if len(lengths) > 1:
+            raise ValueError(f"{type(self).__name__} columns have different lengths: {sorted(lengths)}")
+
+    @classmethod
+    def from_records(cls, records):
+        """由记录对象列表构造（兼容原有的逐条构造方式）"""
+        records = list(records)
+        columns = {name: [getattr(record, name) for record in records] for name in cls.columns}
+        colors = {name: ColorColumn.from_values(getattr(record, name) for record in records)
+                  for name in cls.color_columns}
+        return cls(columns, colors)
+
+    def __len__(self):
+        return len(self._columns[self.columns[0]])
+
+    def column(self, name):
+        return self._columns[name]
+
+    def colors(self, name):
+        return self._colors[name]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        values = [self._columns[name][i].item() for name in self.columns]
+        values += [self._colors[name][i] for name in self.color_columns]
+        return self.record(*values)
+
+    def __iter__(self):
+        rows = [self._columns[name].tolist() for name in self.columns]
+        for name in self.color_columns:
+            shared = self._colors[name].shared()
+            rows.append([shared[code] for code in self._colors[name].codes.tolist()])
+        for values in zip(*rows):
+            yield self.record(*values)
+
+
+class NodeTable(Table):
+    record = Node
+    columns = ('node_id',)
+
+class OmsTable(Table):
+    record = OmsLink
+    columns = ('oms_id', 'remote_oms_id', 'src', 'snk', 'cost', 'distance', 'ots', 'osnr', 'slice')
+    color_columns = ('colors',)
+
+class RelayTable(Table):
+    record = Relay
+    columns = ('relay_id', 'related_relay_id', 'node_id', 'local_id', 'related_local_id')
+    color_columns = ('dim_colors',)
+
+class ServiceTable(Table):
+    record = Service
+    columns = ('src', 'snk', 'source_otu', 'target_otu', 'm_width', 'band_type')
+    color_columns = ('source_dim_colors', 'target_dim_colors')
@@ -0,0 +1,242 @@
+# src/monte_carlo.py
+
+import argparse
+import csv
+import heapq
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+from metrics import Metrics, configure_logging
+from simulator import NetworkSimulator
+
+HOURS_PER_YEAR = 8760.0
+FAIL, REPAIR = 0, 1
+
+# 并行复制时每个工作进程的参数（快照文件名和仿真参数）
+_worker_args = None
+
+def _init_replication_worker(args):
+    global _worker_args
+    _worker_args = args
+
+def _replication_worker(seed_seq):
+    state_file, params = _worker_args
+    return run_replication(state_file, seed_seq, **params)
+
+
+class MonteCarloSimulator:
+    """
+    离散事件的故障 / 修复仿真。时间单位为小时。
+    故障单元是一对光纤（omsId 与其 remoteOmsId），故障率与 OMS 的 distance 成正比：
+    每年 cuts_per_1000km * distance / 1000 次，即 MTBF 随距离缩短；修复时间服从均值为 mttr 的
+    指数分布（repair='fixed' 时为定值）。事件放在按时间排序的堆中，每个单元在堆中始终只有一个待发生事件
+    （下一次故障或本次修复），堆的大小等于单元数，每个事件的调度代价为 O(log 单元数)。
+
+    故障和修复通过 NetworkSimulator.simulate_oms_failure / simulate_oms_recovery 交给 PathCalculator 处理。
+    业务在其当前路径经过任何中断的边时记为不可用（handle_failure 找不到可用路径），
+    边修复后原路径恢复可用；据此累计每个业务的不可用时长、中断次数和保护切换次数。
+    """
+    def __init__(self, path_calculator, rng, cuts_per_1000km=4.0, mttr=12.0, repair='exponential'):
+        if path_calculator.backend != 'csr':
+            raise NotImplementedError("Monte Carlo simulation requires the 'csr' backend")
+        if repair not in ('exponential', 'fixed'):
+            raise ValueError(f"Unknown repair distribution {repair!r}")
+        self.path_calculator = path_calculator
+        self.simulator = NetworkSimulator(path_calculator)
+        self.rng = rng
+        self.mttr = mttr
+        self.repair = repair
+
+        # 故障单元：每对光纤取 omsId 较小的一条代表，按 omsId 排序（与随机流的对应关系固定）
+        G = path_calculator.G
+        seen = set()
+        units, rates = [], []
+        for pos in G._oms_order.tolist():
+            if pos in seen:
+                continue
+            oms_id = int(G.oms_ids[pos])
+            seen.update(G.fiber_positions(oms_id))
+            units.append(oms_id)
+            rates.append(cuts_per_1000km * float(G.oms_distance[pos]) / 1000.0 / HOURS_PER_YEAR)
+        self.units = units
+        self.rates = np.asarray(rates, dtype=np.float64)  # 每小时的故障率，distance 为 0 的单元不会故障
+
+    def _time_to_failure(self, unit):
+        rate = self.rates[unit]
+        return self.rng.exponential(1.0 / rate) if rate > 0 else float('inf')
+
+    def _time_to_repair(self):
+        return self.rng.exponential(self.mttr) if self.repair == 'exponential' else self.mttr
+
+    def _unavailable_services(self):
+        """当前路径经过中断边的业务"""
+        matrix = self.path_calculator.edge_service_matrix
+        down = set()
+        for edge in self.path_calculator.down_edges:
+            down |= matrix.get(edge, set())
+        return down
+
+    def run(self, horizon):
+        """
+        仿真 [0, horizon) 小时，返回统计字典：
+        downtime / outages / switches 为 {业务: 值}，另有事件数和耗时。
+        """
+        start = time.time()
+        pc = self.path_calculator
+        # 初始故障时间一次性向量化抽取
+        first = np.full(len(self.units), np.inf)
+        active = self.rates > 0
+        first[active] = self.rng.exponential(1.0 / self.rates[active])
+        queue = [(t, unit, FAIL) for unit, t in enumerate(first.tolist()) if t < horizon]
+        heapq.heapify(queue)
+
+        downtime, outages, switches = {}, {}, {}
+        down_since = {}
+        events = failures = 0
+        while queue and queue[0][0] < horizon:
+            now, unit, kind = heapq.heappop(queue)
+            events += 1
+            oms_id = self.units[unit]
+            if kind == FAIL:
+                failures += 1
+                eid = int(pc.G.oms_edge[pc.G.oms_position(oms_id)])
+                # 只有路径确实发生了变化的业务才记为一次切换，找不到可用路径的业务留在原路径上（记为中断）
+                before = {service_index: pc.paths_in_use.get(service_index)
+                          for service_index in pc.edge_service_matrix.get(pc.G.edge_endpoints(eid), ())}
+                edge = self.simulator.simulate_oms_failure(oms_id)
+                if edge is not None:
+                    for service_index, path_info in before.items():
+                        if pc.paths_in_use.get(service_index) is not path_info:
+                            switches[service_index] = switches.get(service_index, 0) + 1
+                heapq.heappush(queue, (now + self._time_to_repair(), unit, REPAIR))
+            else:
+                self.simulator.simulate_oms_recovery(oms_id, now=now)
+                pc.process_reversions(now)
+                next_failure = now + self._time_to_failure(unit)
+                if next_failure < horizon:
+                    heapq.heappush(queue, (next_failure, unit, FAIL))
+
+            unavailable = self._unavailable_services()
+            for service_index in unavailable.difference(down_since):
+                down_since[service_index] = now
+                outages[service_index] = outages.get(service_index, 0) + 1
+            for service_index in set(down_since).difference(unavailable):
+                since = down_since.pop(service_index)
+                downtime[service_index] = downtime.get(service_index, 0.0) + now - since
+        for service_index, since in down_since.items():
+            downtime[service_index] = downtime.get(service_index, 0.0) + horizon - since
+        return {'horizon': horizon, 'events': events, 'failures': failures, 'downtime': downtime,
+                'outages': outages, 'switches': switches, 'elapsed': time.time() - start}
+
+
+def run_replication(state_file, seed_seq, years=10.0, revertive=False, **params):
+    """从快照加载一份独立的 PathCalculator，用 seed_seq 派生的随机流仿真 years 年"""
+    from failure_simulation import load_path_calculator
+
+    path_calculator, _ = load_path_calculator(state_file)
+    if revertive:
+        path_calculator.enable_revertive()
+    simulator = MonteCarloSimulator(path_calculator, np.random.default_rng(seed_seq), **params)
+    stats = simulator.run(years * HOURS_PER_YEAR)
+    stats['services'] = sorted(path_calculator.paths_in_use)
+    stats['metrics'] = path_calculator.metrics
+    return stats
+
+
+def run_replications(state_file, replications, workers=None, seed=0, **params):
+    """
+    运行 replications 次独立复制，每次使用 SeedSequence(seed) 派生的独立随机流，结果与 workers 无关。
+    workers > 1 时各复制分配到进程池中，每个进程从快照（内存映射）加载自己的基线。
+    """
+    seeds = np.random.SeedSequence(seed).spawn(replications)
+    if not workers or workers <= 1 or replications < 2:
+        return [run_replication(state_file, seed_seq, **params) for seed_seq in seeds]
+    if 'fork' in mp.get_all_start_methods():
+        ctx = mp.get_context('fork')
+    else:
+        ctx = mp.get_context()
+    with ctx.Pool(min(workers, replications), initializer=_init_replication_worker,
+                  initargs=((state_file, params),)) as pool:
+        return list(pool.imap(_replication_worker, seeds))
+
+
+def service_availability(results):
+    """
+    按业务汇总各次复制：平均可用度、最差一次复制的可用度、可用度的标准误差、
+    平均每年的中断次数和保护切换次数、平均每年不可用的小时数。
+    """
+    services = results[0]['services']
+    n = len(results)
+    years = sum(r['horizon'] for r in results) / HOURS_PER_YEAR
+    rows = []
+    for service_index in services:
+        availability = np.array([1.0 - r['downtime'].get(service_index, 0.0) / r['horizon'] for r in results])
+        rows.append({
+            'service': service_index,
+            'availability': float(availability.mean()),
+            'worst': float(availability.min()),
+            'stderr': float(availability.std(ddof=1) / np.sqrt(n)) if n > 1 else 0.0,
+            'downtime_per_year': sum(r['downtime'].get(service_index, 0.0) for r in results) / years,
+            'outages_per_year': sum(r['outages'].get(service_index, 0) for r in results) / years,
+            'switches_per_year': sum(r['switches'].get(service_index, 0) for r in results) / years,
+        })
+    return rows
+
+
+def save_availability_to_csv(rows, file_name):
+    os.makedirs(os.path.dirname(os.path.abspath(file_name)), exist_ok=True)
+    with open(file_name, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['Service Index', 'Availability', 'Worst Replication', 'Std Error',
+                         'Downtime Hours/Year', 'Outages/Year', 'Switches/Year'])
+        for row in rows:
+            writer.writerow([row['service'], f"{row['availability']:.8f}", f"{row['worst']:.8f}",
+                             f"{row['stderr']:.2e}", f"{row['downtime_per_year']:.4f}",
+                             f"{row['outages_per_year']:.4f}", f"{row['switches_per_year']:.4f}"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo failure/repair simulation with per-service availability.")
+    parser.add_argument('--state', default='results/initial_state.snap')
+    parser.add_argument('--years', type=float, default=10.0, help="simulated network time per replication")
+    parser.add_argument('--replications', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cuts-per-1000km', type=float, default=4.0,
+                        help="fibre cuts per 1000 km per year (MTBF scales with OMS distance)")
+    parser.add_argument('--mttr', type=float, default=12.0, help="mean time to repair in hours")
+    parser.add_argument('--repair', choices=('exponential', 'fixed'), default='exponential')
+    parser.add_argument('--revertive', action='store_true', help="re-optimize detoured services after repairs")
+    parser.add_argument('--output', default='results/availability.csv')
+    parser.add_argument('--metrics', default=None,
+                        help="write the merged failure-handling metrics (.jsonl appends a record, otherwise CSV)")
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    start_time = time.time()
+    results = run_replications(args.state, args.replications, args.workers, args.seed, years=args.years,
+                               revertive=args.revertive, cuts_per_1000km=args.cuts_per_1000km,
+                               mttr=args.mttr, repair=args.repair)
+    elapsed = time.time() - start_time
+    rows = service_availability(results)
+    save_availability_to_csv(rows, args.output)
+    if args.metrics:
+        metrics = Metrics()
+        for r in results:
+            metrics.merge(r['metrics'])
+        metrics.export(args.metrics, source='monte_carlo', replications=args.replications, years=args.years)
+
+    events = sum(r['events'] for r in results)
+    sim_time = sum(r['elapsed'] for r in results)
+    availability = np.array([row['availability'] for row in rows])
+    print(f"{args.replications} replications x {args.years:g} years: {events} events in {elapsed:.2f} s "
+          f"({events / sim_time if sim_time > 0 else float('inf'):.1f} events/sec per replication).")
+    print(f"Service availability: mean {availability.mean():.6f}, min {availability.min():.6f}, "
+          f"{int((availability < 0.99999).sum())} services below five nines.")
+
+
+if __name__ == "__main__":
+    main()
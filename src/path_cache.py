@@ -0,0 +1,77 @@
+# src/path_cache.py
+
+from collections import OrderedDict
+
+
+class PathCache:
+    """
+    按 (src, snk) 分组的有界路径缓存池。
+    同一对端点下相同节点序列的路径只保存一份，每组最多保留 max_paths 条，超出时淘汰最久未使用的路径；
+    边 -> 缓存路径的倒排索引使得边故障时可以直接删掉经过该边的全部路径，缓存命中的路径因此总是可用的。
+    """
+    def __init__(self, max_paths=8):
+        self.max_paths = max_paths
+        self.groups = {}      # (src, snk) -> OrderedDict{节点序列: (path_info, 边集合)}，越靠后越近使用
+        self.edge_index = {}  # 边 -> {(src, snk, 节点序列), ...}
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def __len__(self):
+        return sum(len(group) for group in self.groups.values())
+
+    def __contains__(self, path):
+        return (path[0], path[-1]) in self.groups and tuple(path) in self.groups[(path[0], path[-1])]
+
+    def add(self, path_info):
+        """缓存一条路径；已存在时只刷新其使用时间"""
+        path = tuple(path_info['path'])
+        pair = (path[0], path[-1])
+        group = self.groups.setdefault(pair, OrderedDict())
+        if path in group:
+            group.move_to_end(path)
+            return
+        edges = frozenset((min(e[0], e[1]), max(e[0], e[1])) for e in path_info['edges'])
+        group[path] = (path_info, edges)
+        for edge in edges:
+            self.edge_index.setdefault(edge, set()).add(pair + (path,))
+        while len(group) > self.max_paths:
+            self._remove(pair, next(iter(group)))
+            self.stats['evictions'] += 1
+
+    def get(self, src, snk, avoid=None):
+        """
+        返回 src 到 snk 最近使用的、不经过边 avoid 的缓存路径，没有时返回 None。
+        """
+        group = self.groups.get((src, snk))
+        if group:
+            for path in reversed(group):
+                path_info, edges = group[path]
+                if avoid is None or avoid not in edges:
+                    group.move_to_end(path)
+                    self.stats['hits'] += 1
+                    return path_info
+        self.stats['misses'] += 1
+        return None
+
+    def invalidate_edge(self, edge):
+        """删除经过 edge 的全部缓存路径，返回删除的条数"""
+        entries = self.edge_index.pop(edge, ())
+        for src, snk, path in list(entries):
+            self._remove((src, snk), path)
+        self.stats['invalidations'] += len(entries)
+        return len(entries)
+
+    def clear(self):
+        self.groups.clear()
+        self.edge_index.clear()
+
+    def _remove(self, pair, path):
+        group = self.groups[pair]
+        _, edges = group.pop(path)
+        for edge in edges:
+            entries = self.edge_index.get(edge)
+            if entries is not None:
+                entries.discard(pair + (path,))
+                if not entries:
+                    del self.edge_index[edge]
+        if not group:
+            del self.groups[pair]
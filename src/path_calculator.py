@@ -3,26 +3,246 @@
 import networkx as nx
 import csv
 import time
+import multiprocessing as mp
+import numpy as np
+from graph_engine import CSRGraph
+from metrics import COUNT_BASE, Metrics, get_logger
+from path_cache import PathCache
+from path_pool import PathPool, PathRecord
+from path_table import PathTable
+from spectrum import SpectrumState, POLICIES
+from relay_routing import RelayRouter
+
+BACKENDS = ('networkx', 'csr')
+
+logger = get_logger('path_calculator')
+
+# 并行备用路径计算时，每个工作进程持有的只读 PathCalculator
+_worker_calculator = None
+
+def _init_backup_worker(path_calculator):
+    """工作进程初始化：fork 模式下直接继承父进程内存，不会重新序列化图"""
+    global _worker_calculator
+    _worker_calculator = path_calculator
+
+def _backup_worker(paths):
+    """在工作进程中为一批路径计算其上每条边故障时的备用路径"""
+    return [_worker_calculator.compute_backup_paths_along(path) for path in paths]
 
 class PathCalculator:
-    def __init__(self, oms_links):
-        self.G = nx.Graph()
-        self.edge_service_matrix = {}
+    def __init__(self, oms_links, backend='csr', spectrum_policy=None, k_paths=3,
+                 relays=None, max_distance=None, max_noise=None, verify_matrix=False, cache_size=8):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown graph backend: {backend}")
+        if spectrum_policy is not None and spectrum_policy not in POLICIES:
+            raise ValueError(f"Unknown spectrum assignment policy: {spectrum_policy}")
+        self.backend = backend
+        self.spectrum_policy = spectrum_policy  # 频谱分配策略，None 表示不做频谱感知路由
+        self.k_paths = k_paths  # 频谱感知路由时考察的候选路径数
+        self.edge_service_matrix = {}  # 边 -> 当前路径经过该边的业务集合，随路径切换增量维护
+        self.verify_matrix = verify_matrix  # 为 True 时每次路径变化后校验受影响的矩阵条目（用于测试）
         self.paths_in_use = {}
-        self.backup_paths = {}
-        self.path_cache = {}  # 路径缓存池
+        self.backup_paths = {}  # 业务 -> {故障边: backup_table 中的句柄}
+        # backup_paths 的两个倒排索引，随备用路径的变化增量维护
+        self.backup_edge_index = {}      # 故障边 -> 拥有该边备用路径的业务集合
+        self.backup_traverse_index = {}  # 边 -> {备用路径经过该边的业务: 经过的备用路径条数}
+        self.backup_table = PathTable()  # 按 (src, snk, 故障边) 共享的备用路径表
+        self.path_cache = PathCache(cache_size)  # 按 (src, snk) 分组的有界路径缓存池
         self.failed_edges = []  # 初始化失败的边
+        # 故障状态：CSR 后端为按边编号的字节位图，所有搜索都跳过其中的边，图本身保持不变
+        self.edge_mask = None
+        self.down_edges = set()  # 当前不可用的 (min, max) 边
+        self.mask_version = 0    # 故障位图每次变化时递增
+        # 局部重路由：在故障边两侧各 local_radius 跳的路径节点之间找绕行段，代价不超过原段的 local_stretch 倍
+        self.local_radius = 1
+        self.local_stretch = 3.0
+        # 局部重路由结果的备忘（路径句柄, 边编号）-> PathRecord / None，故障位图或边代价变化时清空；
+        # 同一事件中切换到同一路径的业务共享备用路径的计算
+        self._local_memo = {}
+        self._local_memo_state = None
+        self.landmarks = None  # 可选的 ALT 地标索引（LandmarkIndex），由 use_landmarks 设置
+        # 返回式（revertive）恢复：业务的原始路径及其倒排索引，故障恢复后把绕行的业务切回更优路径
+        self.original_paths = {}         # 业务 -> 初始路由得到的路径
+        self.original_edge_index = {}    # 边 -> 原始路径经过该边的业务集合
+        self.revertive = False
+        self.hold_off = 0.0              # 边恢复后需稳定的时间，期间再次故障则放弃回切
+        self.min_cost_gain = 0.0         # 回切所需的最小相对代价收益
+        self.reversion_batch = None      # 每次最多回切的业务数，None 表示不限
+        self.pending_reversions = {}     # 恢复的边 -> 回切的到期时间
+        self.reversion_queue = []        # 到期后等待重优化的业务
+        self.oms_alive = None
+        self.path_pool = None  # CSR 后端的全局路径池（按边编号 intern 的路径）
+        self.spectrum = None
+        self.relay_router = None  # 中继感知路由（RelayRouter），见下
+        # 故障处理的计数器和直方图：各策略的切换次数、各阶段耗时、受影响业务数、最短路径搜索次数
+        self.metrics = Metrics()
         self.initialize_graph(oms_links)
+        if spectrum_policy is not None:
+            if self.backend != 'csr':
+                raise NotImplementedError("Spectrum-aware routing requires the 'csr' backend")
+            self.spectrum = SpectrumState(self.G, oms_links, self.oms_alive)
+        # 中继感知路由：给出中继数据和传输限制（距离 / OSNR 劣化）时启用
+        if relays is not None and (max_distance is not None or max_noise is not None):
+            if self.backend != 'csr':
+                raise NotImplementedError("Relay-aware routing requires the 'csr' backend")
+            if self.spectrum is not None:
+                raise ValueError("Relay-aware routing and spectrum-aware routing cannot be combined")
+            self.relay_router = RelayRouter(self.G, oms_links, relays, max_distance, max_noise)
 
     def initialize_graph(self, oms_links):
+        if self.backend == 'csr':
+            # 紧凑的 CSR 数组图，节点重映射为稠密编号，并行 OMS 按 omsId 单独记录
+            self.G = CSRGraph(oms_links)
+            self.oms_alive = np.ones(self.G.number_of_oms(), dtype=bool)  # 每条 OMS 的存活状态
+            self.path_pool = PathPool(self.G)
+            self.sync_edge_mask()
+            return
+        self.G = nx.Graph()
         for link in oms_links:
             # 直接使用 src 和 snk 作为图的边
             edge = (min(link.src, link.snk), max(link.src, link.snk))  # 规范化边的顺序
+            # 并行链路聚合为一条边，权重取最便宜的一条（与 CSR 后端一致）
+            if self.G.has_edge(*edge) and self.G.edges[edge]['weight'] <= link.cost:
+                continue
             self.G.add_edge(edge[0], edge[1], weight=link.cost, distance=link.distance)
+        self.sync_edge_mask()
+
+    def attach_graph(self, G):
+        """使用已保存的图（nx.Graph 或 CSRGraph），并据此切换后端"""
+        self.G = G
+        self.backend = 'csr' if isinstance(G, CSRGraph) else 'networkx'
+        self.landmarks = None
+        self.path_pool = None
+        if self.backend == 'csr':
+            self.oms_alive = np.ones(G.number_of_oms(), dtype=bool)
+            self.path_pool = PathPool(G)
+        self.sync_edge_mask()
+
+    def use_landmarks(self, index):
+        """
+        之后的加权最短路径查询改用 ALT 地标索引（A*）；index 为针对 self.G 构建的 LandmarkIndex，None 表示停用。
+        结果的代价与 Dijkstra 相同，等价路径之间的选择可能不同。
+        """
+        if index is not None and self.backend != 'csr':
+            raise NotImplementedError("Landmark indexes require the 'csr' backend")
+        self.landmarks = index
+
+    def sync_edge_mask(self):
+        """根据 failed_edges 重建故障位图（替换图或加载故障状态后调用）"""
+        self.down_edges = set()
+        self.mask_version += 1
+        self.edge_mask = bytearray(self.G.number_of_edges()) if self.backend == 'csr' else None
+        for edge in self.failed_edges:
+            self.mark_edge_failed(edge)
+        if self.relay_router is not None:
+            self.relay_router.build(self._search_mask())
+
+    def mark_edge_failed(self, edge):
+        """O(1) 把边标记为不可用，不修改图"""
+        edge = (min(edge[0], edge[1]), max(edge[0], edge[1]))
+        if self.backend == 'csr':
+            eid = self.G.edge_id(*edge)
+            if eid is None:
+                return
+            self.edge_mask[eid] = 1
+            if self.relay_router is not None:
+                self.relay_router.invalidate_edges([eid], self.edge_mask)
+        self.down_edges.add(edge)
+        self.mask_version += 1
+        self.path_cache.invalidate_edge(edge)  # 缓存中经过该边的路径全部失效
+
+    def mark_edge_recovered(self, edge):
+        """O(1) 清除边的故障标记"""
+        edge = (min(edge[0], edge[1]), max(edge[0], edge[1]))
+        if self.backend == 'csr':
+            eid = self.G.edge_id(*edge)
+            if eid is not None:
+                self.edge_mask[eid] = 0
+                if self.relay_router is not None:
+                    self.relay_router.invalidate_edges([eid], self.edge_mask)
+        self.down_edges.discard(edge)
+        self.mask_version += 1
+
+    def _search_mask(self):
+        """没有故障边时返回 None，搜索热循环省去位图检查"""
+        return self.edge_mask if self.down_edges else None
+
+    def _search_graph(self):
+        """networkx 后端：隐藏故障边的只读子图视图（不复制、不修改 self.G）"""
+        if not self.down_edges:
+            return self.G
+        down = self.down_edges
+        return nx.subgraph_view(self.G, filter_edge=lambda u, v: (min(u, v), max(u, v)) not in down)
+
+    def path_alive(self, path_info):
+        """路径是否没有经过任何故障边"""
+        if not path_info:
+            return False
+        if isinstance(path_info, PathRecord):
+            return not self.down_edges or not path_info.crosses(self.edge_mask)
+        down = self.down_edges
+        return not down or not any((min(e[0], e[1]), max(e[0], e[1])) in down for e in path_info['edges'])
+
+    def shortest_path(self, src, snk, excluded_edge=None):
+        """
+        按当前后端计算加权最短路径，excluded_edge 为 (min, max) 形式的边，表示搜索时跳过该边；
+        当前故障的边（edge_mask）始终被跳过。两个后端都不修改图结构，无路径时抛出 nx.NetworkXNoPath。
+        """
+        if self.backend == 'csr':
+            eid = None if excluded_edge is None else self.G.edge_id(*excluded_edge)
+            if self.landmarks is not None:
+                self.metrics.count('search.alt')
+                return self.landmarks.shortest_path(src, snk, excluded_edge=eid, edge_mask=self._search_mask())
+            self.metrics.count('search.dijkstra')
+            return self.G.shortest_path(src, snk, excluded_edge=eid, edge_mask=self._search_mask())
+        self.metrics.count('search.dijkstra')
+        G = self._search_graph()
+        if excluded_edge is None:
+            return nx.shortest_path(G, source=src, target=snk, weight='weight')
+        # 权重函数返回 None 时 networkx 会忽略该边，避免 remove_edge/add_edge 改动共享的图
+        excluded = (min(excluded_edge), max(excluded_edge))
+        def weight(u, v, d):
+            return None if (min(u, v), max(u, v)) == excluded else d.get('weight', 1)
+        return nx.shortest_path(G, source=src, target=snk, weight=weight)
+
+    def shortest_path_avoiding(self, src, snk, excluded_edges):
+        """
+        避开一组 (min, max) 边的加权最短路径，用于多条边同时故障后的图。
+        两个后端都不修改图结构，无路径时抛出 nx.NetworkXNoPath。
+        """
+        excluded = {(min(e[0], e[1]), max(e[0], e[1])) for e in excluded_edges} - self.down_edges
+        if not excluded:
+            return self.shortest_path(src, snk)
+        if self.backend == 'csr':
+            s, t = self.G._endpoints(src, snk)
+            mask = bytearray(self.edge_mask)  # 当前故障位图的副本，再加上额外排除的边
+            for e in excluded:
+                eid = self.G.edge_id(*e)
+                if eid is not None:
+                    mask[eid] = 1
+            if self.landmarks is not None:
+                self.metrics.count('search.alt')
+                return self.landmarks.shortest_path(src, snk, edge_mask=mask)
+            self.metrics.count('search.dijkstra')
+            found = self.G.constrained_shortest_path(s, t, edge_mask=mask)
+            if found is None:
+                raise nx.NetworkXNoPath(f"No path between {src} and {snk}.")
+            return [int(self.G.node_ids[v]) for v in found[1]]
+        def weight(u, v, d):
+            return None if (min(u, v), max(u, v)) in excluded else d.get('weight', 1)
+        self.metrics.count('search.dijkstra')
+        return nx.shortest_path(self._search_graph(), source=src, target=snk, weight=weight)
+
+    def bidirectional_shortest_path(self, src, snk):
+        """按当前后端进行双向 BFS（忽略权重），跳过当前故障的边"""
+        if self.backend == 'csr':
+            return self.G.bidirectional_bfs(src, snk, edge_mask=self._search_mask())
+        return nx.bidirectional_shortest_path(self._search_graph(), source=src, target=snk)
 
 
     def build_edge_service_matrix(self):
-        """构建边和经过它的业务的映射关系"""
+        """根据 paths_in_use 全量重建边和经过它的业务的映射关系（直接替换 paths_in_use 后调用）"""
+        self.edge_service_matrix = {}
         for service_index, data in self.paths_in_use.items():
             edges = data['edges']
             for edge in edges:
@@ -30,141 +250,815 @@ class PathCalculator:
                 edge = (min(edge[0], edge[1]), max(edge[0], edge[1]))
                 
                 if edge not in self.edge_service_matrix:
-                    self.edge_service_matrix[edge] = []
-                self.edge_service_matrix[edge].append(service_index)
+                    self.edge_service_matrix[edge] = set()
+                self.edge_service_matrix[edge].add(service_index)
+
+    def intern_path(self, path_info):
+        """
+        CSR 后端把 {'path', 'edges'} 形式的路径放入路径池，返回共享的 PathRecord；
+        带其他字段的路径（如中继路由的 regenerators）和 networkx 后端的路径原样返回。
+        """
+        if self.path_pool is None or not path_info or isinstance(path_info, PathRecord) or len(path_info) != 2:
+            return path_info
+        return self.path_pool.intern(path_info['path'])
+
+    def intern_paths(self):
+        """把当前路径和备用路径表中的路径全部放入路径池（从 JSON 加载后调用）"""
+        self.paths_in_use = {service_index: self.intern_path(path_info)
+                             for service_index, path_info in self.paths_in_use.items()}
+        self.backup_table.entries = [self.intern_path(path_info) for path_info in self.backup_table.entries]
+
+    def _path_eids(self, path_info):
+        if isinstance(path_info, PathRecord):
+            return path_info.eids
+        return self.G.path_edge_ids(path_info['path'])
+
+    def _store_path(self, service_index, path_info):
+        """
+        写入业务的当前路径，并增量更新 edge_service_matrix：
+        从旧路径的边上移除该业务、在新路径的边上加入该业务，代价为 O(旧路径长度 + 新路径长度)。
+        """
+        path_info = self.intern_path(path_info)
+        old_path = self.paths_in_use.get(service_index)
+        if old_path:
+            for edge in old_path['edges']:
+                edge = (min(edge[0], edge[1]), max(edge[0], edge[1]))
+                services = self.edge_service_matrix.get(edge)
+                if services is not None:
+                    services.discard(service_index)
+                    if not services:
+                        del self.edge_service_matrix[edge]
+        self.paths_in_use[service_index] = path_info
+        for edge in path_info['edges']:
+            edge = (min(edge[0], edge[1]), max(edge[0], edge[1]))
+            if edge not in self.edge_service_matrix:
+                self.edge_service_matrix[edge] = set()
+            self.edge_service_matrix[edge].add(service_index)
+        if self.verify_matrix:
+            self._verify_service_entries(service_index, old_path, path_info)
+
+    def _verify_service_entries(self, service_index, old_path, new_path):
+        """只校验这次路径变化涉及的边，代价与路径长度成正比"""
+        new_edges = {(min(e[0], e[1]), max(e[0], e[1])) for e in new_path['edges']}
+        old_edges = {(min(e[0], e[1]), max(e[0], e[1])) for e in old_path['edges']} if old_path else set()
+        for edge in new_edges:
+            if service_index not in self.edge_service_matrix.get(edge, ()):
+                raise AssertionError(f"Service {service_index} missing from edge_service_matrix at {edge}")
+        for edge in old_edges - new_edges:
+            if service_index in self.edge_service_matrix.get(edge, ()):
+                raise AssertionError(f"Service {service_index} still listed at {edge} after leaving it")
+
+    def verify_edge_service_matrix(self):
+        """
+        全量校验 edge_service_matrix 与 paths_in_use 是否一致。
+        一致时返回 True，否则抛出 AssertionError 并列出不一致的边。
+        """
+        expected = {}
+        for service_index, data in self.paths_in_use.items():
+            for edge in data['edges']:
+                expected.setdefault((min(edge[0], edge[1]), max(edge[0], edge[1])), set()).add(service_index)
+        actual = {edge: set(services) for edge, services in self.edge_service_matrix.items() if services}
+        if actual != expected:
+            diff = sorted(edge for edge in set(actual) | set(expected) if actual.get(edge) != expected.get(edge))
+            raise AssertionError(f"edge_service_matrix is inconsistent on {len(diff)} edges, e.g. {diff[:5]}")
+        return True
 
 
     def calculate_paths(self, services):
+        if self.spectrum is not None:
+            candidates_cache = {}  # 同源同宿的业务共用候选路径
+            for service_index, service in enumerate(services):
+                key = (service.src, service.snk)
+                if key not in candidates_cache:
+                    candidates_cache[key] = self.G.k_shortest_paths(service.src, service.snk, self.k_paths)
+                self.route_and_assign(service_index, service, candidates_cache[key])
+            return
+        if self.relay_router is not None:
+            for service_index, service in enumerate(services):
+                self.relay_router.set_demand(service_index, service)
+                try:
+                    path_info = self.relay_router.route(service.src, service.snk, self._search_mask(),
+                                                        service_index=service_index)
+                except nx.NetworkXNoPath:
+                    logger.warning("No relay-feasible path from %s to %s", service.src, service.snk)
+                    continue
+                self._store_path(service_index, path_info)
+                self._remember_original(service_index, path_info)
+                self.relay_router.reserve(path_info['regenerators'])
+            return
         for service_index, service in enumerate(services):
             try:
-                path = nx.shortest_path(self.G, source=service.src, target=service.snk, weight='weight')
+                path = self.shortest_path(service.src, service.snk)
                 # edges = [(path[i], path[i + 1]) for i in range(len(path) - 1)]
                 edges = [(min(path[i], path[i + 1]), max(path[i], path[i + 1])) for i in range(len(path) - 1)]
                 self.record_service_path(service_index, path, edges)
             except nx.NetworkXNoPath:
-                print(f"No available path from {service.src} to {service.snk}")
-
-        self.build_edge_service_matrix()
+                logger.warning("No available path from %s to %s", service.src, service.snk)
 
     def record_service_path(self, service_index, path, edges):
-        self.paths_in_use[service_index] = {'path': path, 'edges': edges}
+        self._store_path(service_index, {'path': path, 'edges': edges})
+        self._remember_original(service_index, self.paths_in_use[service_index])
+
+    def _remember_original(self, service_index, path_info):
+        """记录业务的原始路径（初始路由结果），并登记到 original_edge_index"""
+        old = self.original_paths.get(service_index)
+        if old:
+            for edge in old['edges']:
+                services = self.original_edge_index.get((min(edge[0], edge[1]), max(edge[0], edge[1])))
+                if services is not None:
+                    services.discard(service_index)
+        self.original_paths[service_index] = path_info
+        for edge in path_info['edges']:
+            self.original_edge_index.setdefault((min(edge[0], edge[1]), max(edge[0], edge[1])), set()).add(service_index)
+
+    def remember_original_paths(self):
+        """把当前路径作为所有业务的原始路径（从文件加载初始路径后调用）"""
+        self.original_paths = {}
+        self.original_edge_index = {}
+        for service_index, path_info in self.paths_in_use.items():
+            self._remember_original(service_index, path_info)
+
+    def route_and_assign(self, service_index, service, candidates=None):
+        """
+        频谱感知的路由与频谱分配（KSP + 分配策略）：
+        依次考察前 k 条最短路径，选第一条存在 m_width 个连续公共空闲频隙的路径并占用频谱。
+        所有候选路径都没有可用频谱时仍记录最短路径，但该业务记为 blocked。
+        """
+        self.spectrum.set_demand(service_index, service)
+        if candidates is None:
+            candidates = self.G.k_shortest_paths(service.src, service.snk, self.k_paths)
+        if not candidates:
+            logger.warning("No available path from %s to %s", service.src, service.snk)
+            return False
+        for _, path in candidates:
+            found = self.spectrum.find_assignment(service_index, self.G.path_edge_ids(path), self.spectrum_policy)
+            if found is not None:
+                edges = [(min(path[i], path[i + 1]), max(path[i], path[i + 1])) for i in range(len(path) - 1)]
+                self.record_service_path(service_index, path, edges)
+                self.spectrum.allocate(service_index, *found)
+                return True
+        path = candidates[0][1]
+        edges = [(min(path[i], path[i + 1]), max(path[i], path[i + 1])) for i in range(len(path) - 1)]
+        self.record_service_path(service_index, path, edges)
+        self.spectrum.blocked.add(service_index)
+        logger.warning("No spectrum block of width %s for service %s on %s candidate paths.",
+                       service.m_width, service_index, len(candidates))
+        return False
+
+    def _set_path_in_use(self, service_index, path_info):
+        """切换业务的当前路径，并同步更新频谱占用和中继占用"""
+        if self.relay_router is not None:
+            old_path = self.paths_in_use.get(service_index)
+            if old_path:
+                self.relay_router.release(old_path.get('regenerators', []))
+            self.relay_router.reserve(path_info.get('regenerators', []))
+        self._store_path(service_index, path_info)
+        if self.spectrum is not None:
+            if not self.spectrum.reassign(service_index, self._path_eids(self.paths_in_use[service_index]), self.spectrum_policy):
+                logger.warning("Service %s has no free spectrum on its new path.", service_index)
 
-    def local_recompute_path(self, src, snk):
+    def reroute(self, service_index, src, snk, excluded_edges=()):
+        """
+        在当前故障状态下（另外跳过 excluded_edges）为业务计算完整路径，无路径时抛出 nx.NetworkXNoPath。
+        中继路由时经中继辅助图计算，每段满足传输限制，并返回 regenerators。
+        """
+        if self.relay_router is not None:
+            eids = {self.G.edge_id(*edge) for edge in excluded_edges} - {None}
+            current = self.paths_in_use.get(service_index) or {}
+            self.metrics.count('search.relay')
+            return self.relay_router.route(src, snk, self._search_mask(), eids, current.get('regenerators', []),
+                                           service_index)
+        path = self.shortest_path_avoiding(src, snk, excluded_edges)
+        return {'path': path, 'edges': [(min(path[i], path[i + 1]), max(path[i], path[i + 1])) for i in range(len(path) - 1)]}
+
+    def relay_admits(self, service_index, path_info):
+        """中继路由时检查已有路径（备用路径、缓存路径、原始路径）的再生节点是否仍有空闲容量"""
+        if self.relay_router is None:
+            return True
+        current = self.paths_in_use.get(service_index) or {}
+        return self.relay_router.admits(path_info.get('regenerators', []), current.get('regenerators', []),
+                                        service_index)
+
+    def local_recompute_path(self, src, snk, path=None, edge=None):
+        """
+        局部路径重计算（按 cost 加权）。
+        给出当前路径 path（path_info）和其上不可用的边 edge 时（CSR 后端），只替换 edge 以及其他故障边附近的一段，
+        路径的其余部分保持不变（见 CSRGraph.repair_path）；在 local_stretch 限定的范围内找不到绕行段时返回 None。
+        没有 path/edge 时在整个图上做双向加权搜索。
+        中继路由时返回 None：局部搜索不检查传输限制，由调用方经中继辅助图重新计算。
+        """
+        if self.relay_router is not None:
+            return None
+        if path is not None and edge is not None and self.backend == 'csr':
+            eid = self.G.edge_id(*edge)
+            if eid is not None:
+                key = None
+                if isinstance(path, PathRecord):
+                    state = (self.mask_version, self.G.weight_version)
+                    if state != self._local_memo_state:
+                        self._local_memo = {}
+                        self._local_memo_state = state
+                    key = (path.handle, eid)
+                    if key in self._local_memo:
+                        self.metrics.count('search.local_memo_hit')
+                        if self._local_memo[key] is None:
+                            logger.debug("No local detour around edge %s from %s to %s", edge, src, snk)
+                        return self._local_memo[key]
+                self.metrics.count('search.local')
+                path = self.G.repair_path(path['path'], eid, self._search_mask(), self.local_radius,
+                                          self.local_stretch, eids=self._path_eids(path))
+                if path is None:
+                    logger.debug("No local detour around edge %s from %s to %s", edge, src, snk)
+                    result = None
+                else:
+                    edges = [(min(path[i], path[i + 1]), max(path[i], path[i + 1])) for i in range(len(path) - 1)]
+                    result = self.intern_path({'path': path, 'edges': edges})
+                if key is not None:
+                    self._local_memo[key] = result
+                return result
+        self.metrics.count('search.local')
         try:
-            # 使用 BFS 进行双向搜索
-            path = nx.bidirectional_shortest_path(self.G, source=src, target=snk)
-            # edges = [(path[i], path[i + 1]) for i in range(len(path) - 1)]
+            if self.backend == 'csr':
+                eid = None if edge is None else self.G.edge_id(*edge)
+                s, t = self.G._endpoints(src, snk)
+                found = self.G.local_search(s, t, eid, self._search_mask())
+                if found is None:
+                    raise nx.NetworkXNoPath(f"No path between {src} and {snk}.")
+                path = [int(self.G.node_ids[v]) for v in found[1]]
+            elif edge is None:
+                path = nx.bidirectional_dijkstra(self._search_graph(), src, snk, weight='weight')[1]
+            else:
+                path = self.shortest_path(src, snk, excluded_edge=(min(edge), max(edge)))
             edges = [(min(path[i], path[i + 1]), max(path[i], path[i + 1])) for i in range(len(path) - 1)]
             return {'path': path, 'edges': edges}
         except nx.NetworkXNoPath:
-            print(f"No local path found from {src} to {snk}")
+            logger.debug("No local path found from %s to %s", src, snk)
             return None
 
 
 
     def add_to_cache(self, service_index, path_info):
-        """将未使用的路径添加到缓存池中"""
-        if service_index not in self.path_cache:
-            self.path_cache[service_index] = []
-        self.path_cache[service_index].append(path_info)
+        """将未使用的路径添加到缓存池中（经过故障边的路径不缓存）"""
+        if path_info and self.path_alive(path_info):
+            self.path_cache.add(path_info)
 
     def get_from_cache(self, service_index, edge):
-        """尝试从缓存池中获取路径"""
-        if service_index in self.path_cache:
-            for path_info in self.path_cache[service_index]:
-                # 确保缓存的路径不使用故障边
-                if edge not in path_info['edges']:
-                    return path_info
-        return None
+        """尝试从缓存池中获取同源同宿、不经过 edge 的路径（经过故障边的路径已在故障时失效）"""
+        path = self.paths_in_use[service_index]['path']
+        return self.path_cache.get(path[0], path[-1], avoid=(min(edge[0], edge[1]), max(edge[0], edge[1])))
 
-    def recompute_backup_paths_for_service(self, service_index):
+    def compute_backup_path(self, src, snk, edge, service_index=None):
         """
-        为某个业务重新计算所有边故障时的备用路径，并存储到 backup_paths 字典中。
+        计算 edge 故障时 src 到 snk 的备用路径，无路径时返回 None。
+        中继路由时只使用能容纳 service_index 颜色的再生器。
         """
-        original_edges = self.paths_in_use[service_index]['edges']
+        if self.relay_router is not None:
+            try:
+                return self.reroute(service_index, src, snk, [edge])
+            except nx.NetworkXNoPath:
+                return None
+        try:
+            # 使用 Dijkstra 算法计算备用路径（搜索时跳过该边，不修改图结构）
+            backup_path = self.shortest_path(src, snk, excluded_edge=edge)
+        except nx.NetworkXNoPath:
+            return None
+        backup_edges = [(min(backup_path[i], backup_path[i + 1]), max(backup_path[i], backup_path[i + 1])) for i in range(len(backup_path) - 1)]
+        return {'path': backup_path, 'edges': backup_edges}
+
+    def compute_backup_paths_along(self, path):
+        """
+        计算 path 上每条边分别故障时的备用路径，返回与 path 的边对应的列表（无路径为 None）。
+        CSR 后端使用替换路径算法，两次最短路径树即可得到全部结果；
+        path 不是最短路径、使用 networkx 后端或中继路由时，逐边调用 compute_backup_path。
+        """
+        src, snk = path[0], path[-1]
+        edges = [(min(path[i], path[i + 1]), max(path[i], path[i + 1])) for i in range(len(path) - 1)]
+        replacements = None
+        if self.backend == 'csr' and self.relay_router is None:
+            replacements = self.G.replacement_paths(src, snk, path, self._search_mask())
+        if replacements is None:
+            return [self.compute_backup_path(src, snk, edge) for edge in edges]
+        results = []
+        for backup_path in replacements:
+            if backup_path is None:
+                results.append(None)
+                continue
+            backup_edges = [(min(backup_path[i], backup_path[i + 1]), max(backup_path[i], backup_path[i + 1])) for i in range(len(backup_path) - 1)]
+            results.append({'path': backup_path, 'edges': backup_edges})
+        return results
+
+    def get_backup_path(self, service_index, edge):
+        """返回业务在 edge 故障时的备用路径，没有时返回 None"""
+        handle = self.backup_paths.get(service_index, {}).get(edge)
+        if handle is None:
+            return None
+        return self.backup_table.get(handle)
+
+    def set_backup_path(self, service_index, edge, path_info):
+        """为单个业务替换 edge 故障时的备用路径（不影响共享同一句柄的其他业务）"""
+        path_info = self.intern_path(path_info)
+        if service_index not in self.backup_paths:
+            self.backup_paths[service_index] = {}
+        old_handle = self.backup_paths[service_index].get(edge)
+        if old_handle is not None and isinstance(path_info, PathRecord) and self.backup_table.get(old_handle) is path_info:
+            return  # 路径池中的同一条路径：句柄和倒排索引都不需要变化
+        path = self.paths_in_use[service_index]['path']
+        handle = self.backup_table.add((path[0], path[-1], edge), path_info, shared=False)
+        if edge in self.backup_paths[service_index]:
+            self._unindex_backup(service_index, edge, self.backup_paths[service_index][edge])
+        self.backup_paths[service_index][edge] = handle
+        self._index_backup(service_index, edge, handle)
+
+    def _backup_edges(self, handle):
+        """句柄对应备用路径经过的边（规范化为 (min, max)，兼容从 JSON 读回的列表形式）"""
+        if handle is None:
+            return []
+        path_info = self.backup_table.get(handle)
+        if isinstance(path_info, PathRecord):
+            return path_info.edge_list()  # 路径池中的边元组已是 (min, max) 形式
+        return [(min(e[0], e[1]), max(e[0], e[1])) for e in path_info['edges']]
+
+    def _index_backup(self, service_index, edge, handle):
+        self.backup_edge_index.setdefault(edge, set()).add(service_index)
+        for e in self._backup_edges(handle):
+            counts = self.backup_traverse_index.setdefault(e, {})
+            counts[service_index] = counts.get(service_index, 0) + 1
+
+    def _unindex_backup(self, service_index, edge, handle):
+        services = self.backup_edge_index.get(edge)
+        if services is not None:
+            services.discard(service_index)
+            if not services:
+                del self.backup_edge_index[edge]
+        for e in self._backup_edges(handle):
+            counts = self.backup_traverse_index.get(e)
+            if counts is None or service_index not in counts:
+                continue
+            counts[service_index] -= 1
+            if counts[service_index] <= 0:
+                del counts[service_index]
+                if not counts:
+                    del self.backup_traverse_index[e]
+
+    def rebuild_backup_indexes(self):
+        """根据 backup_paths 全量重建倒排索引（直接替换 backup_paths / backup_table 后调用，如从文件加载）"""
+        self.backup_edge_index = {}
+        self.backup_traverse_index = {}
+        for service_index, edge_handles in self.backup_paths.items():
+            for edge, handle in edge_handles.items():
+                self._index_backup(service_index, edge, handle)
+
+    def services_with_backup_for(self, edge):
+        """拥有 edge 故障时备用路径的业务（按业务编号排序）"""
+        edge = (min(edge[0], edge[1]), max(edge[0], edge[1]))
+        return sorted(self.backup_edge_index.get(edge, ()))
+
+    def services_with_backup_through(self, edge):
+        """备用路径经过 edge 的业务（按业务编号排序）"""
+        edge = (min(edge[0], edge[1]), max(edge[0], edge[1]))
+        return sorted(self.backup_traverse_index.get(edge, ()))
+
+    def _service_backup_keys(self, service_index):
         src, snk = self.paths_in_use[service_index]['path'][0], self.paths_in_use[service_index]['path'][-1]
+        # 从 JSON 加载的路径中边是列表，键统一为 (min, max) 元组
+        return [(src, snk, (min(edge[0], edge[1]), max(edge[0], edge[1])))
+                for edge in self.paths_in_use[service_index]['edges']]
+
+    def _link_service_backups(self, service_index):
+        """让业务引用共享表中已计算好的备用路径句柄"""
+        for edge, handle in self.backup_paths.get(service_index, {}).items():
+            self._unindex_backup(service_index, edge, handle)
         self.backup_paths[service_index] = {}
+        for key in self._service_backup_keys(service_index):
+            handle = self.backup_table.lookup(key)
+            if handle is None:
+                logger.warning("No backup path found for service %s when edge %s fails.", service_index, key[2])
+                continue
+            self.backup_paths[service_index][key[2]] = handle
+            self._index_backup(service_index, key[2], handle)
 
-        for edge in original_edges:
-            # 移除当前边并计算不经过此边的备用路径
-            self.G.remove_edge(*edge)  # 临时移除这条边来模拟故障
-            try:
-                # 使用 Dijkstra 算法计算备用路径
-                backup_path = nx.shortest_path(self.G, source=src, target=snk, weight='weight')
-                # backup_edges = [(backup_path[i], backup_path[i + 1]) for i in range(len(backup_path) - 1)]
-                backup_edges = [(min(backup_path[i], backup_path[i + 1]), max(backup_path[i], backup_path[i + 1])) for i in range(len(backup_path) - 1)]
+    def _fit_relay_backups(self, service_index):
+        """
+        中继路由：共享表中的备用路径不区分业务计算，其再生器都能容纳业务的颜色时直接引用
+        （只用能容纳该颜色的再生器只会去掉候选，共享的路径仍是该业务的最小代价路径）；
+        否则按业务的颜色单独计算并保存，不影响引用同一句柄的其他业务。
+        """
+        if self.relay_router is None:
+            return
+        path = self.paths_in_use[service_index]['path']
+        backups = self.backup_paths.get(service_index, {})
+        for edge, handle in list(backups.items()):
+            if self.relay_router.fits(self.backup_table.get(handle).get('regenerators', []), service_index):
+                continue
+            backup_path_info = self.compute_backup_path(path[0], path[-1], edge, service_index)
+            if backup_path_info is None:
+                logger.warning("No backup path found for service %s when edge %s fails.", service_index, edge)
+                self._unindex_backup(service_index, edge, handle)
+                del backups[edge]
+                continue
+            self.metrics.count('backup.relay_colors')
+            self.set_backup_path(service_index, edge, backup_path_info)
 
-                self.backup_paths[service_index][edge] = {'path': backup_path, 'edges': backup_edges}
-            except nx.NetworkXNoPath:
-                print(f"No backup path found for service {service_index} when edge {edge} fails.")
-            finally:
-                # 恢复被移除的边
-                self.G.add_edge(*edge)
+    def recompute_backup_paths_for_service(self, service_index):
+        """
+        为某个业务重新计算所有边故障时的备用路径，并存储到 backup_paths 字典中。
+        已在共享表中的 (src, snk, 故障边) 直接复用，不再重复计算；中继路由时再按业务的颜色检查（见 _fit_relay_backups）。
+        """
+        keys = self._service_backup_keys(service_index)
+        if any(key not in self.backup_table for key in keys):
+            results = self.compute_backup_paths_along(self.paths_in_use[service_index]['path'])
+            for key, path_info in zip(keys, results):
+                if key not in self.backup_table:
+                    self.backup_table.add(key, self.intern_path(path_info))
+        self._link_service_backups(service_index)
+        self._fit_relay_backups(service_index)
 
-    def recompute_backup_paths(self):
+    def recompute_backup_paths(self, workers=None, chunks_per_worker=4):
         """
         为所有服务重新计算备用路径，并存储在 backup_paths 中。
+        同源同宿的业务按 (src, snk, 故障边) 去重，相同的路径只计算一次；
+        每条路径上的所有故障边通过替换路径算法一次求出。
+        中继路由时共享的备用路径不区分业务计算，再按各业务的颜色检查（见 _fit_relay_backups）。
+        workers > 1 时把待计算的路径切分到多个进程并行计算，结果按提交顺序合并，与串行计算一致。
         """
-        for service_index in self.paths_in_use.keys():
-            self.recompute_backup_paths_for_service(service_index)
+        service_indices = list(self.paths_in_use.keys())
+        pending = []
+        pending_paths = set()
+        for service_index in service_indices:
+            path = tuple(self.paths_in_use[service_index]['path'])
+            if path in pending_paths:
+                continue
+            if any(key not in self.backup_table for key in self._service_backup_keys(service_index)):
+                pending_paths.add(path)
+                pending.append(list(path))
+
+        if not workers or workers <= 1 or len(pending) < 2:
+            results = [self.compute_backup_paths_along(path) for path in pending]
+        else:
+            # 优先使用 fork：子进程继承只读的图和路径数据，每个进程只获得一份副本
+            if 'fork' in mp.get_all_start_methods():
+                ctx = mp.get_context('fork')
+            else:
+                ctx = mp.get_context()
+            chunk_size = max(1, -(-len(pending) // (workers * chunks_per_worker)))
+            chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+            results = []
+            with ctx.Pool(workers, initializer=_init_backup_worker, initargs=(self,)) as pool:
+                # imap 按提交顺序返回，合并结果与串行计算的顺序相同
+                for chunk_results in pool.imap(_backup_worker, chunks):
+                    results.extend(chunk_results)
 
-    def handle_failure(self, edge, log_file='simulation_log.txt'):
+        for path, path_results in zip(pending, results):
+            for i, path_info in enumerate(path_results):
+                edge = (min(path[i], path[i + 1]), max(path[i], path[i + 1]))
+                key = (path[0], path[-1], edge)
+                if key not in self.backup_table:
+                    self.backup_table.add(key, self.intern_path(path_info))
+        for service_index in service_indices:
+            self._link_service_backups(service_index)
+            self._fit_relay_backups(service_index)
+
+    def handle_failure(self, edge):
         """
         处理链路故障，根据策略进行路径切换，并记录更新的路径数和时间。
+        各阶段耗时记录在 metrics 的 failure.reroute / failure.backup_update / failure.total 直方图中。
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        # 规范化故障边的顺序
+        # 规范化故障边的顺序，并在故障位图中标记（之后的所有搜索都会跳过它）
         edge = (min(edge[0], edge[1]), max(edge[0], edge[1]))
+        self.mark_edge_failed(edge)
 
         # 打印 Edge Service Matrix 到文件
         # with open('1.txt', 'a') as file:
         #     file.write(f"Edge Service Matrix: {self.edge_service_matrix}\n")
 
         # Step 1: 查找当前路径经过故障边的服务
-        affected_services_current = self.edge_service_matrix.get(edge, [])
-        print(f"Affected services for edge {edge}: {affected_services_current}")
+        # 路径切换会同步修改矩阵，这里先取一份按业务编号排序的快照
+        affected_services_current = sorted(self.edge_service_matrix.get(edge, ()))
+        logger.debug("Affected services for edge %s: %s", edge, affected_services_current)
+        self.metrics.count('failure.events')
+        self.metrics.observe('failure.affected_services', len(affected_services_current), COUNT_BASE)
 
         updated_paths_count = 0  # 用于记录更新的路径数量
 
         # Step 2: 更新当前路径经过故障边的服务
         for service_index in affected_services_current:
-            print(f"Service {service_index} affected by edge failure: {edge}")
+            logger.debug("Service %s affected by edge failure: %s", service_index, edge)
             # 按优先级顺序处理路径切换逻辑（备用路径 -> 局部路径重计算 -> 缓存路径 -> Dijkstra）
             if self.update_service_path(service_index, edge):
                 updated_paths_count += 1  # 记录成功更新的路径
                 # 仅更新该业务受故障边影响的备用路径
                 self.update_service_backup_path(service_index)
 
-        # Step 3: 查找备用路径中包含故障边的服务
-        affected_services_backup = []
-        for service_index, backup_paths in self.backup_paths.items():
-            for backup_edge in backup_paths.keys():
-                # 将备用路径中的边进行规范化
-                if isinstance(backup_edge, str):
-                    backup_edge = eval(backup_edge)  # 将字符串形式的边转换为 tuple
-                backup_edge = (min(backup_edge[0], backup_edge[1]), max(backup_edge[0], backup_edge[1]))
-                if edge == backup_edge:
-                    affected_services_backup.append(service_index)
+        reroute_time = time.perf_counter()
+        self.metrics.observe('failure.reroute', reroute_time - start_time)
+
+        # Step 3: 查找备用路径中包含故障边的服务（通过倒排索引，只访问受影响的业务）
+        affected_services_backup = self.services_with_backup_for(edge)
 
         # Step 4: 更新包含故障边的备用路径
         for service_index in affected_services_backup:
             if edge in self.backup_paths[service_index]:
-                print(f"Service {service_index}'s backup path contains the failed edge: {edge}")
+                logger.debug("Service %s's backup path contains the failed edge: %s", service_index, edge)
                 # 覆盖失效的备用路径并更新
                 if self.update_service_backup_path_for_edge(service_index, edge):
                     updated_paths_count += 1
 
         # 记录结束时间
-        end_time = time.time()
+        end_time = time.perf_counter()
         elapsed_time = end_time - start_time
+        self.metrics.observe('failure.backup_update', end_time - reroute_time)
+        self.metrics.observe('failure.total', elapsed_time)
+
+        logger.info("Edge %s failure processed: %s affected services, %s updated paths, %.4f seconds.",
+                    edge, len(affected_services_current), updated_paths_count, elapsed_time)
+
+
+    def handle_failures(self, edges):
+        """
+        批量处理同时发生的多条边故障（如同一管道内的 SRLG 光缆中断）。
+        先把整组边视为故障，再通过 edge_service_matrix 取受影响业务的并集，
+        每个业务只在故障后的图上重路由一次，避免切换到同一组中另一条故障边上的备用路径。
+        返回成功切换的业务数。
+        """
+        start_time = time.perf_counter()
+        edges = list(dict.fromkeys((min(e[0], e[1]), max(e[0], e[1])) for e in edges))
+        for edge in edges:
+            self.mark_edge_failed(edge)
+        down = self.down_edges
+
+        # Step 1: 受影响业务的并集（按业务编号排序）
+        affected_services = set()
+        for edge in edges:
+            affected_services |= self.edge_service_matrix.get(edge, set())
+        affected_services = sorted(affected_services)
+        logger.debug("Affected services for edges %s: %s", edges, affected_services)
+        self.metrics.count('failures.events')
+        self.metrics.observe('failures.affected_services', len(affected_services), COUNT_BASE)
+
+        # Step 2: 每个业务只重路由一次（备用路径 -> 缓存路径 -> 故障后图上的 Dijkstra）
+        updated_paths_count = 0
+        for service_index in affected_services:
+            if self.update_service_path_avoiding(service_index, down):
+                updated_paths_count += 1
+                self.update_service_backup_path(service_index)
+        reroute_time = time.perf_counter()
+        self.metrics.observe('failures.reroute', reroute_time - start_time)
+
+        # Step 3: 更新故障边对应的备用路径
+        for edge in edges:
+            for service_index in self.services_with_backup_for(edge):
+                logger.debug("Service %s's backup path contains the failed edge: %s", service_index, edge)
+                if self.update_service_backup_path_for_edge(service_index, edge):
+                    updated_paths_count += 1
+
+        end_time = time.perf_counter()
+        elapsed_time = end_time - start_time
+        self.metrics.observe('failures.backup_update', end_time - reroute_time)
+        self.metrics.observe('failures.total', elapsed_time)
+        logger.info("Edges %s failure processed as one event: %s affected services, %s updated paths, %.4f seconds.",
+                    edges, len(affected_services), updated_paths_count, elapsed_time)
+        return updated_paths_count
+
+    def update_service_path_avoiding(self, service_index, down_edges):
+        """把业务切换到不经过 down_edges 中任何一条边的路径，成功时返回 True"""
+        def usable(path_info):
+            return (path_info and not any((min(e[0], e[1]), max(e[0], e[1])) in down_edges for e in path_info['edges'])
+                    and self.relay_admits(service_index, path_info))
+
+        old_path = self.paths_in_use[service_index]
+        logger.debug("Adding old path of service %s to cache.", service_index)
+        self.add_to_cache(service_index, old_path)
+        failed_on_path = [(min(e[0], e[1]), max(e[0], e[1])) for e in old_path['edges']
+                          if (min(e[0], e[1]), max(e[0], e[1])) in down_edges]
+
+        # 优先使用不经过任何故障边的预计算备用路径
+        for edge in failed_on_path:
+            backup_path_info = self.get_backup_path(service_index, edge)
+            if usable(backup_path_info):
+                logger.debug("Switching service %s to backup path for edge %s", service_index, edge)
+                self.metrics.count('switch.backup')
+                self._set_path_in_use(service_index, backup_path_info)
+                return True
+
+        # 检查缓存池中的路径
+        cached_path = self.path_cache.get(old_path['path'][0], old_path['path'][-1])
+        if usable(cached_path):
+            logger.debug("Switching service %s to cached path.", service_index)
+            self.metrics.count('switch.cache')
+            self._set_path_in_use(service_index, cached_path)
+            return True
+
+        # 在故障后的图上重新计算
+        src, snk = old_path['path'][0], old_path['path'][-1]
+        try:
+            self._set_path_in_use(service_index, self.reroute(service_index, src, snk, down_edges))
+            logger.debug("Switching service %s to newly computed path using Dijkstra.", service_index)
+            self.metrics.count('switch.dijkstra')
+            return True
+        except nx.NetworkXNoPath:
+            logger.warning("Failed to find any path for service %s after edges %s failed.", service_index, failed_on_path)
+            self.metrics.count('switch.failed')
+            return False
+
+    def handle_srlg_failure(self, oms_ids):
+        """
+        处理一个共享风险组（SRLG）内所有 OMS 同时故障。
+        全部并行 OMS 都故障的边作为一组交给 handle_failures，其余的边只更新聚合权重（业务改走并行光纤）。
+        返回整条中断的边列表。
+        """
+        if self.backend != 'csr':
+            raise NotImplementedError("OMS-level failures require the 'csr' backend")
+        touched = []
+        for oms_id in oms_ids:
+            positions = self.G.fiber_positions(oms_id)
+            if not positions:
+                logger.warning("OMS %s does not exist in the graph.", oms_id)
+                continue
+            self.oms_alive[positions] = False
+            touched.append((int(self.G.oms_edge[positions[0]]), positions))
+        eids = list(dict.fromkeys(eid for eid, _ in touched))
+        if self.spectrum is not None:
+            self.spectrum.refresh_edges(eids)
 
-        # 将更新的数量和时间记录写入文件
-        with open(log_file, 'a') as log:
-            log.write(f"Edge {edge} failure processed.\n")
-            log.write(f"Updated paths: {updated_paths_count}\n")
-            log.write(f"Time taken: {elapsed_time:.4f} seconds\n\n")
+        down_edges = []
+        for eid in eids:
+            weight = self.G.aggregate_weight(eid, self.oms_alive)
+            if weight is None:
+                down_edges.append(self.G.edge_endpoints(eid))
+            elif weight != self.G.edge_weight[eid]:
+                self.G.set_edge_weight(eid, weight)
+        if self.spectrum is not None:
+            # 边仍然可用时，占用故障光纤的业务在同一路径上改用并行光纤
+            down_eids = {self.G.edge_id(*edge) for edge in down_edges}
+            positions = [pos for eid, group in touched if eid not in down_eids for pos in group]
+            for service_index in sorted(self.spectrum.services_on_oms(positions)):
+                self._set_path_in_use(service_index, self.paths_in_use[service_index])
+        if down_edges:
+            self.handle_failures(down_edges)
+        return down_edges
 
+    def path_cost(self, path):
+        """路径的总代价（各边 weight 之和）"""
+        if self.backend == 'csr':
+            return self.G.path_cost(path)
+        return sum(self.G.edges[path[i], path[i + 1]]['weight'] for i in range(len(path) - 1))
+
+    def enable_revertive(self, hold_off=0.0, min_cost_gain=0.0, batch_size=None):
+        """
+        启用返回式恢复：边恢复并稳定 hold_off 秒后，原始路径经过该边的绕行业务被重新优化，
+        只有代价下降比例不小于 min_cost_gain 时才切换；每次最多处理 batch_size 个业务。
+        """
+        self.revertive = True
+        self.hold_off = hold_off
+        self.min_cost_gain = min_cost_gain
+        self.reversion_batch = batch_size
+        if not self.original_paths:
+            self.remember_original_paths()
+
+    def handle_recovery(self, edge, now=None):
+        """
+        边恢复：清除故障标记；启用返回式恢复时登记一次回切，hold_off 到期后由 process_reversions 处理。
+        hold_off 为 0 时立即处理。返回本次回切的业务数。
+        """
+        edge = (min(edge[0], edge[1]), max(edge[0], edge[1]))
+        self.mark_edge_recovered(edge)
+        self.metrics.count('recovery.events')
+        if not self.revertive:
+            return 0
+        now = time.time() if now is None else now
+        self.pending_reversions[edge] = now + self.hold_off
+        return self.process_reversions(now)
+
+    def process_reversions(self, now=None):
+        """
+        处理到期的回切：到期时边仍然正常才把原始路径经过它的绕行业务加入队列，
+        然后按批量上限重新优化队列中的业务。返回本次回切的业务数。
+        """
+        if not self.revertive:
+            return 0
+        now = time.time() if now is None else now
+        failed = self.down_edges
+        queued = set(self.reversion_queue)
+        for edge, due in sorted(self.pending_reversions.items(), key=lambda item: item[1]):
+            if due > now:
+                continue
+            del self.pending_reversions[edge]
+            if edge in failed:
+                continue  # 稳定期内再次故障，放弃回切以免振荡
+            for service_index in sorted(self.original_edge_index.get(edge, ())):
+                if service_index not in queued and self.paths_in_use.get(service_index) is not self.original_paths[service_index]:
+                    self.reversion_queue.append(service_index)
+                    queued.add(service_index)
+        if not self.reversion_queue:
+            return 0
+
+        start_time = time.perf_counter()
+        limit = len(self.reversion_queue) if self.reversion_batch is None else self.reversion_batch
+        batch, self.reversion_queue = self.reversion_queue[:limit], self.reversion_queue[limit:]
+        reverted = sum(1 for service_index in batch if self.reoptimize_service(service_index, failed))
+        elapsed_time = time.perf_counter() - start_time
+        self.metrics.count('switch.revert', reverted)
+        self.metrics.observe('reversion.total', elapsed_time)
+        logger.info("Revertive re-optimization: %s of %s services switched, %s still queued, %.4f seconds.",
+                    reverted, len(batch), len(self.reversion_queue), elapsed_time)
+        return reverted
+
+    def reoptimize_service(self, service_index, failed=None):
+        """
+        在当前（去掉故障边的）图上为业务重新选择路径：原始路径可用且不比最短路径差时优先回到原始路径。
+        新路径的代价下降比例不小于 min_cost_gain 时才切换，切换成功返回 True。
+        """
+        current = self.paths_in_use.get(service_index)
+        if not current:
+            return False
+        if failed is None:
+            failed = self.down_edges
+        original = self.original_paths.get(service_index)
+        original_ok = original is not None and not any(
+            (min(e[0], e[1]), max(e[0], e[1])) in failed for e in original['edges'])
+
+        candidate = original if original_ok and self.relay_admits(service_index, original) else None
+        src, snk = current['path'][0], current['path'][-1]
+        try:
+            best = self.reroute(service_index, src, snk, failed)
+        except nx.NetworkXNoPath:
+            best = None
+        if best is not None and (candidate is None or self.path_cost(best['path']) < self.path_cost(candidate['path'])):
+            candidate = best
+        if candidate is None or candidate['path'] == current['path']:
+            return False
+
+        current_cost, new_cost = self.path_cost(current['path']), self.path_cost(candidate['path'])
+        if current_cost - new_cost <= 0 or current_cost - new_cost < self.min_cost_gain * current_cost:
+            return False
+        logger.debug("Reverting service %s: cost %s -> %s", service_index, current_cost, new_cost)
+        self.add_to_cache(service_index, current)
+        self._set_path_in_use(service_index, candidate)
+        self.recompute_backup_paths_for_service(service_index)
+        return True
+
+    def handle_oms_failure(self, oms_id):
+        """
+        处理单条 OMS 故障（连同其反向的 remoteOmsId，即同一对光纤）。
+        若该节点对之间仍有存活的并行 OMS，业务留在原路径上（改走并行光纤），只更新聚合权重；
+        只有全部并行 OMS 都故障时才按整条边故障处理。
+        返回整条边中断时的 (min, max) 边，否则返回 None。
+        """
+        if self.backend != 'csr':
+            raise NotImplementedError("OMS-level failures require the 'csr' backend")
+        positions = self.G.fiber_positions(oms_id)
+        if not positions:
+            logger.warning("OMS %s does not exist in the graph.", oms_id)
+            return None
+        eid = int(self.G.oms_edge[positions[0]])
+        edge = self.G.edge_endpoints(eid)
+        self.oms_alive[positions] = False
+        if self.spectrum is not None:
+            self.spectrum.refresh_edges([eid])
+
+        weight = self.G.aggregate_weight(eid, self.oms_alive)
+        if weight is None:
+            logger.info("All parallel OMS on edge %s failed.", edge)
+            self.handle_failure(edge)
+            return edge
+
+        if weight != self.G.edge_weight[eid]:
+            self.G.set_edge_weight(eid, weight)
+        if self.spectrum is not None:
+            # 占用故障光纤的业务在同一路径上改用并行光纤
+            for service_index in sorted(self.spectrum.services_on_oms(positions)):
+                self._set_path_in_use(service_index, self.paths_in_use[service_index])
+        remaining = int(self.oms_alive[self.G.edge_oms_ptr[eid]:self.G.edge_oms_ptr[eid + 1]].sum())
+        absorbed = len(self.edge_service_matrix.get(edge, []))
+        self.metrics.count('oms_failure.absorbed')
+        logger.info("OMS %s failed on edge %s: %s parallel OMS remain, %s services stay on their paths.",
+                    oms_id, edge, remaining, absorbed)
+        return None
+
+    def handle_oms_recovery(self, oms_id):
+        """
+        恢复单条 OMS（连同其 remoteOmsId），重新聚合所在边的权重。
+        返回因此从整体中断恢复为可用的 (min, max) 边，否则返回 None。
+        """
+        if self.backend != 'csr':
+            raise NotImplementedError("OMS-level failures require the 'csr' backend")
+        positions = self.G.fiber_positions(oms_id)
+        if not positions:
+            logger.warning("OMS %s does not exist in the graph.", oms_id)
+            return None
+        eid = int(self.G.oms_edge[positions[0]])
+        was_down = self.G.aggregate_weight(eid, self.oms_alive) is None
+        self.oms_alive[positions] = True
+        if self.spectrum is not None:
+            self.spectrum.refresh_edges([eid])
+        weight = self.G.aggregate_weight(eid, self.oms_alive)
+        if weight != self.G.edge_weight[eid]:
+            self.G.set_edge_weight(eid, weight)
+        if was_down:
+            self.mark_edge_recovered(self.G.edge_endpoints(eid))
+        return self.G.edge_endpoints(eid) if was_down else None
 
     def update_service_backup_path_for_edge(self, service_index, edge):
         """
@@ -174,43 +1068,37 @@ class PathCalculator:
         src, snk = self.paths_in_use[service_index]['path'][0], self.paths_in_use[service_index]['path'][-1]
 
         # 获取旧的备用路径并加入缓存池
-        old_backup_path = self.backup_paths.get(service_index, {}).get(edge)
+        old_backup_path = self.get_backup_path(service_index, edge)
         if old_backup_path:
-            print(f"Adding old backup path of service {service_index} for edge {edge} to cache.")
+            logger.debug("Adding old backup path of service %s for edge %s to cache.", service_index, edge)
             self.add_to_cache(service_index, old_backup_path)
 
         # Step 1: 局部路径重计算
-        local_path = self.local_recompute_path(src, snk)
+        local_path = self.local_recompute_path(src, snk, self.paths_in_use[service_index], edge)
         if local_path:
-            print(f"Recomputed backup path for service {service_index} and edge {edge} using local search.")
-            if service_index not in self.backup_paths:
-                self.backup_paths[service_index] = {}
-            self.backup_paths[service_index][edge] = local_path
+            logger.debug("Recomputed backup path for service %s and edge %s using local search.", service_index, edge)
+            self.metrics.count('backup.local')
+            self.set_backup_path(service_index, edge, local_path)
             return True
 
         # Step 2: 检查缓存池中的备用路径
         cached_path = self.get_from_cache(service_index, edge)
-        if cached_path:
-            print(f"Recomputed backup path for service {service_index} and edge {edge} using cached path.")
-            if service_index not in self.backup_paths:
-                self.backup_paths[service_index] = {}
-            self.backup_paths[service_index][edge] = cached_path
+        if cached_path and self.relay_admits(service_index, cached_path):
+            logger.debug("Recomputed backup path for service %s and edge %s using cached path.", service_index, edge)
+            self.metrics.count('backup.cache')
+            self.set_backup_path(service_index, edge, cached_path)
             return True
 
-        # Step 3: 使用 Dijkstra 重新计算备用路径
-        try:
-            backup_path = nx.shortest_path(self.G, source=src, target=snk, weight='weight')
-            # backup_edges = [(backup_path[i], backup_path[i + 1]) for i in range(len(backup_path) - 1)]
-            backup_edges = [(min(backup_path[i], backup_path[i + 1]), max(backup_path[i], backup_path[i + 1])) for i in range(len(backup_path) - 1)]
-
-            if service_index not in self.backup_paths:
-                self.backup_paths[service_index] = {}
-            self.backup_paths[service_index][edge] = {'path': backup_path, 'edges': backup_edges}
-            print(f"Recomputed backup path for service {service_index} and edge {edge} using Dijkstra.")
-            return True
-        except nx.NetworkXNoPath:
-            print(f"Failed to find a new backup path for service {service_index} and edge {edge}.")
+        # Step 3: 使用 Dijkstra 重新计算备用路径（跳过 edge 本身和当前故障的边）
+        backup_path_info = self.compute_backup_path(src, snk, edge, service_index)
+        if backup_path_info is None:
+            logger.warning("Failed to find a new backup path for service %s and edge %s.", service_index, edge)
+            self.metrics.count('backup.failed')
             return False
+        self.set_backup_path(service_index, edge, backup_path_info)
+        logger.debug("Recomputed backup path for service %s and edge %s using Dijkstra.", service_index, edge)
+        self.metrics.count('backup.dijkstra')
+        return True
         
     def update_service_backup_path(self, service_index):
         """
@@ -219,100 +1107,95 @@ class PathCalculator:
         # 获取该业务的路径
         service_path = self.paths_in_use.get(service_index)
         if not service_path:
-            print(f"Service {service_index} has no path in use.")
+            logger.warning("Service %s has no path in use.", service_index)
             return False
 
-        # 获取该业务的所有边
+        # 获取该业务的所有边以及源和目标节点
         service_edges = service_path['edges']
+        nodes = service_path['path']
+        src, snk = nodes[0], nodes[-1]
 
         # 遍历业务的每条边，并为每条边故障生成备用路径
         for edge in service_edges:
             edge = (min(edge[0], edge[1]), max(edge[0], edge[1]))  # 规范化边的顺序
 
-            # 获取源和目标节点
-            src, snk = service_path['path'][0], service_path['path'][-1]
-
             # Step 1: 将旧的备用路径加入缓存池
-            old_backup_path = self.backup_paths.get(service_index, {}).get(edge)
+            old_backup_path = self.get_backup_path(service_index, edge)
             if old_backup_path:
-                print(f"Adding old backup path of service {service_index} for edge {edge} to cache.")
+                logger.debug("Adding old backup path of service %s for edge %s to cache.", service_index, edge)
                 self.add_to_cache(service_index, old_backup_path)
 
             # Step 2: 局部路径重计算
-            local_path = self.local_recompute_path(src, snk)
+            local_path = self.local_recompute_path(src, snk, service_path, edge)
             if local_path:
-                print(f"Recomputed backup path for service {service_index} and edge {edge} using local search.")
-                if service_index not in self.backup_paths:
-                    self.backup_paths[service_index] = {}
-                self.backup_paths[service_index][edge] = local_path
+                logger.debug("Recomputed backup path for service %s and edge %s using local search.", service_index, edge)
+                self.metrics.count('backup.local')
+                self.set_backup_path(service_index, edge, local_path)
                 continue  # 继续为下一个边生成备用路径
 
             # Step 3: 检查缓存池中的备用路径
             cached_path = self.get_from_cache(service_index, edge)
-            if cached_path:
-                print(f"Recomputed backup path for service {service_index} and edge {edge} using cached path.")
-                if service_index not in self.backup_paths:
-                    self.backup_paths[service_index] = {}
-                self.backup_paths[service_index][edge] = cached_path
+            if cached_path and self.relay_admits(service_index, cached_path):
+                logger.debug("Recomputed backup path for service %s and edge %s using cached path.", service_index, edge)
+                self.metrics.count('backup.cache')
+                self.set_backup_path(service_index, edge, cached_path)
                 continue
 
-            # Step 4: 使用 Dijkstra 重新计算备用路径
-            try:
-                backup_path = nx.shortest_path(self.G, source=src, target=snk, weight='weight')
-                # backup_edges = [(backup_path[i], backup_path[i + 1]) for i in range(len(backup_path) - 1)]
-                backup_edges = [(min(backup_path[i], backup_path[i + 1]), max(backup_path[i], backup_path[i + 1])) for i in range(len(backup_path) - 1)]
-
-                if service_index not in self.backup_paths:
-                    self.backup_paths[service_index] = {}
-                self.backup_paths[service_index][edge] = {'path': backup_path, 'edges': backup_edges}
-                print(f"Recomputed backup path for service {service_index} and edge {edge} using Dijkstra.")
-            except nx.NetworkXNoPath:
-                print(f"Failed to find a new backup path for service {service_index} and edge {edge}.")
+            # Step 4: 使用 Dijkstra 重新计算备用路径（跳过 edge 本身和当前故障的边）
+            backup_path_info = self.compute_backup_path(src, snk, edge, service_index)
+            if backup_path_info is None:
+                logger.warning("Failed to find a new backup path for service %s and edge %s.", service_index, edge)
+                self.metrics.count('backup.failed')
+                continue
+            self.set_backup_path(service_index, edge, backup_path_info)
+            logger.debug("Recomputed backup path for service %s and edge %s using Dijkstra.", service_index, edge)
+            self.metrics.count('backup.dijkstra')
 
 
     def update_service_path(self, service_index, edge):
         # 将当前路径加入缓存池
         old_path = self.paths_in_use.get(service_index)
         if old_path:
-            print(f"Adding old path of service {service_index} to cache.")
+            logger.debug("Adding old path of service %s to cache.", service_index)
             self.add_to_cache(service_index, old_path)
 
         # 优先使用已计算好的备用路径
-        backup_path_info = self.backup_paths.get(service_index, {}).get(edge)
-        if backup_path_info:
-            print(f"Switching service {service_index} to backup path for edge {edge}")
-            self.paths_in_use[service_index] = backup_path_info
+        backup_path_info = self.get_backup_path(service_index, edge)
+        if backup_path_info and self.path_alive(backup_path_info) and self.relay_admits(service_index, backup_path_info):
+            logger.debug("Switching service %s to backup path for edge %s", service_index, edge)
+            self.metrics.count('switch.backup')
+            self._set_path_in_use(service_index, backup_path_info)
             return True  # 返回 True 表示更新成功
 
         # 尝试局部路径重计算
         src, snk = self.paths_in_use[service_index]['path'][0], self.paths_in_use[service_index]['path'][-1]
-        local_path = self.local_recompute_path(src, snk)
+        local_path = self.local_recompute_path(src, snk, self.paths_in_use[service_index], edge)
         if local_path:
-            print(f"Switching service {service_index} to locally recomputed path.")
-            self.paths_in_use[service_index] = local_path
+            logger.debug("Switching service %s to locally recomputed path.", service_index)
+            self.metrics.count('switch.local')
+            self._set_path_in_use(service_index, local_path)
             return True  # 返回 True 表示更新成功
 
         # 检查缓存池中的路径
         cached_path = self.get_from_cache(service_index, edge)
-        if cached_path:
-            print(f"Switching service {service_index} to cached path.")
-            self.paths_in_use[service_index] = cached_path
+        if cached_path and self.relay_admits(service_index, cached_path):
+            logger.debug("Switching service %s to cached path.", service_index)
+            self.metrics.count('switch.cache')
+            self._set_path_in_use(service_index, cached_path)
             return True  # 返回 True 表示更新成功
 
-        # 使用 Dijkstra 重新计算路径
+        # 使用 Dijkstra 重新计算路径（中继路由时经中继辅助图）
         try:
-            new_path = nx.shortest_path(self.G, source=src, target=snk, weight='weight')
-            # new_edges = [(new_path[i], new_path[i + 1]) for i in range(len(new_path) - 1)]
-            new_edges = [(min(new_path[i], new_path[i + 1]), max(new_path[i], new_path[i + 1])) for i in range(len(new_path) - 1)]
-
-            self.paths_in_use[service_index] = {'path': new_path, 'edges': new_edges}
-            print(f"Switching service {service_index} to newly computed path using Dijkstra.")
+            self._set_path_in_use(service_index, self.reroute(service_index, src, snk))
+            logger.debug("Switching service %s to newly computed path using Dijkstra.", service_index)
+            self.metrics.count('switch.dijkstra')
             return True  # 返回 True 表示更新成功
         except nx.NetworkXNoPath:
-            print(f"Failed to find any path for service {service_index} after edge {edge} failed.")
+            logger.warning("Failed to find any path for service %s after edge %s failed.", service_index, edge)
+            self.metrics.count('switch.failed')
             return False  # 返回 False 表示没有找到路径
 
-    def save_to_csv(self, paths_csv, backup_csv):
+    def save_to_csv(self, paths_csv, backup_csv, backup_refs_csv=None):
         """保存 paths_in_use 和 backup_paths 到 CSV 文件"""
         # 保存 paths_in_use 到 CSV 文件
         with open(paths_csv, 'w', newline='') as csv_file:
@@ -321,10 +1204,18 @@ class PathCalculator:
             for service_index, data in self.paths_in_use.items():
                 writer.writerow([service_index, data['path'], data['edges']])
 
-        # 保存 backup_paths 到 CSV 文件
+        # 保存共享备用路径表到 CSV 文件，每条路径只写一次
         with open(backup_csv, 'w', newline='') as csv_file:
             writer = csv.writer(csv_file)
-            writer.writerow(['Service Index', 'Failed Edge', 'Backup Path', 'Backup Edges'])
-            for service_index, edge_paths in self.backup_paths.items():
-                for edge, path_info in edge_paths.items():
-                    writer.writerow([service_index, edge, path_info['path'], path_info['edges']])
+            writer.writerow(['Handle', 'Src', 'Snk', 'Failed Edge', 'Backup Path', 'Backup Edges'])
+            for handle, ((src, snk, edge), path_info) in enumerate(zip(self.backup_table.keys, self.backup_table.entries)):
+                writer.writerow([handle, src, snk, edge, path_info['path'], path_info['edges']])
+
+        # 保存业务到备用路径句柄的引用关系
+        if backup_refs_csv:
+            with open(backup_refs_csv, 'w', newline='') as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(['Service Index', 'Failed Edge', 'Handle'])
+                for service_index, edge_handles in self.backup_paths.items():
+                    for edge, handle in edge_handles.items():
+                        writer.writerow([service_index, edge, handle])
@@ -0,0 +1,126 @@
+# src/path_pool.py
+
+from array import array
+from bisect import bisect_left
+
+
+class PathRecord:
+    """
+    路径池中的一条路径，只保存起点和在池中的句柄，边编号存放在池的扁平数组里。
+    兼容原来 {'path': [...], 'edges': [...]} 字典的读法：节点序列和 (min, max) 边元组在访问时由边编号推出。
+    """
+    __slots__ = ('pool', 'handle', 'src')
+    _keys = ('path', 'edges')
+
+    def __init__(self, pool, handle, src):
+        self.pool = pool
+        self.handle = handle
+        self.src = src
+
+    @property
+    def eids(self):
+        """路径上的边编号（按路径顺序）"""
+        pool = self.pool
+        return pool.eids[pool.ptr[self.handle]:pool.ptr[self.handle + 1]]
+
+    def nodes(self):
+        ends = self.pool.ends
+        u = self.src
+        nodes = [u]
+        for eid in self.eids:
+            a, b = ends[eid]
+            u = b if u == a else a
+            nodes.append(u)
+        return nodes
+
+    def edge_list(self):
+        ends = self.pool.ends
+        return [ends[eid] for eid in self.eids]
+
+    def has_edge(self, eid):
+        """边编号 eid 是否在路径上（在按编号排序的副本上二分查找）"""
+        pool = self.pool
+        lo, hi = pool.ptr[self.handle], pool.ptr[self.handle + 1]
+        i = bisect_left(pool.sorted_eids, eid, lo, hi)
+        return i < hi and pool.sorted_eids[i] == eid
+
+    def crosses(self, edge_mask):
+        """路径是否经过 edge_mask 中为真的边"""
+        return any(edge_mask[eid] for eid in self.eids)
+
+    def __getitem__(self, key):
+        if key == 'path':
+            return self.nodes()
+        if key == 'edges':
+            return self.edge_list()
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self._keys else default
+
+    def keys(self):
+        return self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def to_dict(self):
+        return {'path': self.nodes(), 'edges': self.edge_list()}
+
+    def __eq__(self, other):
+        if isinstance(other, PathRecord) and other.pool is self.pool:
+            return other.handle == self.handle
+        if isinstance(other, (PathRecord, dict)):
+            return list(other['path']) == self.nodes()
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self.pool), self.handle))
+
+    def __repr__(self):
+        return f"PathRecord({self.nodes()})"
+
+
+class PathPool:
+    """
+    全局的路径池：每条路径存为一段 int32 边编号，所有路径首尾相接放在一个扁平数组中（与 CSR 的组织方式相同），
+    ptr[h]:ptr[h + 1] 为句柄 h 的边编号。相同起点、相同边序列的路径只保存一份（intern）。
+    另存一份段内按编号排序的副本，用于 O(log L) 判断路径是否经过某条边。
+    """
+    def __init__(self, graph):
+        self.graph = graph
+        node_ids = graph.node_ids.tolist()
+        # 每条边的 (min, max) 端点元组，所有路径的 'edges' 共用这些元组对象
+        self.ends = [(min(node_ids[a], node_ids[b]), max(node_ids[a], node_ids[b]))
+                     for a, b in zip(graph.edge_src.tolist(), graph.edge_dst.tolist())]
+        self.eids = array('i')
+        self.sorted_eids = array('i')
+        self.ptr = array('q', [0])
+        self.records = []
+        self.index = {}  # (起点, 边编号字节串) -> 句柄
+
+    def __len__(self):
+        return len(self.records)
+
+    def intern(self, path):
+        """返回节点路径 path 对应的 PathRecord，已存在时复用"""
+        return self.intern_eids(path[0], self.graph.path_edge_ids(path))
+
+    def intern_eids(self, src, eids):
+        eids = array('i', eids)
+        key = (src, eids.tobytes())
+        handle = self.index.get(key)
+        if handle is not None:
+            return self.records[handle]
+        handle = len(self.records)
+        self.eids.extend(eids)
+        self.sorted_eids.extend(sorted(eids))
+        self.ptr.append(len(self.eids))
+        record = PathRecord(self, handle, src)
+        self.records.append(record)
+        self.index[key] = handle
+        return record
+
+    def nbytes(self):
+        """扁平数组占用的字节数（不含句柄索引和记录对象）"""
+        return sum(a.itemsize * len(a) for a in (self.eids, self.sorted_eids, self.ptr))
@@ -0,0 +1,59 @@
+# src/path_table.py
+
+class PathTable:
+    """
+    共享的备用路径表。
+    每条路径只保存一份，业务通过句柄 (handle，即 entries 的下标) 引用。
+    以 (src, snk, 故障边) 为键的路径在所有同源同宿的业务之间共享，
+    故障模拟过程中为单个业务生成的路径也存放在表中，但不进入共享索引。
+    """
+    def __init__(self):
+        self.entries = []  # handle -> {'path': [...], 'edges': [...]} 或路径池中的 PathRecord
+        self.keys = []     # handle -> (src, snk, edge)
+        self.index = {}    # (src, snk, edge) -> handle，None 表示该故障下没有备用路径
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def lookup(self, key):
+        """返回共享键对应的句柄；键未计算过时抛出 KeyError，无备用路径时返回 None"""
+        return self.index[key]
+
+    def get(self, handle):
+        return self.entries[handle]
+
+    def add(self, key, path_info, shared=True):
+        """添加一条路径并返回句柄，shared=True 时登记到 (src, snk, edge) 共享索引"""
+        if path_info is None:
+            # 记录“该故障下无备用路径”，避免重复计算
+            if shared:
+                self.index[key] = None
+            return None
+        handle = len(self.entries)
+        self.entries.append(path_info)
+        self.keys.append(key)
+        if shared:
+            self.index[key] = handle
+        return handle
+
+    def to_dict(self):
+        """转换为可 JSON 序列化的结构"""
+        return {
+            'keys': [[src, snk, list(edge)] for src, snk, edge in self.keys],
+            'entries': [dict(path_info) for path_info in self.entries],  # PathRecord 转为普通字典
+            'shared': [self.index.get(key) == handle for handle, key in enumerate(self.keys)],
+            'no_path': [[src, snk, list(edge)] for (src, snk, edge), handle in self.index.items() if handle is None],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        table = cls()
+        for key, path_info, shared in zip(data.get('keys', []), data.get('entries', []), data.get('shared', [])):
+            src, snk, edge = key
+            table.add((src, snk, tuple(edge)), path_info, shared=shared)
+        for src, snk, edge in data.get('no_path', []):
+            table.index[(src, snk, tuple(edge))] = None
+        return table
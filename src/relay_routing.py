@@ -0,0 +1,345 @@
+# src/relay_routing.py
+
+from collections import OrderedDict
+from heapq import heappush, heappop
+
+import networkx as nx
+import numpy as np
+from models import OmsTable, RelayTable
+
+
+class RelayRouter:
+    """
+    基于中继（再生）节点的分层路由。
+    光信号的传输距离（OmsLink.distance 之和）和 OSNR 劣化（OmsLink.osnr 之和）受限，
+    超过限制时必须在中继节点做电再生，中继的 dimColors 允许再生时转换波长。
+    同一节点上互为 relatedRelayId 的两条中继构成一个再生器，可用颜色为两侧 dimColors 的交集，
+    业务只能使用能容纳其频宽（端点颜色内 m_width 个连续频隙）的空闲再生器。
+
+    预先对每个中继节点做一次受限 Dijkstra，得到它在传输限制内可达的其他中继节点及段路径，
+    构成规模小得多的中继辅助图并缓存；业务查询时只需从源、宿各做一次受限搜索接入辅助图，
+    再在辅助图上做 Dijkstra，最后把各段路径拼接成完整路径。
+    """
+    def __init__(self, graph, oms_links, relays, max_distance=None, max_noise=None, excluded_cache_size=64):
+        self.graph = graph
+        self.max_distance = max_distance
+        self.max_noise = max_noise
+
+        # 聚合边的传输距离和 OSNR 劣化取自最便宜的那条并行 OMS（与边的权重一致）
+        if not hasattr(oms_links, 'column'):
+            oms_links = OmsTable.from_records(oms_links)
+        if not hasattr(relays, 'column'):
+            relays = RelayTable.from_records(relays)
+        m = graph.number_of_edges()
+        self.edge_distance = graph.edge_distance.tolist()
+        best_cost = [float('inf')] * m
+        noise = [0.0] * m
+        positions = graph.oms_positions(oms_links.column('oms_id'))
+        for pos, cost, osnr in zip(positions.tolist(), oms_links.column('cost').tolist(),
+                                   oms_links.column('osnr').tolist()):
+            if pos < 0:
+                continue
+            eid = int(graph.oms_edge[pos])
+            if cost < best_cost[eid]:
+                best_cost[eid] = cost
+                noise[eid] = float(osnr)
+        self.edge_noise = noise
+
+        # 再生器：同一节点上互为 relatedRelayId 的一对中继，两侧 dimColors 的交集非空；
+        # relatedRelayId 缺失或在其他节点上的中继不能单独再生
+        relay_ids = relays.column('relay_id').tolist()
+        related_ids = relays.column('related_relay_id').tolist()
+        nodes = relays.column('node_id').tolist()
+        dim_colors = relays.colors('dim_colors')
+        row_of = {relay_id: i for i, relay_id in enumerate(relay_ids)}
+        pairs = {}  # 中继节点 -> {可用颜色的区间字节: [ColorRanges, 再生器数]}
+        for i, (relay_id, related_id, node) in enumerate(zip(relay_ids, related_ids, nodes)):
+            j = row_of.get(related_id)
+            if j is None or relay_id >= related_id or nodes[j] != node or node not in graph.index_of:
+                continue
+            colors = dim_colors[i].intersection(dim_colors[j])
+            if colors:
+                groups = pairs.setdefault(node, {})
+                groups.setdefault(colors.intervals.tobytes(), [colors, 0])[1] += 1
+        # 中继节点 -> [(可用颜色, 再生器数)]，颜色相同的再生器合并为一组
+        self.pair_colors = {node: [tuple(group) for group in groups.values()] for node, groups in pairs.items()}
+        self.capacity = {node: sum(count for _, count in groups) for node, groups in self.pair_colors.items()}
+        self.in_use = {}
+        self.demands = {}     # 业务 -> (m_width, 端点可用颜色)
+        self._fitting = {}    # (节点, m_width, 颜色) -> 能容纳该频宽的再生器数
+        self.relay_nodes = sorted(self.capacity)
+        self._relay_index = np.zeros(graph.number_of_nodes(), dtype=bool)
+        self._relay_index[[graph.index_of[node] for node in self.relay_nodes]] = True
+        self._relay_indices = [graph.index_of[node] for node in self.relay_nodes]
+
+        self.segments = {}       # 中继节点 -> {可达中继节点: (cost, 稠密编号路径)}
+        self.segment_edges = {}  # 中继节点 -> 其各段经过的边编号集合
+        self.endpoint_cache = {}  # 非中继端点 -> {可达中继节点或端点: (cost, 稠密编号路径)}
+        self._stale = set()      # 故障状态变化后需要重算段的中继节点
+        # 跳过额外边（备用路径计算）时另算的段，按跳过的边集合缓存最近 excluded_cache_size 组，与业务颜色无关
+        self.excluded_cache = OrderedDict()
+        self.excluded_cache_size = excluded_cache_size
+        self.build()
+
+    def _within_reach(self, distance, noise):
+        if self.max_distance is not None and distance > self.max_distance:
+            return False
+        if self.max_noise is not None and noise > self.max_noise:
+            return False
+        return True
+
+    def reachable(self, source_index, edge_mask=None):
+        """
+        从 source_index 出发按 cost 做 Dijkstra，剪掉超出传输限制的扩展，
+        返回在限制内可达的每个节点的 (cost, 前驱数组, 前驱边编号数组)。
+        """
+        adj = self.graph._adjacency()
+        n = len(adj)
+        inf = float('inf')
+        dist = [inf] * n
+        pred = [-1] * n
+        pred_eid = [-1] * n
+        length = [0.0] * n
+        noise = [0.0] * n
+        done = bytearray(n)
+        dist[source_index] = 0
+        heap = [(0, source_index)]
+        edge_distance, edge_noise = self.edge_distance, self.edge_noise
+        while heap:
+            d, v = heappop(heap)
+            if done[v]:
+                continue
+            done[v] = 1
+            for w, weight, eid in adj[v]:
+                if done[w] or (edge_mask is not None and edge_mask[eid]):
+                    continue
+                wl, wn = length[v] + edge_distance[eid], noise[v] + edge_noise[eid]
+                if not self._within_reach(wl, wn):
+                    continue
+                nd = d + weight
+                if nd < dist[w]:
+                    dist[w] = nd
+                    pred[w] = v
+                    pred_eid[w] = eid
+                    length[w] = wl
+                    noise[w] = wn
+                    heappush(heap, (nd, w))
+        return dist, pred, pred_eid
+
+    def _segments_from(self, source_index, targets, edge_mask=None):
+        """从 source_index 到各目标的受限段，返回 (段, 各段经过的边编号集合)"""
+        dist, pred, pred_eid = self.reachable(source_index, edge_mask)
+        segments = {}
+        eids = set()
+        for t in targets:
+            if t == source_index or dist[t] == float('inf'):
+                continue
+            path = []
+            v = t
+            while v >= 0:
+                path.append(v)
+                eids.add(pred_eid[v])
+                v = pred[v]
+            path.reverse()
+            segments[t] = (dist[t], path)
+        eids.discard(-1)
+        return segments, eids
+
+    def build(self, edge_mask=None):
+        """为所有中继节点预计算传输限制内可达的中继段（跳过 edge_mask 中的故障边），构成中继辅助图"""
+        self.segments, self.segment_edges = {}, {}
+        for r in self._relay_indices:
+            self.segments[r], self.segment_edges[r] = self._segments_from(r, self._relay_indices, edge_mask)
+        self.endpoint_cache = {}
+        self.excluded_cache.clear()
+        self._stale = set()
+
+    def invalidate_edges(self, eids, edge_mask=None):
+        """
+        边故障或恢复后更新缓存段，edge_mask 为变化后的故障位图。
+        边故障时只有段经过这些边的中继需要重算；边恢复后任何中继都可能得到更短的段，全部重算。
+        重算推迟到下一次查询用到该中继时，端点接入段直接丢弃。
+        """
+        eids = set(eids)
+        if not eids:
+            return
+        self.endpoint_cache = {}
+        self.excluded_cache.clear()
+        if edge_mask is None or not all(edge_mask[eid] for eid in eids):
+            self._stale.update(self._relay_indices)
+            return
+        for r, used in self.segment_edges.items():
+            if not eids.isdisjoint(used):
+                self._stale.add(r)
+
+    def _relay_segments(self, r, edge_mask, excluded, query_cache):
+        """中继 r 的出段：故障状态变化后按 edge_mask 重算；段经过 excluded 中的边时按跳过这些边的位图另算并缓存"""
+        if r in self._stale:
+            self.segments[r], self.segment_edges[r] = self._segments_from(r, self._relay_indices, edge_mask)
+            self._stale.discard(r)
+        if not excluded or excluded.isdisjoint(self.segment_edges[r]):
+            return self.segments[r]
+        if r not in query_cache:
+            query_cache[r] = self._segments_from(r, self._relay_indices, query_cache['mask'])[0]
+        return query_cache[r]
+
+    def _endpoint_segments(self, node_index, other_index, edge_mask, excluded, query_cache):
+        """端点接入辅助图：到各中继节点（以及直接到另一个端点）的受限段"""
+        mask = query_cache['mask'] if excluded else edge_mask
+        if node_index in self.segments:
+            segments = self._relay_segments(node_index, edge_mask, excluded, query_cache)
+        elif excluded:
+            segments = query_cache.get(('endpoint', node_index))
+            if segments is None:
+                segments = self._segments_from(node_index, self._relay_indices, mask)[0]
+                query_cache[('endpoint', node_index)] = segments
+        else:
+            segments = self.endpoint_cache.get(node_index)
+            if segments is None:
+                segments = self._segments_from(node_index, self._relay_indices, mask)[0]
+                self.endpoint_cache[node_index] = segments
+        if other_index not in segments:
+            if excluded:
+                direct = query_cache.get(('direct', node_index, other_index))
+                if direct is None:
+                    direct = self._segments_from(node_index, [other_index], mask)[0]
+                    query_cache[('direct', node_index, other_index)] = direct
+            else:
+                direct = self._segments_from(node_index, [other_index], mask)[0]
+            segments = dict(segments)
+            segments.update(direct)
+        return segments
+
+    def set_demand(self, service_index, service):
+        """登记业务的频宽和端点可用颜色（sourceDimColors 与 targetDimColors 的交集）"""
+        colors = None
+        for dim_colors in (service.source_dim_colors, service.target_dim_colors):
+            if dim_colors:
+                colors = dim_colors if colors is None else colors.intersection(dim_colors)
+        self.demands[service_index] = (int(service.m_width), colors)
+
+    def _fitting_pairs(self, node, demand):
+        """节点上能容纳业务的再生器数：再生器颜色与业务颜色的交集中有 m_width 个连续频隙"""
+        if demand is None:
+            return self.capacity.get(node, 0)
+        width, colors = demand
+        key = (node, width, None if colors is None else colors.intervals.tobytes())
+        count = self._fitting.get(key)
+        if count is None:
+            count = sum(pairs for pair, pairs in self.pair_colors.get(node, ())
+                        if (pair if colors is None else pair.intersection(colors)).longest_run() >= width)
+            self._fitting[key] = count
+        return count
+
+    def _free(self, node, held, demand=None):
+        """
+        节点上可供业务使用的空闲再生器数，held 为本业务当前占用、切换路径时会释放的再生节点。
+        占用只按节点计数（regenerators 只记录节点），同一节点上再生器的颜色不同时取空闲数与能容纳该业务的再生器数的较小值。
+        """
+        free = self.capacity.get(node, 0) - self.in_use.get(node, 0) + held.count(node)
+        return min(free, self._fitting_pairs(node, demand))
+
+    def route(self, src, snk, edge_mask=None, excluded_edges=None, held=(), service_index=None):
+        """
+        在中继辅助图上计算 src 到 snk 的最小代价路径，跳过 edge_mask 中的故障边和 excluded_edges 中的边编号。
+        held 为业务当前占用的再生节点（重路由时会被释放，计入可用容量）；
+        给出 service_index 时只在能容纳该业务颜色的再生器处再生（见 set_demand）。
+        返回 {'path', 'edges', 'regenerators'}，regenerators 为需要再生的中继节点；
+        无可行路径时抛出 nx.NetworkXNoPath。
+        """
+        s, t = self.graph._endpoints(src, snk)
+        if s == t:
+            return {'path': [src], 'edges': [], 'regenerators': []}
+        excluded = set(excluded_edges) if excluded_edges else None
+        query_cache = {}
+        if excluded:
+            key = tuple(sorted(excluded))
+            query_cache = self.excluded_cache.pop(key, None)
+            if query_cache is None:
+                mask = bytearray(edge_mask) if edge_mask is not None else bytearray(self.graph.number_of_edges())
+                for eid in excluded:
+                    mask[eid] = 1
+                query_cache = {'mask': mask}
+            self.excluded_cache[key] = query_cache
+            while len(self.excluded_cache) > self.excluded_cache_size:
+                self.excluded_cache.popitem(last=False)
+        held = list(held)
+        demand = self.demands.get(service_index)
+        source_segments = self._endpoint_segments(s, t, edge_mask, excluded, query_cache)
+        target_segments = self._endpoint_segments(t, s, edge_mask, excluded, query_cache)
+        relay_mask = self._relay_index
+
+        # 中继辅助图上的 Dijkstra：节点为 s、t 和各中继节点，边为缓存的受限段
+        # 中继到 t 的段取自 target_segments（方向为 t -> 中继），拼接时再反转
+        inf = float('inf')
+        dist = {s: 0}
+        pred = {}
+        done = set()
+        heap = [(0, s)]
+        while heap:
+            d, v = heappop(heap)
+            if v in done:
+                continue
+            done.add(v)
+            if v == t:
+                break
+            if v == s:
+                out = source_segments
+            elif relay_mask[v]:
+                node = int(self.graph.node_ids[v])
+                if self._free(node, held, demand) <= 0:
+                    continue  # 中继已被占满或没有能容纳该业务颜色的再生器，不能在此再生
+                out = self._relay_segments(v, edge_mask, excluded, query_cache)
+                to_target = target_segments.get(v)
+                if to_target is not None and d + to_target[0] < dist.get(t, inf):
+                    dist[t] = d + to_target[0]
+                    pred[t] = (v, to_target[1], True)
+                    heappush(heap, (dist[t], t))
+            else:
+                continue
+            for w, (cost, path) in out.items():
+                if w != t and not relay_mask[w]:
+                    continue
+                nd = d + cost
+                if nd < dist.get(w, inf):
+                    dist[w] = nd
+                    pred[w] = (v, path, False)
+                    heappush(heap, (nd, w))
+        if t not in done:
+            raise nx.NetworkXNoPath(f"No relay-feasible path between {src} and {snk}.")
+
+        pieces = []
+        regenerators = []
+        v = t
+        while v != s:
+            prev, path, reverse = pred[v]
+            pieces.append(path[::-1] if reverse else path)
+            if prev != s:
+                regenerators.append(int(self.graph.node_ids[prev]))
+            v = prev
+        dense = [s]
+        for path in reversed(pieces):
+            dense.extend(path[1:])
+        node_ids = self.graph.node_ids
+        path = [int(node_ids[v]) for v in dense]
+        edges = [(min(path[i], path[i + 1]), max(path[i], path[i + 1])) for i in range(len(path) - 1)]
+        return {'path': path, 'edges': edges, 'regenerators': regenerators[::-1]}
+
+    def admits(self, regenerators, held=(), service_index=None):
+        """已有路径的每个再生节点是否仍有能容纳该业务的空闲再生器（用于切换到预计算的备用路径或缓存路径前）"""
+        held = list(held)
+        demand = self.demands.get(service_index)
+        return all(self._free(node, held, demand) >= regenerators.count(node) for node in set(regenerators))
+
+    def fits(self, regenerators, service_index=None):
+        """路径的每个再生节点是否有足够的能容纳该业务颜色的再生器（不看当前占用，用于检查不区分业务计算的备用路径）"""
+        demand = self.demands.get(service_index)
+        return all(self._fitting_pairs(node, demand) >= regenerators.count(node) for node in set(regenerators))
+
+    def reserve(self, regenerators):
+        for node in regenerators:
+            self.in_use[node] = self.in_use.get(node, 0) + 1
+
+    def release(self, regenerators):
+        for node in regenerators:
+            self.in_use[node] = max(0, self.in_use.get(node, 0) - 1)
@@ -1,33 +1,99 @@
 # src/simulator.py
 
+from metrics import get_logger
+
+logger = get_logger('simulator')
+
+
 class NetworkSimulator:
     def __init__(self, path_calculator):
         self.path_calculator = path_calculator
 
     def simulate_failure(self, edge):
-        print(f"Simulating failure on edge: {edge}")
+        logger.info("Simulating failure on edge: %s", edge)
         
         # 先将故障边加入 path_calculator 的 failed_edges 列表
         if edge not in self.path_calculator.failed_edges:
             self.path_calculator.failed_edges.append(edge)
-            print(f"Edge {edge} added to failed edges.")
+            logger.debug("Edge %s added to failed edges.", edge)
         else:
-            print(f"Edge {edge} is already in failed edges.")
+            logger.warning("Edge %s is already in failed edges.", edge)
         
         # 处理故障，影响路径和图结构
         if edge in self.path_calculator.G.edges:
             self.path_calculator.handle_failure(edge)
         else:
-            print(f"Error: Edge {edge} does not exist in the graph.")
+            logger.warning("Edge %s does not exist in the graph.", edge)
+
+    def simulate_failures(self, edges):
+        """
+        模拟一组边同时故障（如 SRLG 光缆中断）：整组边先记入 failed_edges，
+        受影响的业务取并集后在故障后的图上各重路由一次。
+        """
+        edges = [(min(edge[0], edge[1]), max(edge[0], edge[1])) for edge in edges]
+        logger.info("Simulating failure on edges: %s", edges)
+        existing = []
+        for edge in edges:
+            if edge not in self.path_calculator.G.edges:
+                logger.warning("Edge %s does not exist in the graph.", edge)
+                continue
+            if edge not in self.path_calculator.failed_edges:
+                self.path_calculator.failed_edges.append(edge)
+            existing.append(edge)
+        if existing:
+            self.path_calculator.handle_failures(existing)
+        return existing
+
+    def simulate_srlg_failure(self, group_id, srlg_groups):
+        """
+        模拟共享风险组 group_id 中所有 OMS 同时故障，srlg_groups 为 load_srlg_groups 的结果。
+        返回整条中断的边列表（已记入 failed_edges）。
+        """
+        oms_ids = srlg_groups.get(group_id)
+        if not oms_ids:
+            logger.warning("SRLG %s is not defined.", group_id)
+            return []
+        logger.info("Simulating failure of SRLG %s (%s OMS)", group_id, len(oms_ids))
+        down_edges = self.path_calculator.handle_srlg_failure(oms_ids)
+        for edge in down_edges:
+            if edge not in self.path_calculator.failed_edges:
+                self.path_calculator.failed_edges.append(edge)
+                logger.debug("Edge %s added to failed edges.", edge)
+        return down_edges
 
-    def simulate_recovery(self, edge):
+    def simulate_recovery(self, edge, now=None):
         """
-        模拟恢复边，但不立即重新计算路径，只更新状态，表明这条边可以使用。
+        模拟恢复边，更新状态，表明这条边可以使用。
+        启用返回式恢复（path_calculator.enable_revertive）时，原始路径经过该边的绕行业务
+        会在 hold-off 到期后被重新优化；否则不重新计算路径。
         """
         # 从 failed_edges 中移除故障边
         if edge in self.path_calculator.failed_edges:
             self.path_calculator.failed_edges.remove(edge)
-            print(f"Edge {edge} marked as recovered and is now available for use.")
+            logger.info("Edge %s marked as recovered and is now available for use.", edge)
+            self.path_calculator.handle_recovery(edge, now)
         else:
-            print(f"Edge {edge} was not in the failed edges list.")
-        # 这里只是标记边可用，不需要重新计算路径
+            logger.warning("Edge %s was not in the failed edges list.", edge)
+
+    def simulate_oms_failure(self, oms_id):
+        """
+        模拟单条 OMS（及其反向 OMS）故障；只有当节点对之间所有并行 OMS 都故障时，整条边才记入 failed_edges。
+        """
+        logger.info("Simulating failure on OMS: %s", oms_id)
+        edge = self.path_calculator.handle_oms_failure(oms_id)
+        if edge is not None and edge not in self.path_calculator.failed_edges:
+            self.path_calculator.failed_edges.append(edge)
+            logger.debug("Edge %s added to failed edges.", edge)
+        return edge
+
+    def simulate_oms_recovery(self, oms_id, now=None):
+        """
+        恢复单条 OMS；若所在边因此重新可用，则从 failed_edges 中移除（并登记返回式恢复）。
+        """
+        edge = self.path_calculator.handle_oms_recovery(oms_id)
+        if edge is not None and edge in self.path_calculator.failed_edges:
+            self.path_calculator.failed_edges.remove(edge)
+            logger.info("Edge %s marked as recovered and is now available for use.", edge)
+            self.path_calculator.handle_recovery(edge, now)
+        logger.info("OMS %s marked as recovered.", oms_id)
+        return edge
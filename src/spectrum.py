@@ -0,0 +1,193 @@
+# src/spectrum.py
+
+import numpy as np
+from models import OmsTable
+
+WORD_BITS = 64
+POLICIES = ('first_fit', 'last_fit', 'best_fit', 'random_fit')
+
+
+def colors_to_bitset(colors, n_words):
+    """把颜色（频隙）集合转换为 uint64 位图，第 i 个频隙对应第 i 位；支持 ColorRanges 区间和编号列表"""
+    if hasattr(colors, 'to_bits'):
+        bits = colors.to_bits(n_words * WORD_BITS)
+    else:
+        bits = np.zeros(n_words * WORD_BITS, dtype=bool)
+        if len(colors):
+            bits[np.asarray(colors, dtype=np.int64)] = True
+    return np.packbits(bits, bitorder='little').view('<u8')
+
+
+def block_bitset(start, width, n_words):
+    """[start, start + width) 连续频隙的位图"""
+    bits = np.zeros(n_words * WORD_BITS, dtype=bool)
+    bits[start:start + width] = True
+    return np.packbits(bits, bitorder='little').view('<u8')
+
+
+def bitset_to_bits(bitset, n_slots):
+    """位图展开为长度 n_slots 的布尔数组"""
+    return np.unpackbits(bitset.view(np.uint8), bitorder='little')[:n_slots].astype(bool)
+
+
+def fit_starts(bitset, width, n_slots, policy='first_fit', rng=None):
+    """
+    返回位图中能放下 width 个连续空闲频隙的起点，按分配策略排序：
+    first_fit 从低到高，last_fit 从高到低，best_fit 优先放进最短的空闲段，random_fit 随机顺序。
+    """
+    bits = bitset_to_bits(bitset, n_slots).astype(np.int32)
+    if width <= 0 or width > n_slots:
+        return np.empty(0, dtype=np.int64)
+    cs = np.concatenate(([0], np.cumsum(bits)))
+    starts = np.nonzero(cs[width:] - cs[:-width] == width)[0]
+    if len(starts) == 0 or policy == 'first_fit':
+        return starts
+    if policy == 'last_fit':
+        return starts[::-1]
+    if policy == 'random_fit':
+        rng = rng if rng is not None else np.random.default_rng()
+        return rng.permutation(starts)
+    if policy == 'best_fit':
+        # 每个起点所在空闲段的长度，段越短越优先，段内按起点从低到高
+        edges = np.diff(np.concatenate(([0], bits, [0])))
+        run_starts = np.nonzero(edges == 1)[0]
+        run_lengths = np.nonzero(edges == -1)[0] - run_starts
+        run_of = np.searchsorted(run_starts, starts, side='right') - 1
+        return starts[np.lexsort((starts, run_lengths[run_of]))]
+    raise ValueError(f"Unknown spectrum assignment policy: {policy}")
+
+
+class SpectrumState:
+    """
+    按 OMS 维护频隙占用的位图（uint64 数组，每行一条 OMS）。
+    available 为 OMS 的可用频隙（OmsLink.colors），used 为已分配的频隙；
+    edge_free 为聚合边上任意一条存活 OMS 的空闲频隙（按位或），路径的公共空闲频隙即路径上各边 edge_free 的按位与。
+    一条业务在每条边上只占用一条 OMS，分配时逐边挑选能完整容纳该频隙块的光纤。
+    """
+    def __init__(self, graph, oms_links, oms_alive=None, n_slots=None, missing_colors='all'):
+        self.graph = graph
+        if not hasattr(oms_links, 'column'):
+            oms_links = OmsTable.from_records(oms_links)
+        colors = oms_links.colors('colors')
+        max_color = colors.max() or 0
+        self.n_slots = n_slots if n_slots is not None else max_color + 1
+        self.n_words = -(-self.n_slots // WORD_BITS)
+        n_oms = graph.number_of_oms()
+        self.oms_alive = oms_alive if oms_alive is not None else np.ones(n_oms, dtype=bool)
+
+        # 相同颜色配置的 OMS 共用一份位图，按编码整体赋值；未配置 colors 的 OMS 默认视为整段频谱可用
+        full = block_bitset(0, self.n_slots, self.n_words)
+        shared = np.array([colors_to_bitset(ranges, self.n_words) if ranges else
+                           (full if missing_colors == 'all' else np.zeros(self.n_words, dtype=np.uint64))
+                           for ranges in colors.shared()], dtype=np.uint64).reshape(-1, self.n_words)
+        positions = graph.oms_positions(oms_links.column('oms_id'))
+        known = positions >= 0
+        self.available = np.zeros((n_oms, self.n_words), dtype=np.uint64)
+        self.available[positions[known]] = shared[colors.codes[known]]
+        self.used = np.zeros_like(self.available)
+        self.edge_free = np.zeros((graph.number_of_edges(), self.n_words), dtype=np.uint64)
+        self.refresh_edges(range(graph.number_of_edges()))
+
+        self.demands = {}      # 业务 -> (m_width, 允许使用的频隙位图)
+        self.assignments = {}  # 业务 -> (起始频隙, 宽度, 占用的 OMS 位置数组)
+        self.oms_services = {}  # OMS 位置 -> 占用该 OMS 的业务集合
+        self.blocked = set()   # 当前路径上找不到可用频谱的业务
+
+    def refresh_edges(self, eids):
+        """重新聚合若干条边的空闲频隙（OMS 占用或存活状态变化后调用）"""
+        ptr = self.graph.edge_oms_ptr
+        for eid in eids:
+            lo, hi = ptr[eid], ptr[eid + 1]
+            rows = (self.available[lo:hi] & ~self.used[lo:hi])[self.oms_alive[lo:hi]]
+            self.edge_free[eid] = np.bitwise_or.reduce(rows, axis=0) if len(rows) else 0
+
+    def set_demand(self, service_index, service):
+        """登记业务的频宽和端点可用颜色（sourceDimColors 与 targetDimColors 的交集）"""
+        allowed = block_bitset(0, self.n_slots, self.n_words)
+        for colors in (service.source_dim_colors, service.target_dim_colors):
+            if colors:
+                allowed = allowed & colors_to_bitset(colors, self.n_words)
+        self.demands[service_index] = (int(service.m_width), allowed)
+
+    def path_free(self, eids):
+        """路径上所有边共同空闲的频隙位图（向量化按位与）"""
+        if len(eids) == 0:
+            return block_bitset(0, self.n_slots, self.n_words)
+        return np.bitwise_and.reduce(self.edge_free[np.asarray(eids)], axis=0)
+
+    def _pick_fibers(self, eids, block):
+        """为频隙块在每条边上挑选一条能完整容纳它的存活 OMS，任一条边没有则返回 None"""
+        ptr = self.graph.edge_oms_ptr
+        positions = []
+        for eid in eids:
+            lo, hi = ptr[eid], ptr[eid + 1]
+            free = self.available[lo:hi] & ~self.used[lo:hi]
+            fits = np.all((free & block) == block, axis=1) & self.oms_alive[lo:hi]
+            hit = np.flatnonzero(fits)
+            if len(hit) == 0:
+                return None
+            positions.append(lo + hit[0])
+        return np.asarray(positions, dtype=np.int64)
+
+    def find_assignment(self, service_index, eids, policy='first_fit', prefer_start=None, rng=None):
+        """在给定路径上为业务寻找频隙块，返回 (起始频隙, OMS 位置数组)，找不到时返回 None"""
+        width, allowed = self.demands[service_index]
+        mask = self.path_free(eids) & allowed
+        starts = fit_starts(mask, width, self.n_slots, policy, rng)
+        if prefer_start is not None and prefer_start in starts:
+            # 优先保持原频隙，避免重新调谐
+            starts = np.concatenate(([prefer_start], starts[starts != prefer_start]))
+        for start in starts:
+            positions = self._pick_fibers(eids, block_bitset(int(start), width, self.n_words))
+            if positions is not None:
+                return int(start), positions
+        return None
+
+    def allocate(self, service_index, start, positions):
+        width, _ = self.demands[service_index]
+        block = block_bitset(start, width, self.n_words)
+        self.used[positions] |= block
+        self.assignments[service_index] = (start, width, positions)
+        for pos in positions.tolist():
+            self.oms_services.setdefault(pos, set()).add(service_index)
+        self.refresh_edges(set(self.graph.oms_edge[positions].tolist()))
+        self.blocked.discard(service_index)
+
+    def release(self, service_index):
+        """释放业务占用的频隙，返回原起始频隙（没有分配时返回 None）"""
+        assignment = self.assignments.pop(service_index, None)
+        if assignment is None:
+            return None
+        start, width, positions = assignment
+        self.used[positions] &= ~block_bitset(start, width, self.n_words)
+        for pos in positions.tolist():
+            self.oms_services.get(pos, set()).discard(service_index)
+        self.refresh_edges(set(self.graph.oms_edge[positions].tolist()))
+        return start
+
+    def reassign(self, service_index, eids, policy='first_fit', rng=None):
+        """
+        业务切换路径后增量更新占用：释放旧频隙，在新路径上重新分配（优先沿用原起始频隙）。
+        新路径上没有可用频谱时业务记为 blocked，返回 False。
+        """
+        if service_index not in self.demands:
+            return False
+        old_start = self.release(service_index)
+        found = self.find_assignment(service_index, eids, policy, prefer_start=old_start, rng=rng)
+        if found is None:
+            self.blocked.add(service_index)
+            return False
+        self.allocate(service_index, *found)
+        return True
+
+    def services_on_oms(self, positions):
+        services = set()
+        for pos in positions:
+            services |= self.oms_services.get(pos, set())
+        return services
+
+    def utilization(self):
+        """已占用频隙占可用频隙的比例"""
+        available = int(np.unpackbits(self.available.view(np.uint8)).sum())
+        used = int(np.unpackbits(self.used.view(np.uint8)).sum())
+        return used / available if available else 0.0
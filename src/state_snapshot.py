@@ -0,0 +1,201 @@
+# src/state_snapshot.py
+
+import os
+import struct
+from array import array
+
+import numpy as np
+from graph_engine import CSRGraph
+from path_calculator import PathCalculator
+from path_pool import PathRecord
+from path_table import PathTable
+
+# 二进制状态快照：文件头 + 目录 + 按 64 字节对齐的原始数组，读取时直接内存映射，不解析任何文本
+STATE_MAGIC = b'NETSTATE'
+STATE_VERSION = 1
+ALIGN = 64
+_HEADER = struct.Struct('<8sQQ')       # magic, 版本, 数组个数
+_ENTRY = struct.Struct('<48s8sQ4qQ')   # 名称, dtype, 维数, 形状（最多 4 维）, 偏移
+
+
+def write_sections(file_name, sections):
+    """把 {名称: ndarray} 写入一个带目录的二进制文件（先写临时文件再替换）"""
+    names = list(sections)
+    arrays = [np.ascontiguousarray(sections[name]) for name in names]
+    offset = _HEADER.size + _ENTRY.size * len(names)
+    entries = []
+    for name, array in zip(names, arrays):
+        if array.ndim > 4:
+            raise ValueError(f"Section {name} has more than 4 dimensions")
+        offset = -(-offset // ALIGN) * ALIGN
+        shape = list(array.shape) + [0] * (4 - array.ndim)
+        entries.append((offset, _ENTRY.pack(name.encode(), array.dtype.str.encode(), array.ndim, *shape, offset)))
+        offset += array.nbytes
+    os.makedirs(os.path.dirname(os.path.abspath(file_name)), exist_ok=True)
+    tmp_path = file_name + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(STATE_MAGIC, STATE_VERSION, len(names)))
+        for _, entry in entries:
+            f.write(entry)
+        for (offset, _), array in zip(entries, arrays):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp_path, file_name)
+
+
+def read_sections(file_name, mmap=True):
+    """
+    读取 write_sections 写出的文件，返回 {名称: ndarray}。
+    mmap=True 时数组是文件的写时复制映射（修改只影响本进程），按需从磁盘读入。
+    """
+    buf = np.memmap(file_name, dtype=np.uint8, mode='c') if mmap else np.fromfile(file_name, dtype=np.uint8)
+    magic, version, count = _HEADER.unpack_from(buf, 0)
+    if magic != STATE_MAGIC:
+        raise ValueError(f"{file_name} is not a state snapshot")
+    if version != STATE_VERSION:
+        raise ValueError(f"Unsupported state snapshot version {version} in {file_name}")
+    sections = {}
+    for i in range(count):
+        name, dtype, ndim, *shape, offset = _ENTRY.unpack_from(buf, _HEADER.size + i * _ENTRY.size)
+        sections[name.rstrip(b'\0').decode()] = np.ndarray(tuple(shape[:ndim]), dtype=np.dtype(dtype.rstrip(b'\0').decode()),
+                                                           buffer=buf, offset=offset)
+    return sections
+
+
+def _edge_array(edges):
+    return np.array([(min(e[0], e[1]), max(e[0], e[1])) for e in edges], dtype=np.int64).reshape(-1, 2)
+
+
+def _pack_paths(graph, prefix, path_infos):
+    """一组路径存为起点 + 扁平的边编号数组（与 PathPool 相同的布局），中继路径另存再生节点"""
+    sources, lengths, regen_lengths, regenerators = [], [], [], []
+    eids = array('i')
+    for path_info in path_infos:
+        if isinstance(path_info, PathRecord):
+            sources.append(path_info.src)
+            ids = path_info.eids
+        else:
+            sources.append(path_info['path'][0])
+            ids = graph.path_edge_ids(path_info['path'])
+        lengths.append(len(ids))
+        eids.extend(ids)
+        regen = path_info.get('regenerators')
+        regen_lengths.append(-1 if regen is None else len(regen))
+        regenerators.extend(regen or ())
+    ptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=ptr[1:])
+    return {
+        f'{prefix}.src': np.array(sources, dtype=np.int64),
+        f'{prefix}.eids': np.frombuffer(eids, dtype=np.int32) if eids else np.zeros(0, dtype=np.int32),
+        f'{prefix}.ptr': ptr,
+        f'{prefix}.regen_len': np.array(regen_lengths, dtype=np.int64),  # -1 表示普通路径
+        f'{prefix}.regen': np.array(regenerators, dtype=np.int64),
+    }
+
+
+def _unpack_paths(path_calculator, sections, prefix):
+    pool = path_calculator.path_pool
+    src = sections[f'{prefix}.src'].tolist()
+    eids = sections[f'{prefix}.eids']
+    ptr = sections[f'{prefix}.ptr'].tolist()
+    regen_len = sections[f'{prefix}.regen_len'].tolist()
+    regenerators = sections[f'{prefix}.regen'].tolist()
+    paths = []
+    pos = 0
+    for i, start in enumerate(src):
+        record = pool.intern_eids(start, eids[ptr[i]:ptr[i + 1]].tolist())
+        if regen_len[i] < 0:
+            paths.append(record)
+            continue
+        path_info = record.to_dict()
+        path_info['regenerators'] = regenerators[pos:pos + regen_len[i]]
+        pos += regen_len[i]
+        paths.append(path_info)
+    return paths
+
+
+def save_state(path_calculator, file_name, failed_edges=None, recovered_edges=()):
+    """
+    把图、当前路径、共享备用路径表、业务的备用路径引用、edge_service_matrix 和故障状态写成一个二进制快照。
+    failed_edges 默认取 path_calculator.failed_edges。
+    """
+    if path_calculator.backend != 'csr':
+        raise NotImplementedError("State snapshots require the 'csr' backend")
+    G = path_calculator.G
+    sections = {f'graph.{field}': array for field, array in G.to_arrays().items()}
+    sections['graph.weight_version'] = np.array([getattr(G, 'weight_version', 0)], dtype=np.int64)
+
+    services = sorted(path_calculator.paths_in_use)
+    sections['paths.service'] = np.array(services, dtype=np.int64)
+    sections.update(_pack_paths(G, 'paths', (path_calculator.paths_in_use[s] for s in services)))
+
+    table = path_calculator.backup_table
+    sections.update(_pack_paths(G, 'backup', table.entries))
+    sections['backup.keys'] = np.array([(src, snk, min(edge), max(edge)) for src, snk, edge in table.keys],
+                                       dtype=np.int64).reshape(-1, 4)
+    sections['backup.shared'] = np.array([table.index.get(key) == handle for handle, key in enumerate(table.keys)],
+                                         dtype=np.uint8)
+    sections['backup.no_path'] = np.array([(src, snk, min(edge), max(edge))
+                                           for (src, snk, edge), handle in table.index.items() if handle is None],
+                                          dtype=np.int64).reshape(-1, 4)
+    sections['backup.refs'] = np.array([(service_index, min(edge), max(edge), handle)
+                                        for service_index, edge_handles in sorted(path_calculator.backup_paths.items())
+                                        for edge, handle in edge_handles.items()], dtype=np.int64).reshape(-1, 4)
+
+    # edge_service_matrix 按边编号存为 CSR：index.services[ptr[eid]:ptr[eid + 1]]
+    matrix = {G.edge_id(*edge): sorted(services) for edge, services in path_calculator.edge_service_matrix.items()
+              if services}
+    counts = np.zeros(G.number_of_edges(), dtype=np.int64)
+    for eid, services_on_edge in matrix.items():
+        counts[eid] = len(services_on_edge)
+    sections['index.ptr'] = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    sections['index.services'] = np.array([s for eid in sorted(matrix) for s in matrix[eid]], dtype=np.int64)
+
+    failed_edges = path_calculator.failed_edges if failed_edges is None else failed_edges
+    sections['failure.failed'] = _edge_array(failed_edges)
+    sections['failure.recovered'] = _edge_array(recovered_edges)
+    sections['failure.oms_alive'] = np.asarray(path_calculator.oms_alive, dtype=np.uint8)
+    write_sections(file_name, sections)
+
+
+def load_state(file_name, mmap=True):
+    """
+    读取 save_state 写出的快照，返回 (path_calculator, data)，data 含 failed_edges 和 recovered_edges。
+    图的数组直接使用内存映射，路径按边编号放入路径池，不需要重新计算或解析文本。
+    """
+    sections = read_sections(file_name, mmap)
+    G = CSRGraph.from_arrays({field: sections[f'graph.{field}'] for field in CSRGraph.ARRAY_FIELDS},
+                             int(sections['graph.weight_version'][0]))
+    path_calculator = PathCalculator([])
+    path_calculator.attach_graph(G)
+
+    services = sections['paths.service'].tolist()
+    path_calculator.paths_in_use = dict(zip(services, _unpack_paths(path_calculator, sections, 'paths')))
+
+    table = PathTable()
+    entries = _unpack_paths(path_calculator, sections, 'backup')
+    for (src, snk, u, v), path_info, shared in zip(sections['backup.keys'].tolist(), entries,
+                                                    sections['backup.shared'].tolist()):
+        table.add((src, snk, (u, v)), path_info, shared=bool(shared))
+    for src, snk, u, v in sections['backup.no_path'].tolist():
+        table.index[(src, snk, (u, v))] = None
+    path_calculator.backup_table = table
+    backup_paths = {}
+    for service_index, u, v, handle in sections['backup.refs'].tolist():
+        backup_paths.setdefault(service_index, {})[(u, v)] = handle
+    path_calculator.backup_paths = backup_paths
+
+    ends = path_calculator.path_pool.ends
+    ptr = sections['index.ptr'].tolist()
+    services_on_edges = sections['index.services'].tolist()
+    path_calculator.edge_service_matrix = {ends[eid]: set(services_on_edges[ptr[eid]:ptr[eid + 1]])
+                                           for eid in range(len(ptr) - 1) if ptr[eid + 1] > ptr[eid]}
+    path_calculator.rebuild_backup_indexes()
+    path_calculator.remember_original_paths()
+
+    path_calculator.oms_alive[:] = sections['failure.oms_alive'].astype(bool)
+    failed_edges = [tuple(edge) for edge in sections['failure.failed'].tolist()]
+    recovered_edges = [tuple(edge) for edge in sections['failure.recovered'].tolist()]
+    path_calculator.failed_edges = list(failed_edges)
+    path_calculator.sync_edge_mask()
+    return path_calculator, {'failed_edges': failed_edges, 'recovered_edges': recovered_edges}
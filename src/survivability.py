@@ -0,0 +1,261 @@
+# src/survivability.py
+
+import argparse
+import csv
+import itertools
+import multiprocessing as mp
+import os
+import random
+import time
+
+import networkx as nx
+from metrics import configure_logging
+
+# 并行扫描时，每个工作进程持有的只读 SurvivabilityAnalyzer
+_worker_analyzer = None
+
+def _init_sweep_worker(analyzer):
+    """工作进程初始化：fork 模式下直接继承父进程中的基线状态（快照的内存映射也是共享的）"""
+    global _worker_analyzer
+    _worker_analyzer = analyzer
+
+def _sweep_worker(scenarios):
+    """在工作进程中评估一批故障场景"""
+    return [_worker_analyzer.evaluate(oms_ids) for oms_ids in scenarios]
+
+
+class SurvivabilityAnalyzer:
+    """
+    生存性分析：在不修改 PathCalculator 的前提下评估 OMS 故障场景对业务的影响。
+    每个场景 = 基线状态（paths_in_use / backup_paths / 当前故障位图）+ 该场景的故障位图副本，
+    评估过程只读基线，不做 deepcopy，也不需要在场景之间撤销切换。
+
+    业务的切换与 handle_failures 的顺序一致：先用路径上故障边对应的、不经过任何故障边的备用路径，
+    没有时在故障后的图上重新计算最短路径（搜索使用基线代价）。
+    对每个场景统计：
+      lost      —— 当前路径中断且找不到任何可用路径的业务
+      rerouted  —— 当前路径中断、切换到新路径的业务
+      degraded  —— 仍有路径但代价上升的业务：绕行更长，或并行 OMS 故障后所在边的聚合代价升高
+    """
+    def __init__(self, path_calculator, tolerance=1e-9):
+        if path_calculator.backend != 'csr':
+            raise NotImplementedError("Survivability analysis requires the 'csr' backend")
+        self.path_calculator = path_calculator
+        self.tolerance = tolerance
+        self.weights = path_calculator.G.edge_weight.tolist()
+        self.ends = path_calculator.path_pool.ends
+
+    def single_oms_scenarios(self):
+        """每对光纤（omsId 与其 remoteOmsId）一个单故障场景，按 omsId 排序，已故障的 OMS 跳过"""
+        G = self.path_calculator.G
+        alive = self.path_calculator.oms_alive
+        seen = set()
+        scenarios = []
+        for pos in G._oms_order.tolist():
+            if pos in seen or not alive[pos]:
+                continue
+            oms_id = int(G.oms_ids[pos])
+            seen.update(G.fiber_positions(oms_id))
+            scenarios.append((oms_id,))
+        return scenarios
+
+    @staticmethod
+    def dual_oms_scenarios(singles, samples=None, seed=0):
+        """
+        由单故障场景组合出双故障场景。samples 为 None 或不小于组合总数时返回全部组合，
+        否则用 seed 固定的随机数无放回抽取 samples 个（结果可复现）。
+        """
+        oms_ids = [scenario[0] for scenario in singles]
+        total = len(oms_ids) * (len(oms_ids) - 1) // 2
+        if samples is None or samples >= total:
+            return list(itertools.combinations(oms_ids, 2))
+        rng = random.Random(seed)
+        chosen = set()
+        while len(chosen) < samples:
+            i, j = rng.sample(range(len(oms_ids)), 2)
+            chosen.add((min(i, j), max(i, j)))
+        return [(oms_ids[i], oms_ids[j]) for i, j in sorted(chosen)]
+
+    def _path_cost(self, eids, raised):
+        weights = self.weights
+        if not raised:
+            return sum(weights[eid] for eid in eids)
+        return sum(raised.get(eid, weights[eid]) for eid in eids)
+
+    def _reroute(self, service_index, path_info, down_eids, mask):
+        """业务当前路径中断后的新路径（边编号列表）和所用策略，无路径时返回 (None, None)"""
+        pc = self.path_calculator
+        for eid in pc._path_eids(path_info):
+            if eid not in down_eids:
+                continue
+            backup = pc.get_backup_path(service_index, self.ends[eid])
+            if backup:
+                backup_eids = pc._path_eids(backup)
+                if not any(mask[e] for e in backup_eids):
+                    return backup_eids, 'backup'
+        path = path_info['path']
+        try:
+            if pc.landmarks is not None:
+                new_path = pc.landmarks.shortest_path(path[0], path[-1], edge_mask=mask)
+            else:
+                new_path = pc.G.shortest_path(path[0], path[-1], edge_mask=mask)
+        except nx.NetworkXNoPath:
+            return None, None
+        return pc.G.path_edge_ids(new_path), 'dijkstra'
+
+    def evaluate(self, oms_ids):
+        """评估 oms_ids（每个连同其 remoteOmsId）同时故障的场景，返回结果字典"""
+        pc = self.path_calculator
+        G = pc.G
+        alive = pc.oms_alive.copy()
+        eids = []
+        for oms_id in oms_ids:
+            positions = G.fiber_positions(oms_id)
+            if positions:
+                alive[positions] = False
+                eids.append(int(G.oms_edge[positions[0]]))
+        down_eids, raised = set(), {}
+        for eid in dict.fromkeys(eids):
+            if pc.edge_mask[eid]:
+                continue  # 基线中已经故障的边
+            weight = G.aggregate_weight(eid, alive)
+            if weight is None:
+                down_eids.add(eid)
+            elif weight > self.weights[eid]:
+                raised[eid] = weight
+        mask = bytearray(pc.edge_mask)
+        for eid in down_eids:
+            mask[eid] = 1
+
+        matrix = pc.edge_service_matrix
+        affected = set()
+        for eid in down_eids:
+            affected |= matrix.get(self.ends[eid], set())
+        lost, rerouted, degraded = [], [], []
+        via_backup = 0
+        stretch = 1.0
+        for service_index in sorted(affected):
+            path_info = pc.paths_in_use[service_index]
+            old_cost = self._path_cost(pc._path_eids(path_info), None)
+            new_eids, strategy = self._reroute(service_index, path_info, down_eids, mask)
+            if new_eids is None:
+                lost.append(service_index)
+                continue
+            rerouted.append(service_index)
+            via_backup += strategy == 'backup'
+            new_cost = self._path_cost(new_eids, raised)
+            if new_cost > old_cost + self.tolerance:
+                degraded.append(service_index)
+                if old_cost > 0:
+                    stretch = max(stretch, new_cost / old_cost)
+        # 并行 OMS 吸收了故障的边：业务留在原路径上，但聚合代价升高
+        kept = set()
+        for eid in raised:
+            kept |= matrix.get(self.ends[eid], set())
+        for service_index in sorted(kept - affected):
+            eids_on_path = pc._path_eids(pc.paths_in_use[service_index])
+            old_cost = self._path_cost(eids_on_path, None)
+            new_cost = self._path_cost(eids_on_path, raised)
+            if new_cost > old_cost + self.tolerance:
+                degraded.append(service_index)
+                if old_cost > 0:
+                    stretch = max(stretch, new_cost / old_cost)
+        return {
+            'oms_ids': tuple(oms_ids),
+            'edges_down': sorted(self.ends[eid] for eid in down_eids),
+            'affected': len(affected),
+            'lost': lost,
+            'rerouted': len(rerouted),
+            'via_backup': via_backup,
+            'degraded': len(degraded),
+            'max_stretch': stretch,
+        }
+
+    def sweep(self, scenarios, workers=None, chunks_per_worker=4):
+        """
+        评估全部场景，结果与 scenarios 顺序一致。
+        workers > 1 时把场景切分到多个进程；优先使用 fork，子进程继承只读的基线，不重新序列化图和路径。
+        """
+        scenarios = list(scenarios)
+        if not workers or workers <= 1 or len(scenarios) < 2:
+            return [self.evaluate(oms_ids) for oms_ids in scenarios]
+        if 'fork' in mp.get_all_start_methods():
+            ctx = mp.get_context('fork')
+        else:
+            ctx = mp.get_context()
+        chunk_size = max(1, -(-len(scenarios) // (workers * chunks_per_worker)))
+        chunks = [scenarios[i:i + chunk_size] for i in range(0, len(scenarios), chunk_size)]
+        results = []
+        with ctx.Pool(workers, initializer=_init_sweep_worker, initargs=(self,)) as pool:
+            for chunk_results in pool.imap(_sweep_worker, chunks):
+                results.extend(chunk_results)
+        return results
+
+
+def summarize(results):
+    """汇总扫描结果：场景数、造成业务中断的场景数、中断 / 切换 / 劣化业务的最大值和合计"""
+    summary = {
+        'scenarios': len(results),
+        'scenarios_with_loss': sum(1 for r in results if r['lost']),
+        'services_lost_max': max((len(r['lost']) for r in results), default=0),
+        'services_lost_total': sum(len(r['lost']) for r in results),
+        'rerouted_total': sum(r['rerouted'] for r in results),
+        'degraded_total': sum(r['degraded'] for r in results),
+        'max_stretch': max((r['max_stretch'] for r in results), default=1.0),
+    }
+    # 至少在一个场景中中断过的业务（单点故障上的业务）
+    summary['vulnerable_services'] = len({s for r in results for s in r['lost']})
+    return summary
+
+
+def save_sweep_to_csv(results, file_name):
+    """每个场景一行"""
+    os.makedirs(os.path.dirname(os.path.abspath(file_name)), exist_ok=True)
+    with open(file_name, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['OMS Ids', 'Edges Down', 'Affected', 'Lost', 'Rerouted', 'Via Backup', 'Degraded',
+                         'Max Stretch', 'Lost Services'])
+        for r in results:
+            writer.writerow([';'.join(map(str, r['oms_ids'])), ';'.join(f'{u},{v}' for u, v in r['edges_down']),
+                             r['affected'], len(r['lost']), r['rerouted'], r['via_backup'], r['degraded'],
+                             f"{r['max_stretch']:.4f}", ' '.join(map(str, r['lost']))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate every single-OMS failure (and sampled dual failures) "
+                                                 "against the saved routing state.")
+    parser.add_argument('--state', default='results/initial_state.snap',
+                        help="state snapshot to analyse (e.g. results/simulation_state.snap)")
+    parser.add_argument('--dual', type=int, default=0,
+                        help="number of dual-failure scenarios to sample (-1: all pairs)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for dual-failure sampling")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default='results/survivability')
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    from failure_simulation import load_path_calculator
+
+    path_calculator, _ = load_path_calculator(args.state)
+    analyzer = SurvivabilityAnalyzer(path_calculator)
+    singles = analyzer.single_oms_scenarios()
+    runs = [('single', singles)]
+    if args.dual:
+        runs.append(('dual', analyzer.dual_oms_scenarios(singles, None if args.dual < 0 else args.dual, args.seed)))
+
+    for name, scenarios in runs:
+        start_time = time.time()
+        results = analyzer.sweep(scenarios, args.workers)
+        elapsed = time.time() - start_time
+        save_sweep_to_csv(results, f'{args.output}_{name}.csv')
+        summary = summarize(results)
+        print(f"{name}: {summary['scenarios']} scenarios in {elapsed:.2f} s, "
+              f"{summary['scenarios_with_loss']} lose services "
+              f"(max {summary['services_lost_max']}, {summary['vulnerable_services']} services vulnerable), "
+              f"{summary['rerouted_total']} reroutes, {summary['degraded_total']} degraded, "
+              f"max stretch {summary['max_stretch']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
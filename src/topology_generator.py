@@ -0,0 +1,241 @@
+# src/topology_generator.py
+
+import argparse
+import csv
+import math
+import os
+import random
+import time
+
+import numpy as np
+
+TOPOLOGIES = ('mesh', 'ring-ladder')
+CHANNEL_WIDTH = 24     # 业务占用的频隙数（与 data/service.csv 一致）
+SPECTRUM_END = 960     # 可用频隙 [0, 960)
+MAX_PARALLEL = 4       # 每条边最多的光纤对数
+SERVICE_BATCH = 8192   # 业务按批抽取和写出
+
+OMS_HEADER = ['omsId', 'remoteOmsId', 'src', 'snk', 'cost', 'distance', 'ots', 'osnr', 'slice', 'colors']
+SERVICE_HEADER = ['src', 'snk', 'sourceOtu', 'targetOtu', 'm_width', 'bandType', 'sourceDimColors', 'targetDimColors']
+RELAY_HEADER = ['relayId', 'relatedRelayId', 'nodeId', 'localId', 'relatedLocalId', 'dimColors']
+
+
+def mesh_links(nodes, rng, degree=3.0, spacing=60.0):
+    """
+    网状拓扑：节点按行排在近似正方形的网格上（坐标带随机偏移），依次产出 (u, v, distance)。
+    行内相邻节点总是相连，每行首尾的节点连向下一行（每个节点至少两条链路）；其余纵向边和对角边按概率保留，
+    使平均度数约为 degree（2 到 6 之间）。只保存当前行和下一行的坐标，内存为 O(sqrt(nodes))。
+    """
+    width = max(2, int(math.sqrt(nodes)))
+    extra = min(max(degree - 2.0, 0.0), 4.0)
+    p_vertical = min(extra / 2.0, 1.0)
+    p_diagonal = max(extra - 2.0, 0.0) / 2.0
+
+    def row_positions(row):
+        count = min(width, nodes - row * width)
+        return [(c + rng.uniform(-0.3, 0.3), row + rng.uniform(-0.3, 0.3)) for c in range(max(count, 0))]
+
+    def distance(a, b):
+        return max(1, int(round(math.hypot(a[0] - b[0], a[1] - b[1]) * spacing)))
+
+    rows = -(-nodes // width)
+    current = row_positions(0)
+    for row in range(rows):
+        following = row_positions(row + 1) if row + 1 < rows else []
+        base = row * width
+        for c, position in enumerate(current):
+            node = base + c
+            if c + 1 < len(current):
+                yield node, node + 1, distance(position, current[c + 1])
+            frame = c == 0 or c == len(following) - 1 or c == len(current) - 1
+            if c < len(following) and (frame or rng.random() < p_vertical):
+                yield node, node + width, distance(position, following[c])
+            if c + 1 < len(following) and rng.random() < p_diagonal:
+                yield node, node + width + 1, distance(position, following[c + 1])
+        current = following
+
+
+def ring_ladder_links(nodes, rng, ring_size=16, rungs=4, ring_span=(10, 40), rung_span=(40, 100)):
+    """
+    环梯拓扑：节点分成若干个 ring_size 个节点的城域环，环按行排成近似正方形的阵列；
+    同一行相邻的环之间有 rungs 条跨环链路（梯形），相邻两行对应的环之间另有 rungs // 2（至少 1）条，
+    使网络直径随规模按平方根增长。环内链路较短，跨环链路较长（km）。不足 3 个节点的余数并入最后一个环。
+    """
+    if nodes < 3:
+        raise ValueError("A ring-ladder topology needs at least 3 nodes")
+    ring_size = max(3, min(ring_size, nodes))
+    count = nodes // ring_size
+    sizes = [ring_size] * count
+    remainder = nodes - count * ring_size
+    if remainder >= 3:
+        sizes.append(remainder)
+    else:
+        sizes[-1] += remainder
+    starts = np.concatenate(([0], np.cumsum(sizes))).tolist()
+    width = max(1, math.ceil(math.sqrt(len(sizes))))
+
+    def rung_links(k, other, n):
+        size = min(sizes[k], sizes[other])
+        step = max(1, size // max(1, n))
+        for i in range(0, size, step):
+            yield starts[k] + i, starts[other] + i, rng.randint(*rung_span)
+
+    for k, size in enumerate(sizes):
+        start = starts[k]
+        for i in range(size):
+            u, v = start + i, start + (i + 1) % size
+            yield min(u, v), max(u, v), rng.randint(*ring_span)
+        if k % width + 1 < width and k + 1 < len(sizes):
+            yield from rung_links(k, k + 1, rungs)
+        if k + width < len(sizes):
+            yield from rung_links(k, k + width, max(1, rungs // 2))
+
+
+def random_colors(rng):
+    """OMS 的可用频谱：多数为整段，其余为一到两段按 24 对齐的子区间"""
+    draw = rng.random()
+    if draw < 0.8:
+        return f':0-{SPECTRUM_END}'
+    if draw < 0.85:
+        return f':0-{SPECTRUM_END + 4}'
+    slots = SPECTRUM_END // CHANNEL_WIDTH
+    a, b = sorted(rng.sample(range(slots + 1), 2))
+    if draw < 0.95 or b - a < 3:
+        return f':{a * CHANNEL_WIDTH}-{b * CHANNEL_WIDTH}'
+    c = rng.randint(a + 1, b - 2)
+    return f':{a * CHANNEL_WIDTH}-{c * CHANNEL_WIDTH}:{(c + 1) * CHANNEL_WIDTH}-{b * CHANNEL_WIDTH}'
+
+
+def write_oms(file_name, links, rng, parallel=0.25):
+    """
+    边流逐条写成 OMS：每条边至少一对光纤（omsId 与反向的 remoteOmsId），每多一对的概率为 parallel，
+    最多 MAX_PARALLEL 对。同一对光纤的代价、距离和频谱相同。返回 (边数, OMS 数)。
+    """
+    edges = oms_id = 0
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(OMS_HEADER)
+        for u, v, distance in links:
+            edges += 1
+            pairs = 1
+            while pairs < MAX_PARALLEL and rng.random() < parallel:
+                pairs += 1
+            for _ in range(pairs):
+                cost = distance * 1000 + rng.randint(0, 999)
+                colors = random_colors(rng)
+                writer.writerow([oms_id, oms_id + 1, u, v, cost, distance, 1, '2.15E+09', 6250, colors])
+                writer.writerow([oms_id + 1, oms_id, v, u, cost, distance, 1, '2.15E+09', 6250, colors])
+                oms_id += 2
+    return edges, oms_id
+
+
+def write_nodes(file_name, nodes):
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['nodeId'])
+        for start in range(0, nodes, SERVICE_BATCH):
+            writer.writerows([node] for node in range(start, min(start + SERVICE_BATCH, nodes)))
+
+
+def write_services(file_name, nodes, services, rng, skew=1.0, bundle=0.3):
+    """
+    偏斜的业务需求：节点的热度服从参数为 skew 的 Zipf 分布（热点节点随机分布在网络中），
+    源和宿按热度独立抽取。每个需求是同源同宿的一组业务，组的大小服从几何分布（均值 1 / bundle），
+    最多占满 [0, 960) 的全部 24 频隙块，组内业务的 OTU 编号连续、颜色块依次排列。
+    业务按批抽取、逐批写出，返回写出的业务数。
+    """
+    weights = 1.0 / np.arange(1, nodes + 1, dtype=np.float64) ** skew
+    weights = weights[rng.permutation(nodes)]
+    weights /= weights.sum()
+    max_bundle = SPECTRUM_END // CHANNEL_WIDTH
+    written = 0
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(SERVICE_HEADER)
+        while written < services:
+            src = rng.choice(nodes, SERVICE_BATCH, p=weights)
+            snk = rng.choice(nodes, SERVICE_BATCH, p=weights)
+            sizes = np.minimum(rng.geometric(bundle, SERVICE_BATCH), max_bundle)
+            rows = []
+            for s, t, size in zip(src.tolist(), snk.tolist(), sizes.tolist()):
+                if s == t:
+                    continue
+                for j in range(min(size, services - written)):
+                    colors = f':{j * CHANNEL_WIDTH}-{(j + 1) * CHANNEL_WIDTH}:{SPECTRUM_END}-{SPECTRUM_END + 4}'
+                    rows.append([s, t, 2 * written, 2 * written + 1, CHANNEL_WIDTH, 0, colors, colors])
+                    written += 1
+                if written >= services:
+                    break
+            writer.writerows(rows)
+    return written
+
+
+def write_relays(file_name, nodes, rng, fraction=0.2, pairs_per_node=20):
+    """每个节点以 fraction 的概率成为中继站，拥有 1 到 2 * pairs_per_node 对互为关联的中继；返回中继条数"""
+    relay_id = local_id = 0
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(RELAY_HEADER)
+        for node in range(nodes):
+            if rng.random() >= fraction:
+                continue
+            for _ in range(rng.randint(1, 2 * pairs_per_node)):
+                writer.writerow([relay_id, relay_id + 1, node, local_id, local_id + 1, f':0-{SPECTRUM_END}'])
+                writer.writerow([relay_id + 1, relay_id, node, local_id + 1, local_id, f':0-{SPECTRUM_END}'])
+                relay_id += 2
+                local_id += 2
+    return relay_id
+
+
+def generate_topology(directory, nodes, topology='mesh', services=None, degree=3.0, ring_size=16, rungs=4,
+                      parallel=0.25, skew=1.0, relay_fraction=0.2, seed=0):
+    """
+    在 directory 中写出 node.csv / oms.csv / service.csv / relay.csv（列与 data_handler 读取的一致），
+    返回各文件的条数。拓扑、OMS 属性和中继使用 random.Random(seed)，业务需求使用 numpy 的 default_rng(seed)，
+    相同参数的输出完全相同。所有文件边生成边写出，不在内存中保存整张网络。
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology: {topology}")
+    services = 2 * nodes if services is None else services
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    if topology == 'mesh':
+        links = mesh_links(nodes, rng, degree)
+    else:
+        links = ring_ladder_links(nodes, rng, ring_size, rungs)
+
+    write_nodes(os.path.join(directory, 'node.csv'), nodes)
+    edges, oms = write_oms(os.path.join(directory, 'oms.csv'), links, rng, parallel)
+    relays = write_relays(os.path.join(directory, 'relay.csv'), nodes, rng, relay_fraction)
+    services = write_services(os.path.join(directory, 'service.csv'), nodes, services,
+                              np.random.default_rng(seed), skew)
+    return {'nodes': nodes, 'edges': edges, 'oms': oms, 'services': services, 'relays': relays}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic optical topology and service demand "
+                                                 "in the data/ CSV schemas.")
+    parser.add_argument('directory', help="output directory (node.csv, oms.csv, service.csv, relay.csv)")
+    parser.add_argument('--nodes', type=int, default=10000)
+    parser.add_argument('--topology', choices=TOPOLOGIES, default='mesh')
+    parser.add_argument('--services', type=int, default=None, help="number of services (default: 2 x nodes)")
+    parser.add_argument('--degree', type=float, default=3.0, help="mean node degree of the mesh (2-6)")
+    parser.add_argument('--ring-size', type=int, default=16, help="nodes per ring of the ring-ladder")
+    parser.add_argument('--rungs', type=int, default=4, help="links between neighbouring rings")
+    parser.add_argument('--parallel', type=float, default=0.25,
+                        help="probability of each additional parallel fibre pair on a link")
+    parser.add_argument('--skew', type=float, default=1.0, help="Zipf exponent of the node demand weights")
+    parser.add_argument('--relay-fraction', type=float, default=0.2, help="fraction of nodes with relays")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start_time = time.time()
+    counts = generate_topology(args.directory, args.nodes, args.topology, args.services, args.degree,
+                               args.ring_size, args.rungs, args.parallel, args.skew, args.relay_fraction, args.seed)
+    print(f"{args.topology}: {counts['nodes']} nodes, {counts['edges']} links ({counts['oms']} OMS), "
+          f"{counts['services']} services, {counts['relays']} relays written to {args.directory} "
+          f"in {time.time() - start_time:.2f} s.")
+
+
+if __name__ == "__main__":
+    main()
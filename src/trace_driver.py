@@ -0,0 +1,237 @@
+# src/trace_driver.py
+
+import argparse
+import contextlib
+import csv
+import json
+import logging
+import os
+import time
+
+from metrics import configure_logging, log_level
+from simulator import NetworkSimulator
+
+# 事件类型 -> 需要的目标字段
+ACTIONS = {
+    'fail': 'edge',          # 单条边故障
+    'recover': 'edge',       # 单条边恢复
+    'fail_edges': 'edges',   # 多条边同时故障（批量处理）
+    'fail_oms': 'oms',       # 单条 OMS 故障
+    'recover_oms': 'oms',    # 单条 OMS 恢复
+    'fail_srlg': 'srlg',     # 共享风险组故障
+}
+
+
+def _parse_edge(text):
+    src, snk = map(int, str(text).replace('-', ',').split(','))
+    return (min(src, snk), max(src, snk))
+
+
+def _normalize_event(event, line_no):
+    action = event.get('action')
+    if action not in ACTIONS:
+        raise ValueError(f"Line {line_no}: unknown action {action!r}")
+    field = ACTIONS[action]
+    target = event.get(field, event.get('target'))
+    if target is None or target == '':
+        raise ValueError(f"Line {line_no}: action {action!r} needs a {field!r} value")
+    normalized = {'time': float(event.get('time', 0) or 0), 'action': action}
+    if field == 'edge':
+        normalized['edge'] = _parse_edge(target) if isinstance(target, str) else (min(target), max(target))
+    elif field == 'edges':
+        items = target.split(';') if isinstance(target, str) else target
+        normalized['edges'] = [_parse_edge(item) if isinstance(item, str) else (min(item), max(item))
+                               for item in items if item != '']
+    else:
+        normalized[field] = int(target)
+    return normalized
+
+
+def read_event_trace(file_path):
+    """
+    逐条读取故障 / 恢复事件（生成器，不把整个 trace 读入内存）。
+    CSV 格式：time,action,target，target 为 "src,snk"、"src,snk;src,snk" 或 omsId / srlgId；
+    JSONL 格式：每行一个对象，如 {"time": 1.5, "action": "fail", "edge": [811, 812]}。
+    """
+    with open(file_path, newline='') as f:
+        if file_path.endswith('.jsonl') or file_path.endswith('.json'):
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield _normalize_event(json.loads(line), line_no)
+        else:
+            for line_no, row in enumerate(csv.DictReader(f), 2):
+                yield _normalize_event(row, line_no)
+
+
+def save_checkpoint(path_calculator, failed_edges, recovered_edges, prefix='results/simulation'):
+    """写出与交互式模拟相同格式的状态快照和 CSV 状态文件"""
+    from failure_simulation import save_simulation_state, save_simulation_to_csv
+    save_simulation_state(path_calculator, failed_edges, recovered_edges, prefix)
+    save_simulation_to_csv(path_calculator, failed_edges, recovered_edges,
+                           paths_csv=f'{prefix}_paths.csv',
+                           backup_csv=f'{prefix}_backup_paths.csv',
+                           failed_csv=f'{prefix}_failed_edges.csv')
+
+
+class TraceDriver:
+    """
+    非交互的事件驱动器：把事件 trace 按顺序送入 NetworkSimulator。
+    每 checkpoint_every 个事件以及结束时保存一次状态；两次检查点之间状态没有变化时不重复序列化。
+    quiet=True 时控制台只输出 ERROR 级别的日志（日志文件不受影响）。
+    """
+    def __init__(self, simulator, checkpoint_every=0, checkpoint=save_checkpoint, srlg_groups=None, quiet=True):
+        self.simulator = simulator
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint = checkpoint
+        self.srlg_groups = srlg_groups or {}
+        self.quiet = quiet
+        self.recovered_edges = []
+        self.dirty = False
+        self.last_time = None
+
+    @property
+    def failed_edges(self):
+        return self.simulator.path_calculator.failed_edges
+
+    def apply(self, event):
+        """执行单个事件，状态发生变化时返回 True"""
+        if self.last_time is not None and event['time'] < self.last_time:
+            raise ValueError(f"Event at time {event['time']} is earlier than the previous event ({self.last_time})")
+        self.last_time = event['time']
+        # 先触发到期的返回式回切（hold-off 计时器）
+        reverted = self.simulator.path_calculator.process_reversions(event['time'])
+        changed = self._apply(event)
+        return changed or reverted > 0
+
+    def _apply(self, event):
+        simulator, action = self.simulator, event['action']
+        if action == 'fail':
+            if event['edge'] in self.failed_edges or event['edge'] not in simulator.path_calculator.G.edges:
+                return False
+            simulator.simulate_failure(event['edge'])
+            return True
+        if action == 'recover':
+            if event['edge'] not in self.failed_edges:
+                return False
+            simulator.simulate_recovery(event['edge'], now=event['time'])
+            self.recovered_edges.append(event['edge'])
+            return True
+        if action == 'fail_edges':
+            edges = [edge for edge in event['edges'] if edge not in self.failed_edges]
+            return bool(edges) and bool(simulator.simulate_failures(edges))
+        if action == 'fail_oms':
+            # 不存在或已经故障的 OMS 不改变状态；并行 OMS 吸收的故障虽不中断边，但改变了 OMS 状态和聚合权重
+            if not self._oms_state(event['oms']).any():
+                return False
+            simulator.simulate_oms_failure(event['oms'])
+            return True
+        if action == 'recover_oms':
+            if self._oms_state(event['oms']).all():
+                return False
+            edge = simulator.simulate_oms_recovery(event['oms'], now=event['time'])
+            if edge is not None:
+                self.recovered_edges.append(edge)
+            return True
+        if action == 'fail_srlg':
+            oms_ids = self.srlg_groups.get(event['srlg'], ())
+            if not any(self._oms_state(oms_id).any() for oms_id in oms_ids):
+                return False
+            simulator.simulate_srlg_failure(event['srlg'], self.srlg_groups)
+            return True
+        raise ValueError(f"Unknown action: {action}")
+
+    def _oms_state(self, oms_id):
+        """OMS（连同其 remoteOmsId）各光纤的存活状态；不存在的 OMS 返回空数组"""
+        path_calculator = self.simulator.path_calculator
+        return path_calculator.oms_alive[path_calculator.G.fiber_positions(oms_id)]
+
+    def _checkpoint(self):
+        if not self.dirty or self.checkpoint is None:
+            return False
+        self.checkpoint(self.simulator.path_calculator, list(self.failed_edges), list(self.recovered_edges))
+        self.dirty = False
+        return True
+
+    def run(self, events):
+        """
+        处理全部事件，返回统计信息：事件数、实际改变状态的事件数、检查点次数、
+        总耗时以及吞吐量（events/sec，不含检查点的序列化时间）。
+        """
+        stats = {'events': 0, 'applied': 0, 'checkpoints': 0, 'by_action': {},
+                 'event_time': 0.0, 'checkpoint_time': 0.0}
+        start = time.time()
+        with log_level(logging.ERROR) if self.quiet else contextlib.nullcontext():
+            for event in events:
+                t0 = time.time()
+                changed = self.apply(event)
+                stats['event_time'] += time.time() - t0
+                stats['events'] += 1
+                stats['by_action'][event['action']] = stats['by_action'].get(event['action'], 0) + 1
+                if changed:
+                    stats['applied'] += 1
+                    self.dirty = True
+                if self.checkpoint_every and stats['events'] % self.checkpoint_every == 0:
+                    t0 = time.time()
+                    stats['checkpoints'] += self._checkpoint()
+                    stats['checkpoint_time'] += time.time() - t0
+            t0 = time.time()
+            stats['checkpoints'] += self._checkpoint()
+            stats['checkpoint_time'] += time.time() - t0
+        stats['elapsed'] = time.time() - start
+        stats['events_per_sec'] = stats['events'] / stats['event_time'] if stats['event_time'] > 0 else float('inf')
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a fail/recover event trace through the network simulator.")
+    parser.add_argument('trace', help="event trace (.csv or .jsonl)")
+    parser.add_argument('--checkpoint-every', type=int, default=0,
+                        help="save the simulation state every N events (default: only at the end)")
+    parser.add_argument('--data', default='results/initial_state.snap',
+                        help="state snapshot, or a legacy initial_paths_data.json")
+    parser.add_argument('--graph', default='results/graph_structure.pkl',
+                        help="graph pickle for a legacy JSON --data (rebuilt from --oms when missing)")
+    parser.add_argument('--oms', default='data/oms.csv', help="OMS table used to rebuild the graph for a legacy JSON --data")
+    parser.add_argument('--srlg', default='data/srlg.csv', help="optional SRLG file (srlgId,omsId)")
+    parser.add_argument('--verbose', action='store_true', help="keep the per-event output")
+    parser.add_argument('--log-level', default=None, help="console log level (default: DEBUG with --verbose)")
+    parser.add_argument('--log-file', default='results/simulation_log.txt',
+                        help="file receiving INFO-level event summaries ('' to disable)")
+    parser.add_argument('--metrics', default='results/metrics.jsonl',
+                        help="failure-handling metrics output (.jsonl appends a record, otherwise CSV; '' to disable)")
+    parser.add_argument('--revertive', action='store_true',
+                        help="re-optimize detoured services after a recovery")
+    parser.add_argument('--hold-off', type=float, default=0.0,
+                        help="seconds (trace time) a recovered edge must stay up before reverting")
+    parser.add_argument('--min-gain', type=float, default=0.0,
+                        help="minimum relative cost gain required to switch a service back")
+    parser.add_argument('--reversion-batch', type=int, default=None,
+                        help="maximum number of services re-optimized per event")
+    args = parser.parse_args()
+    configure_logging(args.log_level or ('DEBUG' if args.verbose else 'INFO'), args.log_file or None)
+
+    from data_handler import load_srlg_groups
+    from failure_simulation import load_path_calculator
+
+    path_calculator, _ = load_path_calculator(args.data, args.graph, args.oms)
+    if args.revertive:
+        path_calculator.enable_revertive(args.hold_off, args.min_gain, args.reversion_batch)
+    srlg_groups = load_srlg_groups(args.srlg) if os.path.exists(args.srlg) else None
+    driver = TraceDriver(NetworkSimulator(path_calculator), args.checkpoint_every,
+                         srlg_groups=srlg_groups, quiet=not args.verbose)
+    stats = driver.run(read_event_trace(args.trace))
+    print(f"Processed {stats['events']} events ({stats['applied']} changed the state) "
+          f"in {stats['elapsed']:.2f} s, {stats['events_per_sec']:.1f} events/sec, "
+          f"{stats['checkpoints']} checkpoints ({stats['checkpoint_time']:.2f} s).")
+    for action, count in sorted(stats['by_action'].items()):
+        print(f"  {action}: {count}")
+    counters = path_calculator.metrics.counters
+    switches = {name[len('switch.'):]: n for name, n in sorted(counters.items()) if name.startswith('switch.')}
+    if switches:
+        print("Switches by strategy: " + ", ".join(f"{name} {n}" for name, n in switches.items()))
+    if args.metrics:
+        path_calculator.metrics.export(args.metrics, source='trace_driver', trace=args.trace)
+
+
+if __name__ == "__main__":
+    main()
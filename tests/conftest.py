@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from models import OmsLink  # noqa: E402
+
+OMS_HEADER = 'omsId,remoteOmsId,src,snk,cost,distance,ots,osnr,slice,colors'
+
+
+@pytest.fixture
+def ring_with_chord():
+    """四节点环 1-2-3-4（每段代价 10）加一条代价 25 的弦 1-3，每条边一对光纤（omsId 与 remoteOmsId）"""
+    edges = [(1, 2, 10), (2, 3, 10), (3, 4, 10), (4, 1, 10), (1, 3, 25)]
+    links = []
+    for i, (src, snk, cost) in enumerate(edges):
+        links.append(OmsLink(2 * i, 2 * i + 1, src, snk, cost, cost, 1, 0, 6250, ':0-960'))
+        links.append(OmsLink(2 * i + 1, 2 * i, snk, src, cost, cost, 1, 0, 6250, ':0-960'))
+    return links
+
+
+@pytest.fixture
+def ring_with_chord_csv(ring_with_chord, tmp_path):
+    """ring_with_chord 按 data/oms.csv 的列写出的 oms.csv 路径"""
+    file_name = tmp_path / 'oms.csv'
+    with open(file_name, 'w') as f:
+        f.write(OMS_HEADER + '\n')
+        for link in ring_with_chord:
+            f.write(f'{link.oms_id},{link.remote_oms_id},{link.src},{link.snk},{link.cost},{link.distance},'
+                    f'{link.ots},{link.osnr},{link.slice},{link.colors.to_string()}\n')
+    return str(file_name)
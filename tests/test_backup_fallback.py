@@ -0,0 +1,28 @@
+from models import Service
+from path_calculator import PathCalculator
+
+
+def _path_calculator(links):
+    path_calculator = PathCalculator(links)
+    path_calculator.calculate_paths([Service(1, 3, 0, 1, 24, 0, ':0-24', ':0-24')])
+    # 只留下 Dijkstra 兜底
+    path_calculator.local_recompute_path = lambda *args, **kwargs: None
+    path_calculator.get_from_cache = lambda *args, **kwargs: None
+    return path_calculator
+
+
+def test_backup_fallback_avoids_the_failed_edge(ring_with_chord):
+    path_calculator = _path_calculator(ring_with_chord)
+    path_calculator.update_service_backup_path(0)
+    edges = [tuple(edge) for edge in path_calculator.paths_in_use[0]['edges']]
+    assert edges == [(1, 2), (2, 3)]
+    for edge in edges:
+        backup = path_calculator.get_backup_path(0, edge)
+        assert edge not in [tuple(e) for e in backup['edges']]
+
+
+def test_backup_fallback_for_single_edge(ring_with_chord):
+    path_calculator = _path_calculator(ring_with_chord)
+    assert path_calculator.update_service_backup_path_for_edge(0, (1, 2))
+    backup = path_calculator.get_backup_path(0, (1, 2))
+    assert (1, 2) not in [tuple(e) for e in backup['edges']]
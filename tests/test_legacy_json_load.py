@@ -0,0 +1,20 @@
+from failure_simulation import load_path_calculator, save_simulation_data
+from path_calculator import PathCalculator
+
+
+def test_legacy_json_without_graph_pickle(tmp_path, ring_with_chord_csv):
+    from data_handler import load_oms_table
+    from models import Service
+
+    oms_file = ring_with_chord_csv
+    path_calculator = PathCalculator(load_oms_table(oms_file, use_cache=False))
+    path_calculator.calculate_paths([Service(1, 3, 0, 1, 24, 0, ':0-24', ':0-24')])
+    path_calculator.recompute_backup_paths()
+    data_file = tmp_path / 'initial_paths_data.json'
+    save_simulation_data(path_calculator, [(2, 3)], [], str(data_file))
+
+    loaded, data = load_path_calculator(str(data_file), str(tmp_path / 'missing.pkl'), oms_file)
+    assert loaded.G.number_of_edges() == 5
+    assert list(loaded.paths_in_use[0]['path']) == list(path_calculator.paths_in_use[0]['path'])
+    assert data['failed_edges'] == [(2, 3)]
+    assert (2, 3) in loaded.down_edges
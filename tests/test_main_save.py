@@ -0,0 +1,29 @@
+import os
+import shutil
+
+import main
+from failure_simulation import load_path_calculator
+
+
+def test_main_saves_a_snapshot_after_each_event(tmp_path, ring_with_chord_csv, monkeypatch):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    (tmp_path / 'results').mkdir()
+    shutil.move(ring_with_chord_csv, data_dir / 'oms.csv')
+    (data_dir / 'node.csv').write_text('nodeId\n1\n2\n3\n4\n')
+    (data_dir / 'relay.csv').write_text('relayId,relatedRelayId,nodeId,localId,relatedLocalId,dimColors\n'
+                                        '0,1,2,0,1,:0-960\n1,0,2,1,0,:0-960\n')
+    (data_dir / 'service.csv').write_text('src,snk,sourceOtu,targetOtu,m_width,bandType,sourceDimColors,targetDimColors\n'
+                                          '1,3,0,1,24,0,:0-24,:0-24\n2,4,2,3,24,0,:0-24,:0-24\n')
+    monkeypatch.chdir(tmp_path)
+    answers = iter(['f', '1,2', 'q'])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+
+    main.main()
+
+    assert not os.path.exists('results/simulation_state.json')
+    path_calculator, data = load_path_calculator('results/simulation_state.snap')
+    assert data['failed_edges'] == [(1, 2)]
+    assert (1, 2) in path_calculator.down_edges
+    assert path_calculator.path_alive(path_calculator.paths_in_use[0])
+    path_calculator.verify_edge_service_matrix()
@@ -0,0 +1,32 @@
+import numpy as np
+
+from models import OmsLink, Service
+from monte_carlo import MonteCarloSimulator
+from path_calculator import PathCalculator
+
+
+def _simulator(ring_with_chord, failing_oms):
+    """节点 5 只经边 (1, 5) 接入环；只有 failing_oms 所在的一对光纤会故障"""
+    links = ring_with_chord + [OmsLink(10, 11, 1, 5, 10, 10, 1, 0, 6250, ':0-960'),
+                               OmsLink(11, 10, 5, 1, 10, 10, 1, 0, 6250, ':0-960')]
+    path_calculator = PathCalculator(links)
+    path_calculator.calculate_paths([Service(5, 3, 0, 1, 24, 0, ':0-24', ':0-24'),
+                                     Service(1, 3, 2, 3, 24, 0, ':0-24', ':0-24')])
+    simulator = MonteCarloSimulator(path_calculator, np.random.default_rng(0), mttr=1.0, repair='fixed')
+    simulator.rates = np.zeros(len(simulator.units))
+    simulator.rates[simulator.units.index(failing_oms)] = 1.0
+    return simulator
+
+
+def test_services_without_a_detour_are_not_counted_as_switches(ring_with_chord):
+    # 边 (1, 5) 中断时业务 0 无路可走，只记中断
+    stats = _simulator(ring_with_chord, 10).run(100.0)
+    assert stats['failures'] > 0
+    assert stats['outages'][0] == stats['failures']
+    assert stats['switches'] == {}
+
+    # 有绕行路径的边：第一次故障时两个业务切换到弦 (1, 3)（非返回式，之后留在弦上），不计中断
+    stats = _simulator(ring_with_chord, 2).run(100.0)  # 边 (2, 3)
+    assert stats['failures'] > 1
+    assert stats['switches'] == {0: 1, 1: 1}
+    assert stats['outages'] == {}
@@ -0,0 +1,94 @@
+from models import OmsLink, Relay, Service
+from path_calculator import PathCalculator
+
+
+# 并行的三跳路径：1-2-3-4（最便宜）、1-5-6-4 和 1-7-8-4，每段距离 100，单段传输距离上限 250 时都需要再生一次
+EDGES = [(1, 2, 10), (2, 3, 10), (3, 4, 10), (1, 5, 20), (5, 6, 20), (6, 4, 20)]
+EXTRA_EDGES = [(1, 7, 30), (7, 8, 30), (8, 4, 30)]
+
+
+def _links(edges):
+    links = []
+    for i, (src, snk, cost) in enumerate(edges):
+        links.append(OmsLink(2 * i, 2 * i + 1, src, snk, cost, 100, 1, 0, 6250, ':0-960'))
+        links.append(OmsLink(2 * i + 1, 2 * i, snk, src, cost, 100, 1, 0, 6250, ':0-960'))
+    return links
+
+
+def _relay_calculator():
+    links = _links(EDGES)
+    relays = [Relay(0, 1, 3, 0, 1, ':0-960'), Relay(1, 0, 3, 1, 0, ':0-960'),
+              Relay(2, 3, 6, 2, 3, ':0-960'), Relay(3, 2, 6, 3, 2, ':0-960')]
+    path_calculator = PathCalculator(links, relays=relays, max_distance=250)
+    path_calculator.calculate_paths([Service(1, 4, 0, 1, 24, 0, ':0-24', ':0-24')])
+    return path_calculator
+
+
+def test_backups_and_rerouting_respect_the_relay_limits():
+    path_calculator = _relay_calculator()
+    assert path_calculator.paths_in_use[0]['path'] == [1, 2, 3, 4]
+    assert path_calculator.paths_in_use[0]['regenerators'] == [3]
+
+    path_calculator.recompute_backup_paths()
+    backup = path_calculator.get_backup_path(0, (2, 3))
+    assert backup['path'] == [1, 5, 6, 4]
+    assert backup['regenerators'] == [6]
+
+    # 没有预计算的备用路径时，故障后由中继辅助图（跳过故障边）重新计算
+    path_calculator = _relay_calculator()
+    path_calculator.handle_failure((1, 2))
+    current = path_calculator.paths_in_use[0]
+    assert current['path'] == [1, 5, 6, 4]
+    assert current['regenerators'] == [6]
+    assert path_calculator.relay_router.in_use == {3: 0, 6: 1}
+
+
+def test_recovered_edges_are_usable_again():
+    path_calculator = _relay_calculator()
+    router = path_calculator.relay_router
+    path_calculator.handle_failure((2, 3))
+    assert path_calculator.paths_in_use[0]['path'] == [1, 5, 6, 4]
+
+    path_calculator.handle_recovery((2, 3))
+    path_calculator.relay_router.release([6])
+    route = router.route(1, 4, path_calculator._search_mask())
+    assert route['path'] == [1, 2, 3, 4]
+    assert route['regenerators'] == [3]
+
+
+def test_regenerators_must_fit_the_service_colors():
+    links = _links(EDGES)
+    # 节点 3 的再生器只有 [100, 480]；节点 6 的一对中继颜色的交集为 [0, 300]，另有一条没有配对的中继
+    relays = [Relay(0, 1, 3, 0, 1, ':100-480'), Relay(1, 0, 3, 1, 0, ':0-960'),
+              Relay(2, 3, 6, 2, 3, ':0-300'), Relay(3, 2, 6, 3, 2, ':0-960'),
+              Relay(4, 9, 6, 4, 9, ':0-960')]
+    path_calculator = PathCalculator(links, relays=relays, max_distance=250)
+    assert path_calculator.relay_router.capacity == {3: 1, 6: 1}
+
+    path_calculator.calculate_paths([Service(1, 4, 0, 1, 24, 0, ':0-24', ':0-24'),
+                                     Service(1, 4, 2, 3, 24, 0, ':120-144', ':120-144'),
+                                     Service(1, 4, 4, 5, 24, 0, ':600-624', ':600-624')])
+    assert path_calculator.paths_in_use[0]['regenerators'] == [6]
+    assert path_calculator.paths_in_use[1]['regenerators'] == [3]
+    assert 2 not in path_calculator.paths_in_use
+
+
+def test_relay_backups_are_computed_per_service_colors():
+    # 节点 6 的再生器只有 [0, 300]，节点 3（两个再生器）和 8 为整段；两个同源同宿业务的颜色不同
+    relays = [Relay(0, 1, 3, 0, 1, ':0-960'), Relay(1, 0, 3, 1, 0, ':0-960'),
+              Relay(6, 7, 3, 6, 7, ':0-960'), Relay(7, 6, 3, 7, 6, ':0-960'),
+              Relay(2, 3, 6, 2, 3, ':0-300'), Relay(3, 2, 6, 3, 2, ':0-300'),
+              Relay(4, 5, 8, 4, 5, ':0-960'), Relay(5, 4, 8, 5, 4, ':0-960')]
+    path_calculator = PathCalculator(_links(EDGES + EXTRA_EDGES), relays=relays, max_distance=250)
+    path_calculator.calculate_paths([Service(1, 4, 0, 1, 24, 0, ':0-24', ':0-24'),
+                                     Service(1, 4, 2, 3, 24, 0, ':600-624', ':600-624')])
+    path_calculator.recompute_backup_paths()
+    assert path_calculator.get_backup_path(0, (2, 3))['regenerators'] == [6]
+    assert path_calculator.get_backup_path(1, (2, 3))['regenerators'] == [8]
+
+    # 故障时两个业务都直接切换到各自的备用路径，不需要重新计算
+    path_calculator.handle_failure((2, 3))
+    assert path_calculator.metrics.counters['switch.backup'] == 2
+    assert path_calculator.paths_in_use[0]['path'] == [1, 5, 6, 4]
+    assert path_calculator.paths_in_use[1]['path'] == [1, 7, 8, 4]
+    assert path_calculator.relay_router.in_use == {3: 0, 6: 1, 8: 1}
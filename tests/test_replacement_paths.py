@@ -0,0 +1,93 @@
+import random
+from itertools import permutations
+
+import networkx as nx
+
+from data_handler import load_oms_table
+from graph_engine import CSRGraph
+from models import Service
+from path_calculator import PathCalculator
+from topology_generator import generate_topology
+
+
+def _dijkstra_without(G, src, snk, eid, edge_mask):
+    try:
+        return G.shortest_path(src, snk, excluded_edge=eid, edge_mask=edge_mask)
+    except nx.NetworkXNoPath:
+        return None
+
+
+def _check_replacements(G, edge_mask=None, pairs=None):
+    """逐个端点对比较替换路径与跳过对应边的 Dijkstra，返回有替换路径的边数"""
+    checked = 0
+    for src, snk in pairs or permutations(sorted(G.index_of), 2):
+        try:
+            path = G.shortest_path(src, snk, edge_mask=edge_mask)
+        except nx.NetworkXNoPath:
+            continue
+        replacements = G.replacement_paths(src, snk, path, edge_mask)
+        assert len(replacements) == len(path) - 1
+        for i, replacement in enumerate(replacements):
+            eid = G.edge_id(path[i], path[i + 1])
+            expected = _dijkstra_without(G, src, snk, eid, edge_mask)
+            if expected is None:
+                assert replacement is None
+                continue
+            assert replacement[0] == src and replacement[-1] == snk
+            eids = G.path_edge_ids(replacement)
+            assert None not in eids and eid not in eids
+            assert edge_mask is None or not any(edge_mask[e] for e in eids)
+            assert G.path_cost(replacement) == G.path_cost(expected)
+            checked += 1
+    return checked
+
+
+def test_replacement_paths_match_dijkstra_per_edge(ring_with_chord):
+    assert _check_replacements(CSRGraph(ring_with_chord)) > 0
+
+
+def test_replacement_paths_with_failed_edges(ring_with_chord):
+    G = CSRGraph(ring_with_chord)
+    edge_mask = bytearray(G.number_of_edges())
+    edge_mask[G.edge_id(3, 4)] = 1
+    assert _check_replacements(G, edge_mask) > 0
+
+    # (1, 3) 和 (3, 4) 都故障后 (2, 3) 是到节点 3 的唯一通路，不存在替换路径
+    edge_mask[G.edge_id(1, 3)] = 1
+    assert G.replacement_paths(1, 3, [1, 2, 3], edge_mask) == [None, None]
+    _check_replacements(G, edge_mask)  # 剩下的图是一棵树，所有替换路径都为 None
+
+
+def test_replacement_paths_rejects_non_shortest_paths(ring_with_chord):
+    G = CSRGraph(ring_with_chord)
+    assert G.replacement_paths(1, 3, [1, 3], None) is None  # 弦 (1, 3) 比 1-2-3 贵
+    edge_mask = bytearray(G.number_of_edges())
+    edge_mask[G.edge_id(2, 3)] = 1
+    assert G.replacement_paths(1, 3, [1, 2, 3], edge_mask) is None  # 路径经过故障边
+
+
+def test_replacement_paths_on_a_synthetic_mesh(tmp_path):
+    generate_topology(str(tmp_path), 60, seed=3)
+    G = CSRGraph(load_oms_table(str(tmp_path / 'oms.csv'), use_cache=False))
+    rng = random.Random(3)
+    pairs = rng.sample(list(permutations(sorted(G.index_of), 2)), 300)
+    edge_mask = bytearray(G.number_of_edges())
+    for eid in rng.sample(range(G.number_of_edges()), 5):
+        edge_mask[eid] = 1
+    assert _check_replacements(G, pairs=pairs) > 0
+    assert _check_replacements(G, edge_mask, pairs) > 0
+
+
+def test_backup_paths_along_match_compute_backup_path(ring_with_chord):
+    path_calculator = PathCalculator(ring_with_chord)
+    path_calculator.calculate_paths([Service(2, 4, 0, 1, 24, 0, ':0-24', ':0-24')])
+    path_calculator.handle_failure((1, 3))
+    path = path_calculator.paths_in_use[0]['path']
+    edges = [(min(path[i], path[i + 1]), max(path[i], path[i + 1])) for i in range(len(path) - 1)]
+    along = path_calculator.compute_backup_paths_along(path)
+    for edge, backup in zip(edges, along):
+        expected = path_calculator.compute_backup_path(path[0], path[-1], edge)
+        assert (backup is None) == (expected is None)
+        if backup is not None:
+            assert edge not in backup['edges']
+            assert path_calculator.path_cost(backup['path']) == path_calculator.path_cost(expected['path'])
@@ -0,0 +1,47 @@
+import numpy as np
+
+from models import Service
+from path_calculator import PathCalculator
+from state_snapshot import load_state, save_state
+
+
+def _paths(paths_in_use):
+    return {service_index: list(path_info['path']) for service_index, path_info in paths_in_use.items()}
+
+
+def test_snapshot_round_trip(tmp_path, ring_with_chord):
+    path_calculator = PathCalculator(ring_with_chord, verify_matrix=True)
+    path_calculator.calculate_paths([Service(1, 3, 0, 1, 24, 0, ':0-24', ':0-24'),
+                                     Service(2, 4, 2, 3, 24, 0, ':0-24', ':0-24'),
+                                     Service(1, 3, 4, 5, 24, 0, ':24-48', ':24-48')])
+    path_calculator.recompute_backup_paths()
+    path_calculator.handle_oms_failure(6)  # 边 (1, 4) 唯一的一对光纤
+    file_name = str(tmp_path / 'state.snap')
+    save_state(path_calculator, file_name, [(1, 4)], [(2, 3)])
+
+    loaded, data = load_state(file_name)
+    loaded.verify_edge_service_matrix()
+    assert data == {'failed_edges': [(1, 4)], 'recovered_edges': [(2, 3)]}
+    assert loaded.failed_edges == [(1, 4)]
+    assert loaded.down_edges == {(1, 4)}
+    assert np.array_equal(loaded.oms_alive, path_calculator.oms_alive)
+    assert not loaded.oms_alive[6] and not loaded.oms_alive[7]
+    assert _paths(loaded.paths_in_use) == _paths(path_calculator.paths_in_use)
+    assert loaded.backup_paths == path_calculator.backup_paths
+    for service_index, edge_handles in path_calculator.backup_paths.items():
+        for edge, handle in edge_handles.items():
+            expected = path_calculator.backup_table.get(handle)
+            restored = loaded.backup_table.get(handle)
+            assert (restored is None) == (expected is None)
+            if expected is not None:
+                assert list(restored['path']) == list(expected['path'])
+
+    # 故障处理修改的是写时复制的内存映射，快照文件本身不变
+    loaded.verify_matrix = True
+    loaded.handle_failure((1, 2))
+    loaded.verify_edge_service_matrix()
+    for path_info in loaded.paths_in_use.values():
+        assert loaded.path_alive(path_info)
+    reloaded, _ = load_state(file_name)
+    assert reloaded.down_edges == {(1, 4)}
+    assert _paths(reloaded.paths_in_use) == _paths(path_calculator.paths_in_use)
@@ -0,0 +1,41 @@
+from models import OmsLink, Service
+from path_calculator import PathCalculator
+from simulator import NetworkSimulator
+from trace_driver import TraceDriver
+
+
+def _driver(checkpoints):
+    # 1-2 之间有两对并行光纤（omsId 0/1 和 2/3），其余边各一对
+    edges = [(1, 2, 10), (1, 2, 12), (2, 3, 10), (3, 4, 10), (4, 1, 10)]
+    links = []
+    for i, (src, snk, cost) in enumerate(edges):
+        links.append(OmsLink(2 * i, 2 * i + 1, src, snk, cost, cost, 1, 0, 6250, ':0-960'))
+        links.append(OmsLink(2 * i + 1, 2 * i, snk, src, cost, cost, 1, 0, 6250, ':0-960'))
+    path_calculator = PathCalculator(links)
+    path_calculator.calculate_paths([Service(1, 3, 0, 1, 24, 0, ':0-24', ':0-24')])
+    path_calculator.recompute_backup_paths()
+    return TraceDriver(NetworkSimulator(path_calculator), srlg_groups={7: [999999]},
+                       checkpoint=lambda *args: checkpoints.append(args))
+
+
+def test_no_op_events_do_not_change_state():
+    checkpoints = []
+    driver = _driver(checkpoints)
+    events = [{'time': 0.0, 'action': 'fail_oms', 'oms': 999999},
+              {'time': 1.0, 'action': 'recover_oms', 'oms': 999999},
+              {'time': 2.0, 'action': 'recover_oms', 'oms': 0},
+              {'time': 3.0, 'action': 'fail_srlg', 'srlg': 7},
+              {'time': 4.0, 'action': 'fail_srlg', 'srlg': 8}]
+    stats = driver.run(events)
+    assert stats['applied'] == 0
+    assert checkpoints == []
+
+
+def test_absorbed_oms_failure_changes_state():
+    checkpoints = []
+    driver = _driver(checkpoints)
+    stats = driver.run([{'time': 0.0, 'action': 'fail_oms', 'oms': 0},
+                        {'time': 1.0, 'action': 'fail_oms', 'oms': 1}])
+    assert stats['applied'] == 1  # omsId 1 与 0 是同一对光纤，第二个事件不再改变状态
+    assert len(checkpoints) == 1
+    assert driver.failed_edges == []